@@ -0,0 +1,91 @@
+import threading
+from typing import Callable, Dict, Any, List, Optional
+
+class AccountRegistry:
+    """In-memory index of account rows keyed by id and by account number.
+
+    Loaded once at startup from the DB and kept current by the write helpers in
+    app/db.py, so the webhook can resolve an account without touching disk.
+    When the same account number is registered twice, the newest row (highest id)
+    wins, matching the ORDER BY id DESC scan this replaces.
+    Listeners registered with add_listener() are called after every change.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_id: Dict[int, Dict[str, Any]] = {}
+        self._by_account: Dict[str, int] = {}
+        self._listeners: List[Callable[[], None]] = []
+
+    def add_listener(self, fn: Callable[[], None]) -> None:
+        self._listeners.append(fn)
+
+    def _changed(self) -> None:
+        for fn in list(self._listeners):
+            try:
+                fn()
+            except Exception:
+                pass
+
+    def load(self, rows: List[Dict[str, Any]]) -> None:
+        by_id = {r["id"]: dict(r) for r in rows}
+        by_account = {}
+        for acc_id in sorted(by_id):
+            by_account[str(by_id[acc_id]["account"])] = acc_id
+        with self._lock:
+            self._by_id = by_id
+            self._by_account = by_account
+        self._changed()
+
+    def upsert(self, row: Dict[str, Any]) -> None:
+        with self._lock:
+            acc_id = row["id"]
+            self._by_id[acc_id] = dict(row)
+            key = str(row["account"])
+            if acc_id >= self._by_account.get(key, -1):
+                self._by_account[key] = acc_id
+        self._changed()
+
+    def update(self, acc_id: int, **fields) -> None:
+        with self._lock:
+            row = self._by_id.get(acc_id)
+            if row is None:
+                return
+            row.update(fields)
+        self._changed()
+
+    def remove(self, acc_id: int) -> None:
+        with self._lock:
+            row = self._by_id.pop(acc_id, None)
+            if row is None:
+                return
+            key = str(row["account"])
+            if self._by_account.get(key) == acc_id:
+                others = [i for i, r in self._by_id.items() if str(r["account"]) == key]
+                if others:
+                    self._by_account[key] = max(others)
+                else:
+                    self._by_account.pop(key, None)
+        self._changed()
+
+    def get(self, account: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            acc_id = self._by_account.get(str(account))
+            if acc_id is None:
+                return None
+            return dict(self._by_id[acc_id])
+
+    def get_by_id(self, acc_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._by_id.get(acc_id)
+            return dict(row) if row is not None else None
+
+    def all(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(self._by_id[i]) for i in sorted(self._by_id, reverse=True)]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._by_id)
+
+registry = AccountRegistry()
@@ -0,0 +1,201 @@
+import os, time, queue, threading, logging
+from collections import OrderedDict
+from typing import Optional, Tuple
+from .email_handler import smtp_config, build_message, smtp_connect
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("drop_new", "drop_oldest")
+
+class _SmtpSession:
+    """One long-lived SMTP connection, reopened on demand and closed when idle."""
+
+    def __init__(self, idle_timeout: float):
+        self.idle_timeout = idle_timeout
+        self._conn = None   # smtplib.SMTP
+        self._last_used = 0.0
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.quit()
+            except Exception:
+                try:
+                    self._conn.close()
+                except Exception:
+                    pass
+            self._conn = None
+
+    def close_if_idle(self, now: float) -> None:
+        if self._conn is not None and now - self._last_used > self.idle_timeout:
+            self._close()
+
+    def send(self, cfg: dict, subject: str, body: str) -> None:
+        import smtplib
+        msg = build_message(cfg, subject, body)
+        for attempt in (1, 2):
+            try:
+                if self._conn is None:
+                    self._conn = smtp_connect(cfg)
+                self._conn.send_message(msg)
+                self._last_used = time.time()
+                return
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError):
+                # stale session (server idle-kicked us) -> reconnect once
+                self._close()
+                if attempt == 2:
+                    raise
+
+    def shutdown(self) -> None:
+        self._close()
+
+class AlertDispatcher:
+    """
+    Background email alerts: request handlers enqueue and return immediately.
+
+    - bounded queue; when full, `overflow` decides whether the new alert or the
+      oldest queued one is dropped (drops are reported in the next digest)
+    - first occurrence of a (subject, body) pair is sent right away; repeats
+      within `window` seconds are only counted and go out as one digest email
+      when the window closes
+    - a single SMTP session is reused across sends and reopened if it drops
+    """
+
+    def __init__(self, maxsize: int = 1000, window: float = 60.0,
+                 overflow: str = "drop_new", idle_timeout: float = 60.0):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}")
+        self.window = window
+        self.overflow = overflow
+        self._q: "queue.Queue[Tuple[str, str, float]]" = queue.Queue(maxsize=maxsize)
+        self._session = _SmtpSession(idle_timeout)
+        self._windows: "OrderedDict[Tuple[str, str], list]" = OrderedDict()  # key -> [expires, repeats, last_ts]
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.stats = {"queued": 0, "sent": 0, "coalesced": 0, "dropped": 0, "failed": 0}
+        self._dropped_since_digest = 0
+
+    @classmethod
+    def from_env(cls) -> "AlertDispatcher":
+        return cls(
+            maxsize=int(os.getenv("ALERT_QUEUE_SIZE", "1000")),
+            window=float(os.getenv("ALERT_COALESCE_WINDOW", "60")),
+            overflow=os.getenv("ALERT_OVERFLOW", "drop_new"),
+            idle_timeout=float(os.getenv("SMTP_IDLE_TIMEOUT", "60")),
+        )
+
+    # ------------------------ producer side ------------------------ #
+
+    def submit(self, subject: str, body: str) -> bool:
+        """Enqueue an alert without blocking. Returns False if it was dropped."""
+        self.start()
+        item = (subject, body, time.time())
+        try:
+            self._q.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self.stats["dropped"] += 1
+                self._dropped_since_digest += 1
+            if self.overflow == "drop_new":
+                return False
+            try:
+                self._q.get_nowait()
+                self._q.put_nowait(item)
+            except (queue.Empty, queue.Full):
+                return False
+        with self._lock:
+            self.stats["queued"] += 1
+        return True
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="alert-dispatcher", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Drain the queue, flush pending digests and close the SMTP session."""
+        t = self._thread
+        if t is None:
+            return
+        self._stop.set()
+        t.join(timeout)
+        self._thread = None
+
+    # ------------------------ consumer side ------------------------ #
+
+    def _send(self, cfg: dict, subject: str, body: str) -> None:
+        if not cfg["host"] or not cfg["to"]:
+            return  # SMTP not configured
+        try:
+            self._session.send(cfg, subject, body)
+            self.stats["sent"] += 1
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.warning("Alert email failed (%s): %s", subject, e)
+
+    def _handle(self, cfg: dict, subject: str, body: str, ts: float) -> None:
+        key = (subject, body)
+        w = self._windows.get(key)
+        if w is None:
+            self._windows[key] = [ts + self.window, 0, ts]
+            self._send(cfg, subject, body)
+        else:
+            w[1] += 1
+            w[2] = ts
+            self.stats["coalesced"] += 1
+
+    def _flush(self, cfg: dict, now: float, force: bool = False) -> None:
+        expired = [k for k, w in self._windows.items() if force or w[0] <= now]
+        lines, repeated = [], []
+        for k in expired:
+            _, repeats, last_ts = self._windows.pop(k)
+            if repeats:
+                repeated.append(k)
+                lines.append(f"[x{repeats}] {k[0]}: {k[1]} (last at {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(last_ts))})")
+        with self._lock:
+            dropped, self._dropped_since_digest = self._dropped_since_digest, 0
+        if dropped:
+            lines.append(f"{dropped} alert(s) dropped because the alert queue was full.")
+        if not lines:
+            return
+        subject = f"{repeated[0][0]} (repeated)" if len(repeated) == 1 and not dropped else "Alert digest"
+        body = f"Repeated alerts suppressed in the last {int(self.window)}s window:\n\n" + "\n".join(lines)
+        self._send(cfg, subject, body)
+
+    def _run(self) -> None:
+        while True:
+            cfg = smtp_config()
+            now = time.time()
+            next_due = min((w[0] for w in self._windows.values()), default=now + 1.0)
+            try:
+                subject, body, ts = self._q.get(timeout=max(0.05, min(1.0, next_due - now)))
+                self._handle(cfg, subject, body, ts)
+            except queue.Empty:
+                if self._stop.is_set():
+                    self._flush(cfg, time.time(), force=True)
+                    self._session.shutdown()
+                    return
+            now = time.time()
+            self._flush(cfg, now)
+            self._session.close_if_idle(now)
+
+_dispatcher: Optional[AlertDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+def get_dispatcher() -> AlertDispatcher:
+    """Process-wide dispatcher, built from env on first use (after load_dotenv)."""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = AlertDispatcher.from_env()
+    return _dispatcher
+
+def send_alert(subject: str, body: str) -> bool:
+    """Non-blocking replacement for send_email() in request/monitor paths."""
+    return get_dispatcher().submit(subject, body)
@@ -0,0 +1,278 @@
+"""
+Cluster mode: several server.py nodes behind one webhook router (cluster_router.py).
+
+- HttpPool: keep-alive http.client connections to one node. Idle connections
+  are reused LIFO. When a reused connection turns out to be closed by the
+  node, the request is retried once on a fresh connection only if it cannot
+  have been acted on twice: it failed while being sent, it is a GET/HEAD, or
+  it carries an Idempotency-Key the node dedups by. Otherwise the error is
+  raised (the router answers 502) rather than risking a duplicate order.
+- NodeRegistry (router side): node id -> url, hosted accounts, groups and
+  last heartbeat, plus the account -> node map the router routes by. A node
+  that misses heartbeats for `timeout` seconds is marked down; its accounts
+  stay mapped to it (signals for them get 503 instead of landing on a node
+  that does not have the terminal).
+- HeartbeatClient (node side): posts this node's account status rows and
+  group names to the router every `interval` seconds; the first heartbeat
+  registers the node.
+
+Router and nodes authenticate each other with the shared CLUSTER_TOKEN
+(X-Cluster-Token header).
+"""
+import json, time, queue, socket, threading, logging, http.client
+from urllib.parse import urlsplit
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TOKEN_HEADER = "X-Cluster-Token"
+CLIENT_IP_HEADER = "X-Cluster-Client-IP"
+
+# errors meaning "the idle keep-alive connection was closed under us"
+_STALE = (http.client.RemoteDisconnected, http.client.BadStatusLine, ConnectionResetError,
+          ConnectionAbortedError, BrokenPipeError)
+_SAFE_METHODS = ("GET", "HEAD")
+
+class HttpPool:
+    def __init__(self, base_url: str, size: int = 8, timeout: float = 10.0):
+        u = urlsplit(base_url)
+        if u.scheme not in ("http", "https") or not u.hostname:
+            raise ValueError(f"bad node url: {base_url}")
+        self.base_url = base_url.rstrip("/")
+        self.https = u.scheme == "https"
+        self.host, self.port = u.hostname, u.port or (443 if self.https else 80)
+        self.prefix = u.path.rstrip("/")
+        self.size = size
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue()
+        self.created = self.requests = self.retries = 0
+
+    def _new(self) -> http.client.HTTPConnection:
+        self.created += 1
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    def _release(self, conn: http.client.HTTPConnection, resp: http.client.HTTPResponse) -> None:
+        if resp.will_close or self._idle.qsize() >= self.size:
+            conn.close()
+        else:
+            self._idle.put(conn)
+
+    def request(self, method: str, path: str, body: Optional[bytes] = None,
+                headers: Optional[Dict[str, str]] = None) -> Tuple[int, Dict[str, str], bytes]:
+        """-> (status, response headers, body). Raises OSError / http.client.HTTPException."""
+        self.requests += 1
+        headers = headers or {}
+        replayable = method in _SAFE_METHODS or any(k.lower() == "idempotency-key" for k in headers)
+        try:
+            conn, reused = self._idle.get_nowait(), True
+        except queue.Empty:
+            conn, reused = self._new(), False
+        while True:
+            sent = False
+            try:
+                conn.request(method, self.prefix + path, body=body, headers=headers)
+                sent = True
+                resp = conn.getresponse()
+                data = resp.read()
+            except _STALE:
+                conn.close()
+                # the node may have processed it before closing: only replay what is safe to
+                if not reused or (sent and not replayable):
+                    raise
+                self.retries += 1
+                conn, reused = self._new(), False
+                continue
+            except BaseException:
+                conn.close()
+                raise
+            self._release(conn, resp)
+            return resp.status, dict(resp.getheaders()), data
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def stats(self) -> Dict[str, int]:
+        return {"idle": self._idle.qsize(), "created": self.created, "requests": self.requests,
+                "retries": self.retries}
+
+# ------------------------ router side ------------------------ #
+
+class NodeRegistry:
+    def __init__(self, timeout: float = 15.0, pool_size: int = 8, forward_timeout: float = 10.0):
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.forward_timeout = forward_timeout
+        self._nodes: Dict[str, Dict[str, Any]] = {}
+        self._pools: Dict[str, HttpPool] = {}
+        self._owner: Dict[str, str] = {}            # account -> node id
+        self._lock = threading.Lock()
+
+    def heartbeat(self, node_id: str, url: str, accounts: List[Dict[str, Any]],
+                  groups: Optional[List[str]] = None, capacity: int = 0) -> Dict[str, Any]:
+        """Register or refresh a node. Returns {"conflicts": [accounts owned by another live node]}."""
+        now = time.time()
+        conflicts = []
+        with self._lock:
+            node = self._nodes.get(node_id)
+            if node is None or node["url"] != url:
+                old = self._pools.pop(node_id, None)
+                if old:
+                    old.close()
+                self._pools[node_id] = HttpPool(url, self.pool_size, self.forward_timeout)
+                logger.info("[CLUSTER] node %s registered at %s (%d accounts)", node_id, url, len(accounts))
+            rows = {str(r["account"]): r for r in accounts if r.get("account")}
+            for acc in rows:
+                owner = self._owner.get(acc)
+                if owner and owner != node_id and self._alive(self._nodes.get(owner), now):
+                    conflicts.append(acc)
+                    continue
+                self._owner[acc] = node_id
+            # accounts this node no longer reports (deleted there) stop routing to it
+            for acc in [a for a, n in self._owner.items() if n == node_id and a not in rows]:
+                del self._owner[acc]
+            self._nodes[node_id] = {"id": node_id, "url": url, "last_seen": now, "capacity": capacity,
+                                    "accounts": rows, "groups": sorted(groups or [])}
+        if conflicts:
+            logger.warning("[CLUSTER] node %s reports accounts owned by another node: %s", node_id, conflicts[:10])
+        return {"conflicts": conflicts}
+
+    def remove(self, node_id: str) -> bool:
+        with self._lock:
+            if self._nodes.pop(node_id, None) is None:
+                return False
+            for acc in [a for a, n in self._owner.items() if n == node_id]:
+                del self._owner[acc]
+            pool = self._pools.pop(node_id, None)
+        if pool:
+            pool.close()
+        logger.info("[CLUSTER] node %s removed", node_id)
+        return True
+
+    def _alive(self, node: Optional[Dict[str, Any]], now: float) -> bool:
+        return node is not None and now - node["last_seen"] <= self.timeout
+
+    # ------------------------ lookups ------------------------ #
+
+    def route(self, account: str) -> Tuple[Optional[str], Optional[HttpPool], bool]:
+        """-> (node id, pool, node alive); (None, None, False) for an unmapped account."""
+        with self._lock:
+            node_id = self._owner.get(str(account))
+            if node_id is None:
+                return None, None, False
+            return node_id, self._pools.get(node_id), self._alive(self._nodes.get(node_id), time.time())
+
+    def group_nodes(self, name: str) -> List[Tuple[str, HttpPool]]:
+        now = time.time()
+        with self._lock:
+            return [(nid, self._pools[nid]) for nid, n in self._nodes.items()
+                    if name in n["groups"] and self._alive(n, now)]
+
+    def assign(self, account: str, node_id: str) -> None:
+        """Pin a new account to a node before the node's next heartbeat reports it."""
+        with self._lock:
+            self._owner[str(account)] = node_id
+
+    def pick(self) -> Optional[Tuple[str, HttpPool]]:
+        """Live node with the most free room (fewest accounts relative to its capacity)."""
+        now = time.time()
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for nid in self._owner.values():
+                counts[nid] = counts.get(nid, 0) + 1
+            best = None
+            for nid, n in self._nodes.items():
+                if not self._alive(n, now):
+                    continue
+                used = counts.get(nid, 0)
+                if n["capacity"] and used >= n["capacity"]:
+                    continue
+                score = used / n["capacity"] if n["capacity"] else used
+                if best is None or score < best[0]:
+                    best = (score, nid)
+            return (best[1], self._pools[best[1]]) if best else None
+
+    def accounts(self) -> List[Dict[str, Any]]:
+        """Status rows of every node (as last reported), tagged with node id / liveness."""
+        now = time.time()
+        out = []
+        with self._lock:
+            for nid, n in self._nodes.items():
+                alive = self._alive(n, now)
+                for acc, row in n["accounts"].items():
+                    if self._owner.get(acc) != nid:
+                        continue    # duplicate on a second node: the owner's row wins
+                    out.append(dict(row, node=nid, node_alive=alive, alive=bool(row.get("alive")) and alive))
+        out.sort(key=lambda r: (r["node"], str(r["account"])))
+        return out
+
+    def nodes(self) -> List[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            return [{"id": nid, "url": n["url"], "alive": self._alive(n, now),
+                     "last_seen_s": round(now - n["last_seen"], 1), "capacity": n["capacity"],
+                     "accounts": sum(1 for o in self._owner.values() if o == nid), "groups": n["groups"],
+                     "pool": self._pools[nid].stats()}
+                    for nid, n in sorted(self._nodes.items())]
+
+# ------------------------ node side ------------------------ #
+
+class HeartbeatClient:
+    def __init__(self, router_url: str, token: str, node_id: str, node_url: str,
+                 payload_fn: Callable[[], Dict[str, Any]], interval: float = 5.0, capacity: int = 0):
+        """payload_fn() -> {"accounts": [status rows], "groups": [names]}"""
+        self.pool = HttpPool(router_url, size=1, timeout=max(2.0, interval))
+        self.token = token
+        self.node_id = node_id
+        self.node_url = node_url
+        self.payload_fn = payload_fn
+        self.interval = interval
+        self.capacity = capacity
+        self._thread: Optional[threading.Thread] = None
+        self.sent = self.failed = 0
+        self.last_ok: Optional[float] = None
+
+    def beat(self) -> bool:
+        body = dict(self.payload_fn(), node_id=self.node_id, url=self.node_url, capacity=self.capacity)
+        try:
+            status, _, data = self.pool.request(
+                "POST", "/cluster/heartbeat", json.dumps(body).encode("utf-8"),
+                {"Content-Type": "application/json", TOKEN_HEADER: self.token})
+        except (OSError, socket.timeout, http.client.HTTPException) as e:
+            self.failed += 1
+            logger.warning("[CLUSTER] heartbeat to %s failed: %s", self.pool.base_url, e)
+            return False
+        if status != 200:
+            self.failed += 1
+            logger.warning("[CLUSTER] heartbeat rejected by router: %s %s", status, data[:200])
+            return False
+        self.sent += 1
+        self.last_ok = time.time()
+        conflicts = json.loads(data or b"{}").get("conflicts")
+        if conflicts:
+            logger.warning("[CLUSTER] router routes these accounts to another node: %s", conflicts[:10])
+        return True
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+
+        def loop():
+            while True:
+                try:
+                    self.beat()
+                except Exception:
+                    logger.exception("cluster heartbeat error")
+                time.sleep(self.interval)
+
+        self._thread = threading.Thread(target=loop, name="cluster-heartbeat", daemon=True)
+        self._thread.start()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"router": self.pool.base_url, "node_id": self.node_id, "url": self.node_url,
+                "sent": self.sent, "failed": self.failed,
+                "last_ok_s": round(time.time() - self.last_ok, 1) if self.last_ok else None}
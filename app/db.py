@@ -1,67 +1,371 @@
-import sqlite3, os
+import sqlite3, os, json, queue, threading
+from contextlib import contextmanager
+from .account_registry import registry
+from .group_router import group_routes, Member
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "..", "data.db")
+DB_PATH = os.getenv("DB_PATH") or os.path.join(os.path.dirname(__file__), "..", "data.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
 
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute(
-        """CREATE TABLE IF NOT EXISTS accounts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            account TEXT NOT NULL,
-            nickname TEXT,
-            pid INTEGER,
-            last_state TEXT DEFAULT 'offline',
-            created_at TEXT DEFAULT (datetime('now'))
-        )"""
-    )
-    conn.commit()
-    conn.close()
+# Applied to every pooled connection. journal_mode=WAL is persistent in the file,
+# the rest are per-connection.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+)
+
+# Statement text is kept constant so sqlite3's per-connection statement cache
+# reuses the prepared statements on pooled connections.
+SQL_ACCOUNT_COLS = "id, account, nickname, pid, last_state, created_at, delivery, auto_restart"
+SQL_INSERT_ACCOUNT = "INSERT INTO accounts (account, nickname) VALUES (?, ?)"
+SQL_SELECT_ACCOUNTS = f"SELECT {SQL_ACCOUNT_COLS} FROM accounts ORDER BY id DESC"
+SQL_SELECT_ACCOUNT = f"SELECT {SQL_ACCOUNT_COLS} FROM accounts WHERE id=?"
+SQL_SET_STATE = "UPDATE accounts SET last_state=? WHERE id=?"
+SQL_SET_PID = "UPDATE accounts SET pid=? WHERE id=?"
+SQL_SET_DELIVERY = "UPDATE accounts SET delivery=? WHERE id=?"
+SQL_SET_AUTO_RESTART = "UPDATE accounts SET auto_restart=? WHERE id=?"
+SQL_DELETE_ACCOUNT = "DELETE FROM accounts WHERE id=?"
+SQL_SELECT_GROUP_MEMBERS = ("SELECT g.name, m.account, m.volume_mult, m.symbol_map FROM account_groups g "
+                            "JOIN group_members m ON m.group_id = g.id ORDER BY g.name, m.position")
+SQL_UPSERT_GROUP = "INSERT INTO account_groups (name) VALUES (?) ON CONFLICT(name) DO NOTHING"
+SQL_SELECT_GROUP_ID = "SELECT id FROM account_groups WHERE name=?"
+SQL_CLEAR_GROUP_MEMBERS = "DELETE FROM group_members WHERE group_id=?"
+SQL_INSERT_GROUP_MEMBER = ("INSERT INTO group_members (group_id, account, volume_mult, symbol_map, position) "
+                           "VALUES (?, ?, ?, ?, ?)")
+
+DELIVERY_MODES = ("file", "journal")
+
+SCHEMA = """CREATE TABLE IF NOT EXISTS accounts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account TEXT NOT NULL,
+    nickname TEXT,
+    pid INTEGER,
+    last_state TEXT DEFAULT 'offline',
+    created_at TEXT DEFAULT (datetime('now'))
+)"""
+
+# Schema migrations, applied in order on top of SCHEMA; PRAGMA user_version
+# records how many have run, so existing data.db files are upgraded in place.
+MIGRATIONS = [
+    # 1: webhook/registry lookups by account number
+    ["CREATE INDEX IF NOT EXISTS idx_accounts_account ON accounts(account)"],
+    # 2: per-account signal delivery mode ('file' = one JSON per signal, 'journal' = mmap ring)
+    ["ALTER TABLE accounts ADD COLUMN delivery TEXT NOT NULL DEFAULT 'file'"],
+    # 3: durable ingest queue for INGEST_MODE=async (see app/ingest_queue.py)
+    ["""CREATE TABLE IF NOT EXISTS ingest_queue (
+        id TEXT PRIMARY KEY,
+        received_at REAL NOT NULL,
+        client_ip TEXT,
+        payload TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'queued',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        not_before REAL NOT NULL DEFAULT 0,
+        result TEXT,
+        error TEXT,
+        updated_at REAL NOT NULL
+    )""",
+     "CREATE INDEX IF NOT EXISTS idx_ingest_status ON ingest_queue(status, received_at)"],
+    # 4: persisted webhook idempotency entries (IDEMPOTENCY_PERSIST, see app/idempotency.py)
+    ["""CREATE TABLE IF NOT EXISTS idempotency (
+        key TEXT PRIMARY KEY,
+        expires_at REAL NOT NULL,
+        response TEXT NOT NULL
+    )""",
+     "CREATE INDEX IF NOT EXISTS idx_idempotency_expires ON idempotency(expires_at)"],
+    # 5: copy-trading groups; one webhook naming a group fans out to every member
+    ["""CREATE TABLE IF NOT EXISTS account_groups (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE,
+        created_at TEXT DEFAULT (datetime('now'))
+    )""",
+     """CREATE TABLE IF NOT EXISTS group_members (
+        group_id INTEGER NOT NULL REFERENCES account_groups(id) ON DELETE CASCADE,
+        account TEXT NOT NULL,
+        volume_mult REAL NOT NULL DEFAULT 1.0,
+        symbol_map TEXT,
+        position INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (group_id, account)
+    )"""],
+    # 6: signal history (see app/signal_history.py); pages are keyset scans on id
+    ["""CREATE TABLE IF NOT EXISTS signal_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        received_ts REAL NOT NULL,
+        route TEXT NOT NULL,
+        outcome TEXT NOT NULL,
+        account TEXT,
+        symbol_in TEXT,
+        symbol TEXT,
+        action TEXT,
+        volume REAL,
+        error TEXT,
+        signal_path TEXT,
+        client_ip TEXT,
+        group_name TEXT,
+        ref TEXT,
+        signal TEXT
+    )""",
+     "CREATE INDEX IF NOT EXISTS idx_history_account ON signal_history(account, id)",
+     "CREATE INDEX IF NOT EXISTS idx_history_symbol ON signal_history(symbol, id)",
+     "CREATE INDEX IF NOT EXISTS idx_history_received ON signal_history(received_ts)"],
+    # 7: per-account auto restart by the supervisor (see app/supervisor.py)
+    ["ALTER TABLE accounts ADD COLUMN auto_restart INTEGER NOT NULL DEFAULT 0"],
+]
+
+# ------------------------ connection pool ------------------------ #
+
+class ConnectionPool:
+    """
+    Small pool of long-lived connections shared across threads.
+    Flask's threaded server spawns a thread per request, so thread-local
+    connections would still churn; pooled ones keep their page cache and
+    prepared statements between requests.
+    """
+
+    def __init__(self, path: str, size: int = DB_POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _new(self) -> sqlite3.Connection:
+        # isolation_level=None: autocommit per statement, explicit BEGIN for batches
+        conn = sqlite3.connect(self.path, timeout=DB_BUSY_TIMEOUT_MS / 1000,
+                               isolation_level=None, check_same_thread=False,
+                               cached_statements=128)
+        for p in PRAGMAS:
+            conn.execute(p)
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return self._new()
+                except Exception:
+                    self._created -= 1
+                    raise
+        return self._idle.get()
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool() -> ConnectionPool:
+    global _pool
+    path = os.path.abspath(DB_PATH)
+    if _pool is None or _pool.path != path:
+        with _pool_lock:
+            if _pool is None or _pool.path != path:
+                if _pool is not None:
+                    _pool.close()
+                _pool = ConnectionPool(path)
+    return _pool
+
+@contextmanager
+def connection():
+    """Borrow a pooled connection (autocommit)."""
+    pool = _get_pool()
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+@contextmanager
+def transaction():
+    """Borrow a pooled connection inside BEGIN IMMEDIATE ... COMMIT."""
+    with connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
 
 def get_conn():
+    """Standalone connection for ad-hoc scripts; app code uses connection()."""
     return sqlite3.connect(DB_PATH)
 
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+# ------------------------ schema ------------------------ #
+
+def migrate(conn) -> int:
+    """Bring the schema up to len(MIGRATIONS); returns the resulting version."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for i in range(version, len(MIGRATIONS)):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for stmt in MIGRATIONS[i]:
+                conn.execute(stmt)
+            conn.execute(f"PRAGMA user_version={i + 1}")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+    return max(version, len(MIGRATIONS))
+
+def init_db():
+    with connection() as conn:
+        conn.execute(SCHEMA)
+        migrate(conn)
+    load_registry()
+    load_groups()
+
+def load_registry():
+    """(Re)build the in-memory account registry from the DB."""
+    registry.load(list_accounts())
+
+def load_groups():
+    """(Re)compile the group routing table from the DB."""
+    group_routes.load(list_groups())
+
+# ------------------------ accounts ------------------------ #
+
+def _row(r):
+    return {"id": r[0], "account": r[1], "nickname": r[2], "pid": r[3], "last_state": r[4], "created_at": r[5], "delivery": r[6],
+            "auto_restart": bool(r[7])}
+
 def add_account(account, nickname):
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("INSERT INTO accounts (account, nickname) VALUES (?, ?)", (account, nickname))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        acc_id = conn.execute(SQL_INSERT_ACCOUNT, (account, nickname)).lastrowid
+        r = conn.execute(SQL_SELECT_ACCOUNT, (acc_id,)).fetchone()
+    registry.upsert(_row(r))
+    return acc_id
 
 def list_accounts():
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("SELECT id, account, nickname, pid, last_state, created_at FROM accounts ORDER BY id DESC")
-    rows = [{"id": r[0], "account": r[1], "nickname": r[2], "pid": r[3], "last_state": r[4], "created_at": r[5]} for r in c.fetchall()]
-    conn.close()
-    return rows
+    with connection() as conn:
+        return [_row(r) for r in conn.execute(SQL_SELECT_ACCOUNTS).fetchall()]
 
 def get_account(acc_id):
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("SELECT id, account, nickname, pid, last_state FROM accounts WHERE id=?", (acc_id,))
-    r = c.fetchone()
-    conn.close()
+    with connection() as conn:
+        r = conn.execute(SQL_SELECT_ACCOUNT, (acc_id,)).fetchone()
     if not r: return None
-    return {"id": r[0], "account": r[1], "nickname": r[2], "pid": r[3], "last_state": r[4]}
+    return _row(r)
 
 def set_state(acc_id, state):
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("UPDATE accounts SET last_state=? WHERE id=?", (state, acc_id))
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        conn.execute(SQL_SET_STATE, (state, acc_id))
+    registry.update(acc_id, last_state=state)
 
 def set_pid(acc_id, pid):
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("UPDATE accounts SET pid=? WHERE id=?", (pid, acc_id))
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        conn.execute(SQL_SET_PID, (pid, acc_id))
+    registry.update(acc_id, pid=pid)
+
+def set_delivery(acc_id, mode):
+    if mode not in DELIVERY_MODES:
+        raise ValueError(f"delivery must be one of {DELIVERY_MODES}")
+    with connection() as conn:
+        conn.execute(SQL_SET_DELIVERY, (mode, acc_id))
+    registry.update(acc_id, delivery=mode)
+
+def set_auto_restart(acc_id, enabled):
+    with connection() as conn:
+        conn.execute(SQL_SET_AUTO_RESTART, (1 if enabled else 0, acc_id))
+    registry.update(acc_id, auto_restart=bool(enabled))
 
 def delete_account(acc_id):
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("DELETE FROM accounts WHERE id=?", (acc_id,))
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        conn.execute(SQL_DELETE_ACCOUNT, (acc_id,))
+    registry.remove(acc_id)
+
+# ------------------------ groups ------------------------ #
+
+def list_groups():
+    """-> {group name: [Member, ...]} in member order"""
+    out = {}
+    with connection() as conn:
+        for name, account, mult, smap in conn.execute(SQL_SELECT_GROUP_MEMBERS).fetchall():
+            out.setdefault(name, []).append(Member(account, mult, json.loads(smap) if smap else {}))
+    return out
+
+def save_group(name, members):
+    """Create the group or replace its member list, then recompile the routing table."""
+    with transaction() as conn:
+        conn.execute(SQL_UPSERT_GROUP, (name,))
+        group_id = conn.execute(SQL_SELECT_GROUP_ID, (name,)).fetchone()[0]
+        conn.execute(SQL_CLEAR_GROUP_MEMBERS, (group_id,))
+        conn.executemany(SQL_INSERT_GROUP_MEMBER,
+                         [(group_id, m.account, m.volume_mult, json.dumps(m.symbol_map) if m.symbol_map else None, i)
+                          for i, m in enumerate(members)])
+    load_groups()
+
+def delete_group(name):
+    with transaction() as conn:
+        row = conn.execute(SQL_SELECT_GROUP_ID, (name,)).fetchone()
+        if row:
+            conn.execute(SQL_CLEAR_GROUP_MEMBERS, (row[0],))
+            conn.execute("DELETE FROM account_groups WHERE id=?", (row[0],))
+    load_groups()
+    return bool(row)
+
+# ------------------------ batched writes ------------------------ #
+
+class Batch:
+    """Collects account updates and applies them in a single transaction."""
+
+    def __init__(self):
+        self.states = []
+        self.pids = []
+
+    def set_state(self, acc_id, state):
+        self.states.append((state, acc_id))
+
+    def set_pid(self, acc_id, pid):
+        self.pids.append((pid, acc_id))
+
+    def __len__(self):
+        return len(self.states) + len(self.pids)
+
+    def apply(self):
+        if not len(self):
+            return
+        with transaction() as conn:
+            if self.pids:
+                conn.executemany(SQL_SET_PID, self.pids)
+            if self.states:
+                conn.executemany(SQL_SET_STATE, self.states)
+        for pid, acc_id in self.pids:
+            registry.update(acc_id, pid=pid)
+        for state, acc_id in self.states:
+            registry.update(acc_id, last_state=state)
+
+@contextmanager
+def batch():
+    """
+    with batch() as b:
+        b.set_state(1, "online"); b.set_pid(2, None)
+    -> one BEGIN IMMEDIATE ... COMMIT on exit (nothing is written on error).
+    """
+    b = Batch()
+    yield b
+    b.apply()
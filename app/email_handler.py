@@ -1,27 +1,54 @@
-import smtplib, ssl, os
-from email.message import EmailMessage
+import os
+from typing import TYPE_CHECKING
 
-def send_email(subject: str, body: str) -> bool:
-    host = os.getenv("SMTP_HOST", "")
-    port = int(os.getenv("SMTP_PORT", "587"))
-    user = os.getenv("SMTP_USER", "")
-    passwd = os.getenv("SMTP_PASS", "")
-    sender = os.getenv("SMTP_FROM", "alerts@example.com")
-    to = os.getenv("SMTP_TO", "")
+# smtplib/ssl/email are imported on first send: they are a large share of
+# server import time and most processes never send mail
+if TYPE_CHECKING:
+    import smtplib
+    from email.message import EmailMessage
 
-    if not host or not to:
-        return False  # SMTP not configured
+def smtp_config() -> dict:
+    return {
+        "host": os.getenv("SMTP_HOST", ""),
+        "port": int(os.getenv("SMTP_PORT", "587")),
+        "user": os.getenv("SMTP_USER", ""),
+        "passwd": os.getenv("SMTP_PASS", ""),
+        "sender": os.getenv("SMTP_FROM", "alerts@example.com"),
+        "to": os.getenv("SMTP_TO", ""),
+        "starttls": os.getenv("SMTP_STARTTLS", "true").lower() == "true",
+        "timeout": float(os.getenv("SMTP_TIMEOUT", "15")),
+    }
 
+def build_message(cfg: dict, subject: str, body: str) -> "EmailMessage":
+    from email.message import EmailMessage
     msg = EmailMessage()
-    msg["From"] = sender
-    msg["To"] = to
+    msg["From"] = cfg["sender"]
+    msg["To"] = cfg["to"]
     msg["Subject"] = subject
     msg.set_content(body)
+    return msg
+
+def smtp_connect(cfg: dict) -> "smtplib.SMTP":
+    import smtplib, ssl
+    s = smtplib.SMTP(cfg["host"], cfg["port"], timeout=cfg["timeout"])
+    try:
+        if cfg["starttls"]:
+            s.starttls(context=ssl.create_default_context())
+        if cfg["user"] and cfg["passwd"]:
+            s.login(cfg["user"], cfg["passwd"])
+    except Exception:
+        s.close()
+        raise
+    return s
+
+def send_email(subject: str, body: str) -> bool:
+    """Synchronous one-shot send. Request handlers should use
+    app.alert_dispatcher.send_alert instead, which never blocks."""
+    cfg = smtp_config()
+    if not cfg["host"] or not cfg["to"]:
+        return False  # SMTP not configured
 
-    ctx = ssl.create_default_context()
-    with smtplib.SMTP(host, port) as s:
-        s.starttls(context=ctx)
-        if user and passwd:
-            s.login(user, passwd)
+    msg = build_message(cfg, subject, body)
+    with smtp_connect(cfg) as s:
         s.send_message(msg)
     return True
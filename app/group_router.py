@@ -0,0 +1,88 @@
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+class Member(NamedTuple):
+    account: str
+    volume_mult: float
+    symbol_map: Dict[str, str]   # upper-case alert symbol -> symbol to send this member
+
+def parse_members(items: Any) -> List[Member]:
+    """Validate the members of a PUT /groups/<name> body; raises ValueError."""
+    if not isinstance(items, list) or not items:
+        raise ValueError("members must be a non-empty list")
+    out, seen = [], set()
+    for i, m in enumerate(items):
+        if not isinstance(m, dict):
+            raise ValueError(f"members[{i}] must be an object")
+        account = str(m.get("account") or "").strip()
+        if not account:
+            raise ValueError(f"members[{i}]: account is required")
+        if account in seen:
+            raise ValueError(f"members[{i}]: duplicate account {account}")
+        seen.add(account)
+        try:
+            mult = float(m.get("volume_mult", 1.0))
+        except (TypeError, ValueError):
+            raise ValueError(f"members[{i}]: volume_mult must be a number")
+        if mult <= 0:
+            raise ValueError(f"members[{i}]: volume_mult must be > 0")
+        smap = m.get("symbol_map") or {}
+        if not isinstance(smap, dict) or not all(isinstance(k, str) and isinstance(v, str) and v.strip()
+                                                 for k, v in smap.items()):
+            raise ValueError(f"members[{i}]: symbol_map must map symbol -> symbol")
+        out.append(Member(account, mult, {k.strip().upper(): v.strip() for k, v in smap.items()}))
+    return out
+
+class GroupRouter:
+    """Routing table for copy-trading groups: group name -> members.
+
+    Compiled from the account_groups / group_members tables (app/db.py) at
+    startup and after every group change, so a webhook naming a group is
+    expanded into per-member signals without touching the DB.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[str, Tuple[Member, ...]] = {}
+
+    def load(self, groups: Dict[str, List[Member]]) -> None:
+        routes = {name: tuple(members) for name, members in groups.items()}
+        with self._lock:
+            self._routes = routes
+
+    def get(self, name: str) -> Optional[Tuple[Member, ...]]:
+        with self._lock:
+            return self._routes.get(str(name))
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return sorted(self._routes)
+
+    def expand(self, name: str, payload: Dict[str, Any]) -> Optional[List[Tuple[Member, Dict[str, Any]]]]:
+        """One signal per member: account_number set, volume scaled, symbol overridden.
+        Returns None for an unknown group. A member whose scaled volume cannot be
+        computed gets the original payload and fails in normalization."""
+        members = self.get(name)
+        if members is None:
+            return None
+        symbol = str(payload.get("symbol") or "").strip().upper()
+        legs = []
+        for m in members:
+            leg = dict(payload)
+            leg.pop("group", None)
+            leg["account_number"] = m.account
+            if "volume" in payload:
+                try:
+                    leg["volume"] = round(float(payload["volume"]) * m.volume_mult, 2)
+                except (TypeError, ValueError):
+                    pass
+            if symbol in m.symbol_map:
+                leg["symbol"] = m.symbol_map[symbol]
+            legs.append((m, leg))
+        return legs
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._routes)
+
+group_routes = GroupRouter()
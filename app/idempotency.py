@@ -0,0 +1,146 @@
+"""
+Idempotency cache for retried webhooks.
+
+TradingView and Cloudflare re-send a webhook when the first attempt times
+out; without dedup every retry is normalized and written again (a second
+order). Each request gets a key:
+
+- the payload's `idempotency_key` field (or the Idempotency-Key header), or
+- in IDEMPOTENCY_MODE=hash, a SHA-256 of the canonical JSON payload
+  (sorted keys, no whitespace), so byte-different but equal bodies match.
+
+begin(key) returns the stored response for a key that already succeeded
+(hit), or claims the key (miss). A retry arriving while the first attempt
+is still running waits for it instead of racing it. Only successful
+outcomes are stored (done()); failures call abandon() so the retry runs the
+pipeline again.
+
+Entries live in an LRU bounded by `max_entries` and expire after `ttl`
+(explicit keys) or `hash_ttl` (payload hashes: identical alerts far apart
+are separate orders). With persist=True entries are also written to the
+idempotency table of data.db and reloaded at start, so dedup survives a
+restart.
+"""
+import json, time, hashlib, threading, logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from .db import connection
+
+logger = logging.getLogger(__name__)
+
+MODES = ("off", "key", "hash")
+
+SQL_PUT = "INSERT OR REPLACE INTO idempotency (key, expires_at, response) VALUES (?, ?, ?)"
+SQL_LOAD = "SELECT key, expires_at, response FROM idempotency WHERE expires_at > ? ORDER BY expires_at"
+SQL_PRUNE = "DELETE FROM idempotency WHERE expires_at <= ?"
+
+def canonical_hash(payload: Any) -> str:
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+class IdempotencyCache:
+    def __init__(self, mode: str = "key", ttl: float = 86400.0, hash_ttl: float = 120.0,
+                 max_entries: int = 10000, persist: bool = False, wait: float = 10.0):
+        self.mode = mode if mode in MODES else "key"
+        self.ttl = ttl
+        self.hash_ttl = hash_ttl
+        self.max_entries = max_entries
+        self.persist = persist
+        self.wait = wait
+        self._d: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()   # key -> (expires_at, response)
+        self._pending: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._next_prune = 0.0
+        self.hits = self.misses = self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def key_for(self, scope: str, payload: Any, header: Optional[str] = None) -> Optional[Tuple[str, float]]:
+        """-> (cache key, ttl), or None when this request is not deduplicated."""
+        if not self.enabled:
+            return None
+        explicit = header or (payload.get("idempotency_key") if isinstance(payload, dict) else None)
+        if explicit not in (None, ""):
+            return f"{scope}:k:{explicit}", self.ttl
+        if self.mode == "hash":
+            return f"{scope}:h:{canonical_hash(payload)}", self.hash_ttl
+        return None
+
+    # ------------------------ lookup / claim ------------------------ #
+
+    def _get(self, key: str, now: float):
+        entry = self._d.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            del self._d[key]
+            return None
+        self._d.move_to_end(key)
+        return entry[1]
+
+    def begin(self, key: str) -> Tuple[bool, Any]:
+        """(True, stored response) on a hit; (False, None) when the caller now owns the key
+        and must call done() or abandon()."""
+        deadline = time.time() + self.wait
+        while True:
+            with self._lock:
+                now = time.time()
+                hit = self._get(key, now)
+                if hit is not None:
+                    self.hits += 1
+                    return True, hit
+                ev = self._pending.get(key)
+                if ev is None or now >= deadline:
+                    # first attempt (or the in-flight one is stuck): this caller runs it
+                    self._pending[key] = threading.Event()
+                    self.misses += 1
+                    return False, None
+            ev.wait(max(0.0, deadline - time.time()))
+
+    def done(self, key: str, ttl: float, response: Any) -> None:
+        now = time.time()
+        with self._lock:
+            self._d[key] = (now + ttl, response)
+            self._d.move_to_end(key)
+            while len(self._d) > self.max_entries:
+                self._d.popitem(last=False)
+                self.evictions += 1
+            ev = self._pending.pop(key, None)
+        if ev:
+            ev.set()
+        if self.persist:
+            try:
+                with connection() as conn:
+                    conn.execute(SQL_PUT, (key, now + ttl, json.dumps(response, ensure_ascii=False)))
+                    if now >= self._next_prune:
+                        self._next_prune = now + 300
+                        conn.execute(SQL_PRUNE, (now,))
+            except Exception:
+                logger.exception("idempotency persist failed")
+
+    def abandon(self, key: str) -> None:
+        with self._lock:
+            ev = self._pending.pop(key, None)
+        if ev:
+            ev.set()
+
+    # ------------------------ persistence / stats ------------------------ #
+
+    def load(self) -> int:
+        """Reload unexpired persisted entries (persist=True). Returns how many."""
+        if not self.persist:
+            return 0
+        with connection() as conn:
+            rows = conn.execute(SQL_LOAD, (time.time(),)).fetchall()
+        with self._lock:
+            for key, expires_at, response in rows[-self.max_entries:]:
+                self._d[key] = (expires_at, json.loads(response))
+        return len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {"mode": self.mode, "entries": len(self._d), "in_flight": len(self._pending),
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_ratio": round(self.hits / total, 4) if total else None, "persist": self.persist}
@@ -0,0 +1,236 @@
+"""
+Durable fast-ack ingestion queue (INGEST_MODE=async).
+
+The webhook only checks the token/JSON, inserts the raw payload into the
+ingest_queue table (one autocommit INSERT in WAL mode) and answers 202 with
+the signal id. Worker threads claim queued rows, run the normal
+normalize -> lookup -> deliver path and store the outcome, which
+GET /signals/<id> reports.
+
+Signals for one account keep their order: each account_number (or group
+name) hashes to one lane served by one worker, and while a row is waiting
+out a Retry delay, later rows with the same key are held back behind it.
+
+Row status: queued -> processing -> delivered | rejected | failed.
+- process_fn raising Retry (backpressure, write error) puts the row back to
+  'queued' with a not_before delay until max_attempts is reached ('failed').
+- Rows left in 'processing' by a crash are re-queued at start(), so an
+  accepted signal is never lost by a restart (it may be delivered twice if
+  the crash happened between the write and the status update).
+- Finished rows are pruned after `retention` seconds.
+"""
+import json, time, uuid, zlib, queue, threading, logging
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from .db import connection
+
+logger = logging.getLogger(__name__)
+
+FINAL = ("delivered", "rejected", "failed")
+
+SQL_ENQUEUE = ("INSERT INTO ingest_queue (id, received_at, client_ip, payload, status, updated_at) "
+               "VALUES (?, ?, ?, ?, 'queued', ?)")
+SQL_CLAIM = ("UPDATE ingest_queue SET status='processing', attempts=attempts+1, updated_at=? "
+             "WHERE id=? AND status='queued'")
+SQL_LOAD = "SELECT payload, client_ip, attempts FROM ingest_queue WHERE id=?"
+SQL_FINISH = "UPDATE ingest_queue SET status=?, result=?, error=?, updated_at=? WHERE id=?"
+SQL_REQUEUE = "UPDATE ingest_queue SET status='queued', error=?, not_before=?, updated_at=? WHERE id=?"
+SQL_GET = ("SELECT id, received_at, status, attempts, result, error, updated_at "
+           "FROM ingest_queue WHERE id=?")
+
+class Retry(Exception):
+    """Raised by process_fn for transient failures (backpressure, write errors)."""
+
+    def __init__(self, message: str, delay: float = 5.0):
+        super().__init__(message)
+        self.delay = delay
+
+def _order_key(payload: Any) -> str:
+    """Signals sharing this key are processed in arrival order."""
+    if not isinstance(payload, dict):
+        return ""
+    if payload.get("group") not in (None, ""):
+        return f"group:{payload['group']}"
+    return str(payload.get("account_number") or "").strip()
+
+class _Lane:
+    """One worker's share of the keys. held/due are only touched under IngestQueue._lock."""
+
+    def __init__(self):
+        self.q: "queue.Queue[Tuple[str, str]]" = queue.Queue()    # (signal id, key)
+        self.held: Dict[str, Deque[str]] = {}     # key -> [delayed row, later rows...]
+        self.due: Dict[str, float] = {}           # key -> not_before of its delayed row
+
+class IngestQueue:
+    def __init__(self, process_fn: Callable[[Any, str, str], Dict[str, Any]], workers: int = 4,
+                 max_attempts: int = 5, retention: float = 86400.0, poll: float = 1.0):
+        """process_fn(payload, client_ip, signal_id) -> result dict (delivered); raises ValueError
+        (rejected) or Retry (try again later)."""
+        self.process_fn = process_fn
+        self.workers = max(1, workers)
+        self.max_attempts = max_attempts
+        self.retention = retention
+        self.poll = poll
+        self._lanes: List[_Lane] = [_Lane() for _ in range(self.workers)]
+        self._lock = threading.Lock()
+        self._threads = []
+        self._next_prune = 0.0
+
+    # ------------------------ ingress ------------------------ #
+
+    def _lane(self, key: str) -> _Lane:
+        return self._lanes[zlib.crc32(key.encode("utf-8")) % len(self._lanes)]
+
+    def enqueue(self, payload: Any, client_ip: str = "") -> str:
+        sig_id = uuid.uuid4().hex
+        now = time.time()
+        with connection() as conn:
+            conn.execute(SQL_ENQUEUE, (sig_id, now, client_ip,
+                                       json.dumps(payload, ensure_ascii=False, separators=(",", ":")), now))
+        key = _order_key(payload)
+        self._lane(key).q.put((sig_id, key))
+        return sig_id
+
+    def get(self, sig_id: str) -> Optional[Dict[str, Any]]:
+        with connection() as conn:
+            r = conn.execute(SQL_GET, (sig_id,)).fetchone()
+        if not r:
+            return None
+        return {"id": r[0], "received_at": r[1], "status": r[2], "attempts": r[3],
+                "result": json.loads(r[4]) if r[4] else None, "error": r[5], "updated_at": r[6]}
+
+    def stats(self) -> Dict[str, int]:
+        with connection() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM ingest_queue GROUP BY status").fetchall()
+        out = {s: 0 for s in ("queued", "processing") + FINAL}
+        out.update({s: n for s, n in rows})
+        return out
+
+    # ------------------------ workers ------------------------ #
+
+    def _claim(self, sig_id: str) -> Optional[Tuple[Any, str, int]]:
+        with connection() as conn:
+            if conn.execute(SQL_CLAIM, (time.time(), sig_id)).rowcount != 1:
+                return None    # another worker got it, or it is already finished
+            payload, client_ip, attempts = conn.execute(SQL_LOAD, (sig_id,)).fetchone()
+        return json.loads(payload), client_ip or "", attempts
+
+    def _finish(self, sig_id: str, status: str, result=None, error: Optional[str] = None) -> None:
+        with connection() as conn:
+            conn.execute(SQL_FINISH, (status, json.dumps(result) if result is not None else None,
+                                      error, time.time(), sig_id))
+
+    def _process(self, sig_id: str) -> Optional[float]:
+        """Run one row. Returns its not_before if it was put back for a retry, else None."""
+        claimed = self._claim(sig_id)
+        if claimed is None:
+            return None
+        payload, client_ip, attempts = claimed
+        try:
+            result = self.process_fn(payload, client_ip, sig_id)
+        except Retry as e:
+            if attempts >= self.max_attempts:
+                self._finish(sig_id, "failed", error=f"{e} (after {attempts} attempts)")
+                return None
+            due = time.time() + e.delay
+            with connection() as conn:
+                conn.execute(SQL_REQUEUE, (str(e), due, time.time(), sig_id))
+            return due
+        except Exception as e:
+            self._finish(sig_id, "rejected", error=str(e))
+        else:
+            self._finish(sig_id, "delivered", result=result)
+        return None
+
+    def _run(self, lane: _Lane, key: str, pending: Deque[str]) -> None:
+        """Process `pending` in order; on a retry delay, park the rest of it behind that row."""
+        while pending:
+            due = self._process(pending[0])
+            if due is not None:
+                with self._lock:
+                    lane.held[key], lane.due[key] = pending, due
+                return
+            pending.popleft()
+
+    def _release_due(self, lane: _Lane) -> None:
+        now = time.time()
+        with self._lock:
+            ready = [(k, lane.held.pop(k)) for k, t in list(lane.due.items()) if t <= now]
+            for k, _ in ready:
+                del lane.due[k]
+        for key, pending in ready:
+            self._run(lane, key, pending)
+
+    def _prune(self) -> None:
+        now = time.time()
+        if now < self._next_prune:
+            return
+        self._next_prune = now + min(3600.0, max(60.0, self.retention / 10))
+        with connection() as conn:
+            n = conn.execute(f"DELETE FROM ingest_queue WHERE status IN {FINAL} AND updated_at < ?",
+                             (now - self.retention,)).rowcount
+        if n:
+            logger.info("[INGEST] pruned %d finished signals", n)
+
+    def _worker(self, lane: _Lane) -> None:
+        while True:
+            try:
+                item = lane.q.get(timeout=self.poll)
+            except queue.Empty:
+                item = None
+            try:
+                self._release_due(lane)
+                if item is None:
+                    self._prune()
+                    continue
+                sig_id, key = item
+                with self._lock:
+                    held = lane.held.get(key)
+                    if held is not None:
+                        held.append(sig_id)     # an earlier signal for this key is waiting
+                if held is None:
+                    self._run(lane, key, deque([sig_id]))
+            except Exception:
+                logger.exception("ingest worker error")
+
+    def recover(self) -> int:
+        """Re-queue rows left 'processing' by a crash and load every pending id."""
+        with connection() as conn:
+            conn.execute("UPDATE ingest_queue SET status='queued', updated_at=? WHERE status='processing'",
+                         (time.time(),))
+            rows = conn.execute("SELECT id, not_before, payload FROM ingest_queue WHERE status='queued' "
+                                "ORDER BY received_at").fetchall()
+        now = time.time()
+        queued = set()      # keys with an earlier row already queued: later delays are ignored
+        for sig_id, not_before, payload in rows:
+            try:
+                key = _order_key(json.loads(payload))
+            except ValueError:
+                key = ""
+            lane = self._lane(key)
+            with self._lock:
+                if key in lane.held:
+                    lane.held[key].append(sig_id)
+                    continue
+                if not_before > now and key not in queued:
+                    lane.held[key], lane.due[key] = deque([sig_id]), not_before
+                    continue
+            queued.add(key)
+            lane.q.put((sig_id, key))
+        return len(rows)
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        n = self.recover()
+        if n:
+            logger.info("[INGEST] recovered %d pending signals", n)
+        for i, lane in enumerate(self._lanes):
+            t = threading.Thread(target=self._worker, args=(lane,), name=f"ingest-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def depth(self) -> int:
+        with self._lock:
+            held = sum(len(p) for lane in self._lanes for p in lane.held.values())
+        return sum(lane.q.qsize() for lane in self._lanes) + held
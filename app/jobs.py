@@ -0,0 +1,131 @@
+"""
+Background jobs for slow account lifecycle work (register / open / stop / restart).
+
+A job is a list of items processed by one shared, bounded thread pool. Each
+job has its own concurrency cap: only that many of its items are in flight
+at once, the next item is launched as soon as one finishes, so a 50-account
+restart cannot monopolize the pool ahead of other jobs. Status and per-item
+results are kept in memory for the most recent `history` jobs.
+"""
+import time, uuid, threading, logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class JobQueueFull(Exception):
+    pass
+
+class Job:
+    def __init__(self, kind: str, items: List[Any], concurrency: int, label: Callable[[Any], str]):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.items = list(items)
+        self.concurrency = max(1, concurrency)
+        self.label = label
+        self.status = "queued"
+        self.results: List[Optional[Dict[str, Any]]] = [None] * len(self.items)
+        self.done = 0
+        self.failed = 0
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._next = 0
+        self._inflight = 0
+        self._finished = threading.Event()
+
+    @property
+    def total(self) -> int:
+        return len(self.items)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._finished.wait(timeout)
+
+    def to_dict(self, with_items: bool = True) -> Dict[str, Any]:
+        d = {
+            "id": self.id, "kind": self.kind, "status": self.status,
+            "total": self.total, "done": self.done, "failed": self.failed,
+            "progress": round(self.done / self.total, 3) if self.total else 1.0,
+            "concurrency": self.concurrency,
+            "created_at": self.created_at, "started_at": self.started_at, "finished_at": self.finished_at,
+        }
+        if with_items:
+            d["items"] = [r if r is not None else {"item": self.label(it), "status": "pending"}
+                          for it, r in zip(self.items, self.results)]
+        return d
+
+class JobManager:
+    def __init__(self, max_workers: int = 4, max_active: int = 20, history: int = 200,
+                 max_concurrency: int = 8):
+        self.max_active = max_active
+        self.history = history
+        self.max_concurrency = max_concurrency
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, items: List[Any], fn: Callable[[Any], Dict[str, Any]],
+               concurrency: int = 4, label: Callable[[Any], str] = str) -> Job:
+        """Queue fn(item) for every item. fn returns a result dict or raises."""
+        job = Job(kind, items, min(concurrency, self.max_concurrency), label)
+        with self._lock:
+            active = sum(1 for j in self._jobs.values() if j.status in ("queued", "running"))
+            if active >= self.max_active:
+                raise JobQueueFull(f"Too many active jobs ({active})")
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.history:
+                oldest = next(iter(self._jobs.values()))
+                if oldest.status in ("queued", "running"):
+                    break
+                self._jobs.popitem(last=False)
+            if not job.items:
+                self._finish(job)
+                return job
+            for _ in range(min(job.concurrency, job.total)):
+                self._launch(job, fn)
+        return job
+
+    def _launch(self, job: Job, fn: Callable) -> None:
+        # caller holds self._lock
+        i = job._next
+        job._next += 1
+        job._inflight += 1
+        if job.status == "queued":
+            job.status = "running"
+            job.started_at = time.time()
+        self._pool.submit(self._run_item, job, fn, i)
+
+    def _run_item(self, job: Job, fn: Callable, i: int) -> None:
+        item = job.items[i]
+        t0 = time.time()
+        try:
+            res = {"item": job.label(item), "status": "ok", **(fn(item) or {})}
+        except Exception as e:
+            logger.exception("job %s (%s) item %s failed", job.id, job.kind, job.label(item))
+            res = {"item": job.label(item), "status": "error", "error": str(e)}
+        res["elapsed"] = round(time.time() - t0, 3)
+        with self._lock:
+            job.results[i] = res
+            job.done += 1
+            if res["status"] != "ok":
+                job.failed += 1
+            job._inflight -= 1
+            if job._next < job.total:
+                self._launch(job, fn)
+            elif job._inflight == 0:
+                self._finish(job)
+
+    @staticmethod
+    def _finish(job: Job) -> None:
+        job.status = "done" if not job.failed else ("failed" if job.failed == job.total else "partial")
+        job.finished_at = time.time()
+        job._finished.set()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            return list(reversed(self._jobs.values()))
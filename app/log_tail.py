@@ -0,0 +1,144 @@
+"""
+Tail and incremental reads of a (rotating) log file without reading it whole.
+
+- tail(path, n): seeks backwards from the end in blocks until n lines are
+  found, continuing into path.1 when the current file is short (just rotated).
+- read_since(path, cursor): returns the complete lines appended after a
+  cursor. A cursor is "<file id>:<byte offset>" where the file id is the
+  inode (file index on Windows), so it survives rotation: if the cursor's file
+  was renamed to path.1 (path.2, ...), the rest of that file is returned first
+  and then the new file from the start. A file shorter than the offset
+  (truncated) or a file id that is no longer found restarts at the current
+  file's beginning with reset=True.
+
+Only whole lines are returned; a line still being written stays behind the
+cursor until its newline arrives.
+"""
+import os
+from typing import List, Optional, Tuple
+
+BLOCK = 64 * 1024
+
+def _file_id(st: os.stat_result) -> str:
+    return f"{st.st_ino:x}"
+
+def make_cursor(st: os.stat_result, offset: int) -> str:
+    return f"{_file_id(st)}:{offset}"
+
+def parse_cursor(cursor: Optional[str]) -> Optional[Tuple[str, int]]:
+    if not cursor:
+        return None
+    fid, _, off = cursor.partition(":")
+    try:
+        return fid, int(off)
+    except ValueError:
+        return None
+
+def rotated_paths(path: str, backups: int = 9) -> List[str]:
+    """path.1, path.2, ... (newest first) as written by RotatingFileHandler."""
+    out = []
+    for i in range(1, backups + 1):
+        p = f"{path}.{i}"
+        if not os.path.exists(p):
+            break
+        out.append(p)
+    return out
+
+def _decode(chunk: bytes) -> List[str]:
+    return chunk.decode("utf-8", "replace").splitlines(keepends=True)
+
+def _tail_file(path: str, n: int, end: Optional[int] = None) -> Tuple[List[bytes], int]:
+    """Last n complete lines of one file (up to byte `end`) -> (lines, end)."""
+    with open(path, "rb") as f:
+        if end is None:
+            f.seek(0, os.SEEK_END)
+            end = f.tell()
+        pos, buf = end, b""
+        # n lines need n+1 newlines unless we reach the start of the file
+        while pos > 0 and buf.count(b"\n") <= n:
+            step = min(BLOCK, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+    cut = buf.rfind(b"\n") + 1          # drop a trailing partial line
+    lines = buf[:cut].splitlines(keepends=True)
+    if pos > 0:
+        lines = lines[1:]                # first one may be partial
+    return lines[-n:] if n else [], end - (len(buf) - cut)
+
+def tail(path: str, n: int = 200, backups: int = 9) -> Tuple[List[str], Optional[str]]:
+    """Last n lines (across rotation) and the cursor just after them."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return [], None
+    lines, end = _tail_file(path, n)
+    for older in rotated_paths(path, backups):
+        if len(lines) >= n:
+            break
+        try:
+            more, _ = _tail_file(older, n - len(lines))
+        except OSError:
+            break
+        lines = more + lines
+    return _decode(b"".join(lines)), make_cursor(st, end)
+
+def _read_range(path: str, offset: int, max_bytes: int) -> Tuple[bytes, int]:
+    """Whole lines from offset, at most max_bytes (unless a single line is longer)."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read(max_bytes)
+    cut = data.rfind(b"\n") + 1
+    if cut == 0 and max_bytes and len(data) == max_bytes:
+        cut = len(data)                  # one line longer than max_bytes: hand it out in pieces
+    return data[:cut], offset + cut
+
+def read_since(path: str, cursor: Optional[str], max_bytes: int = 1024 * 1024,
+               backups: int = 9) -> Tuple[List[str], Optional[str], bool]:
+    """-> (new lines, next cursor, reset). With no/invalid cursor: start at the current end."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return [], cursor, False
+    parsed = parse_cursor(cursor)
+    if parsed is None:
+        return [], make_cursor(st, st.st_size), cursor is not None
+
+    fid, offset = parsed
+    if fid == _file_id(st):
+        if offset > st.st_size:                      # truncated in place
+            data, end = _read_range(path, 0, max_bytes)
+            return _decode(data), make_cursor(st, end), True
+        data, end = _read_range(path, offset, max_bytes)
+        return _decode(data), make_cursor(st, end), False
+
+    # cursor points at a file that has been rotated away: finish it, then walk forward
+    chain = rotated_paths(path, backups)
+    ids = []
+    for p in chain:
+        try:
+            ids.append(_file_id(os.stat(p)))
+        except OSError:
+            ids.append(None)
+    if fid not in ids:
+        data, end = _read_range(path, 0, max_bytes)
+        return _decode(data), make_cursor(st, end), True
+
+    out, budget = b"", max_bytes
+    idx = ids.index(fid)
+    for i in range(idx, -1, -1):                     # oldest relevant backup -> path.1
+        p = chain[i]
+        try:
+            pst = os.stat(p)
+            data, end = _read_range(p, offset, budget)
+        except OSError:
+            offset = 0
+            continue
+        out += data
+        budget -= len(data)
+        if (end < pst.st_size and data) or budget <= 0:
+            # stopped inside this backup; resume there next time
+            return _decode(out), make_cursor(pst, end), False
+        offset = 0
+    data, end = _read_range(path, 0, max(budget, 0)) if budget > 0 else (b"", 0)
+    return _decode(out + data), make_cursor(st, end), False
@@ -0,0 +1,187 @@
+"""
+Low-overhead in-process metrics with Prometheus text exposition.
+
+- Histogram: fixed bucket bounds (log-spaced, 50us .. 10s by default); an
+  observation is one bisect + two adds under a lock. p50/p95/p99 are estimated
+  by linear interpolation inside the bucket that holds the quantile.
+- Counters: plain floats keyed by (name, label values).
+- Stopwatch: lap-based timing of consecutive pipeline stages.
+
+Label sets per metric name are capped (max_series); anything beyond the cap
+is folded into label value "other" so per-account / per-symbol counters
+cannot grow without bound.
+"""
+import time, bisect, threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+def default_buckets() -> List[float]:
+    """50us .. ~10s, about 4 buckets per decade."""
+    out, b = [], 50e-6
+    while b < 10.0:
+        out.append(round(b, 7))
+        b *= 1.8
+    out.append(10.0)
+    return out
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: List[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)   # last bucket = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, v: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, v)] += 1
+        self.sum += v
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if seen + c >= rank and c:
+                lo = self.bounds[i - 1] if i > 0 else 0.0
+                hi = self.bounds[i] if i < len(self.bounds) else self.bounds[-1]
+                return lo + (hi - lo) * ((rank - seen) / c)
+            seen += c
+        return self.bounds[-1]
+
+def _fmt_labels(labels: Labels, extra: Iterable[Tuple[str, str]] = ()) -> str:
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in items) + "}"
+
+def _fmt_num(v: float) -> str:
+    return repr(float(v)) if v != int(v) else str(int(v))
+
+class Metrics:
+    def __init__(self, buckets: Optional[List[float]] = None, max_series: int = 2000):
+        self.buckets = buckets or default_buckets()
+        self.max_series = max_series
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._hists: Dict[str, Dict[Labels, Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self._bounds: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, text: str, buckets: Optional[List[float]] = None) -> None:
+        """Help text; `buckets` overrides the default bounds for histogram `name`."""
+        self._help[name] = text
+        if buckets:
+            self._bounds[name] = sorted(buckets)
+
+    def _key(self, series: Dict, labels: Dict[str, str]) -> Labels:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        if key in series or len(series) < self.max_series:
+            return key
+        # cardinality cap: keep the label names, fold the values
+        return tuple((k, "other") for k, _ in key)
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = self._key(series, labels)
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        with self._lock:
+            series = self._hists.setdefault(name, {})
+            key = self._key(series, labels)
+            h = series.get(key)
+            if h is None:
+                h = series[key] = Histogram(self._bounds.get(name, self.buckets))
+            h.observe(seconds)
+
+    # ------------------------ reading ------------------------ #
+
+    def summary(self) -> Dict[str, Dict]:
+        """{histogram name: {label string: {count, sum, p50, p95, p99}}} for JSON views."""
+        out: Dict[str, Dict] = {}
+        with self._lock:
+            for name, series in self._hists.items():
+                out[name] = {}
+                for labels, h in series.items():
+                    row = {"count": h.count, "sum": round(h.sum, 6)}
+                    for q in QUANTILES:
+                        v = h.quantile(q)
+                        row[f"p{int(q * 100)}"] = round(v, 6) if v is not None else None
+                    out[name][_fmt_labels(labels) or "{}"] = row
+        return out
+
+    def counters(self, name: str) -> Dict[Labels, float]:
+        with self._lock:
+            return dict(self._counters.get(name, {}))
+
+    def render(self) -> str:
+        """Prometheus text format 0.0.4."""
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted(self._counters):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, v in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_fmt_labels(labels)} {_fmt_num(v)}")
+            for name in sorted(self._hists):
+                series = self._hists[name]
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, h in sorted(series.items()):
+                    cum = 0
+                    for bound, c in zip(h.bounds, h.counts):
+                        cum += c
+                        lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', repr(bound))])} {cum}")
+                    lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', '+Inf')])} {h.count}")
+                    lines.append(f"{name}_sum{_fmt_labels(labels)} {repr(h.sum)}")
+                    lines.append(f"{name}_count{_fmt_labels(labels)} {h.count}")
+                # precomputed quantiles for dashboards that do not run histogram_quantile()
+                qname = f"{name}_quantile"
+                lines.append(f"# TYPE {qname} gauge")
+                for labels, h in sorted(series.items()):
+                    for q in QUANTILES:
+                        v = h.quantile(q)
+                        if v is not None:
+                            lines.append(f"{qname}{_fmt_labels(labels, [('quantile', str(q))])} {repr(v)}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._hists.clear()
+
+class Stopwatch:
+    """sw.lap("parse") records the time since the previous lap under that stage name."""
+    __slots__ = ("start", "_last", "laps")
+
+    def __init__(self):
+        self.start = self._last = time.perf_counter()
+        self.laps: List[Tuple[str, float]] = []
+
+    def lap(self, stage: str) -> None:
+        now = time.perf_counter()
+        self.laps.append((stage, now - self._last))
+        self._last = now
+
+    def total(self) -> float:
+        return self._last - self.start
+
+    def record(self, metrics: Metrics, name: str, **labels) -> None:
+        for stage, dt in self.laps:
+            metrics.observe(name, dt, stage=stage, **labels)
+        metrics.observe(name, self.total(), stage="total", **labels)
+
+    def breakdown(self) -> str:
+        return " ".join(f"{s}={dt * 1000:.2f}ms" for s, dt in self.laps)
+
+metrics = Metrics()
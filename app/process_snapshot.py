@@ -0,0 +1,127 @@
+"""
+Process-table snapshot for liveness checks.
+
+One psutil.process_iter() pass per `interval` answers every is_alive() query
+in between, instead of one psutil.Process() per account per request.
+PID reuse is guarded by create_time: the first time a PID is tracked (at
+spawn, or on first sighting) its create_time is recorded, and a later process
+with the same PID but a different create_time counts as dead.
+
+Children spawned by SessionManager are also watched by a waiter thread
+(Popen.wait -> waitpid / WaitForSingleObject), so their exit is known
+immediately and exit listeners fire without waiting for the next scan.
+"""
+import time, threading, logging
+from typing import Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# create_time resolution differs per platform; treat closer than this as equal
+_CT_TOLERANCE = 0.05
+
+class ProcessSnapshot:
+    def __init__(self, interval: float = 2.0):
+        self.interval = interval
+        self._table: Dict[int, Optional[float]] = {}   # live (non-zombie) pid -> create_time
+        self._taken = 0.0
+        self._identity: Dict[int, float] = {}          # tracked pid -> expected create_time
+        self._exited: Set[int] = set()                  # watched children known to be gone
+        self._listeners: List[Callable[[int], None]] = []
+        self._lock = threading.Lock()
+        self._scan_lock = threading.Lock()
+
+    # ------------------------ snapshot ------------------------ #
+
+    def refresh(self, force: bool = False) -> None:
+        if not force and time.monotonic() - self._taken < self.interval:
+            return
+        # one scanner at a time; concurrent callers keep using the previous table
+        if not self._scan_lock.acquire(blocking=force):
+            return
+        try:
+            if not force and time.monotonic() - self._taken < self.interval:
+                return
+            import psutil   # deferred: ~10 ms of server import time
+            table = {}
+            for p in psutil.process_iter(["pid", "create_time", "status"], ad_value=None):
+                info = p.info
+                if info["status"] == psutil.STATUS_ZOMBIE:
+                    continue
+                table[info["pid"]] = info["create_time"]
+            with self._lock:
+                self._table = table
+                self._taken = time.monotonic()
+        finally:
+            self._scan_lock.release()
+
+    def is_alive(self, pid: Optional[int]) -> bool:
+        if not pid:
+            return False
+        try:
+            pid = int(pid)
+        except (TypeError, ValueError):
+            return False
+        self.refresh()
+        with self._lock:
+            if pid in self._exited:
+                return False
+            if pid not in self._table:
+                return False
+            ct = self._table[pid]
+            expected = self._identity.get(pid)
+            if expected is None:
+                if ct is not None:
+                    self._identity[pid] = ct  # first sighting defines the identity
+                return True
+        return ct is None or abs(ct - expected) <= _CT_TOLERANCE
+
+    def snapshot_age(self) -> float:
+        return time.monotonic() - self._taken
+
+    # ------------------------ tracking ------------------------ #
+
+    def track(self, pid: int, create_time: Optional[float] = None) -> None:
+        """Record the identity of a PID we just launched."""
+        if create_time is None:
+            import psutil
+            try:
+                create_time = psutil.Process(pid).create_time()
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                return
+        with self._lock:
+            self._identity[pid] = create_time
+            self._exited.discard(pid)
+            self._table[pid] = create_time
+
+    def forget(self, pid: Optional[int]) -> None:
+        if not pid:
+            return
+        with self._lock:
+            self._identity.pop(int(pid), None)
+            self._exited.discard(int(pid))
+
+    def add_exit_listener(self, fn: Callable[[int], None]) -> None:
+        self._listeners.append(fn)
+
+    def _mark_exited(self, pid: int) -> None:
+        with self._lock:
+            self._exited.add(pid)
+            self._table.pop(pid, None)
+        for fn in list(self._listeners):
+            try:
+                fn(pid)
+            except Exception:
+                logger.exception("process exit listener failed")
+
+    def watch(self, proc) -> None:
+        """Track a subprocess.Popen child and get notified the moment it exits."""
+        self.track(proc.pid)
+
+        def waiter():
+            try:
+                proc.wait()
+            except Exception:
+                return
+            self._mark_exited(proc.pid)
+
+        threading.Thread(target=waiter, name=f"wait-{proc.pid}", daemon=True).start()
@@ -0,0 +1,247 @@
+"""
+Incremental instance provisioning.
+
+Instead of rmtree + copytree of the whole MT5 program folder per account:
+
+- program_source and profile_source are described by a content-hash manifest
+  (rel path -> size, mtime_ns, sha256). Hashes are cached on disk keyed by
+  (size, mtime_ns), so only new or touched source files are ever re-hashed.
+- Files MT5 never writes to (terminal64.exe, DLLs, sounds, ...) are hardlinked
+  (or reflinked) from program_source; files an instance may modify (config,
+  profiles, MQL5, *.ini, ...) and every profile overlay file are real copies.
+  Where os.link fails (instances on another drive) the file is copied and
+  recorded as such, so re-syncs do not copy it again until its source changes.
+- Each instance keeps .provision.json describing what was placed there.
+  A re-sync only re-links/re-copies entries whose source hash changed, whose
+  copy was modified inside the instance (reset to the defaults, as a fresh
+  clone would), or whose hardlink was broken; entries that disappeared from
+  the sources are removed. Files the terminal/EA created itself (logs, bases,
+  signals) are left alone; SessionManager.ensure_instance clears the signal
+  spool and journal itself before syncing, so a re-registered account does
+  not replay orders queued for its previous run.
+"""
+import os, json, shutil, hashlib, fnmatch, threading, logging
+from typing import Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = ".provision.json"
+
+# Relative (posix-style) paths inside the program folder that an instance may write to.
+# Matched case-insensitively: real MT5 trees use Config/, Profiles/, Templates/...
+DEFAULT_MUTABLE = (
+    "config/*", "profiles/*", "MQL5/*", "Bases/*", "logs/*", "Tester/*", "temp/*",
+    "*.ini", "*.dat", "*.log", "*.cfg",
+)
+
+# Profile sub-trees overlaid on top of the program (same set ensure_instance always used).
+PROFILE_OVERLAYS = (
+    "config", "profiles", "MQL5/Profiles",
+    "MQL5/Experts", "MQL5/Indicators", "MQL5/Files", "MQL5/Libraries", "MQL5/Include",
+)
+
+LINK_MODES = ("hardlink", "reflink", "copy")
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _walk(root: str, rel: str = "") -> Iterable[Tuple[str, os.stat_result]]:
+    try:
+        with os.scandir(os.path.join(root, rel) if rel else root) as it:
+            for e in it:
+                r = f"{rel}/{e.name}" if rel else e.name
+                if e.is_dir(follow_symlinks=False):
+                    yield from _walk(root, r)
+                elif e.is_file():
+                    yield r, e.stat()
+    except FileNotFoundError:
+        return
+
+class Manifest:
+    """rel path -> (size, mtime_ns, sha256) for one source tree, with an on-disk hash cache."""
+
+    def __init__(self, root: str, cache_path: Optional[str] = None):
+        self.root = root
+        self.cache_path = cache_path
+        self.entries: Dict[str, Tuple[int, int, str]] = {}
+        if cache_path and os.path.isfile(cache_path):
+            try:
+                with open(cache_path, "r", encoding="utf-8") as f:
+                    self.entries = {k: tuple(v) for k, v in json.load(f).items()}
+            except Exception:
+                self.entries = {}
+
+    def refresh(self, subtrees: Optional[Iterable[str]] = None) -> bool:
+        """Re-stat the tree (cheap) and hash only changed files. Returns True if anything changed."""
+        fresh: Dict[str, Tuple[int, int, str]] = {}
+        roots = list(subtrees) if subtrees is not None else [""]
+        for sub in roots:
+            for rel, st in _walk(self.root, sub):
+                old = self.entries.get(rel)
+                if old and old[0] == st.st_size and old[1] == st.st_mtime_ns:
+                    fresh[rel] = old
+                else:
+                    fresh[rel] = (st.st_size, st.st_mtime_ns, _sha256(os.path.join(self.root, *rel.split("/"))))
+        changed = fresh != self.entries
+        self.entries = fresh
+        if changed and self.cache_path:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp = self.cache_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f)
+            os.replace(tmp, self.cache_path)
+        return changed
+
+    def digest(self) -> str:
+        """Hash over the whole manifest; changes whenever any file changes."""
+        h = hashlib.sha256()
+        for rel in sorted(self.entries):
+            h.update(rel.encode("utf-8"))
+            h.update(self.entries[rel][2].encode("ascii"))
+        return h.hexdigest()
+
+def _reflink(src: str, dst: str) -> bool:
+    try:
+        import fcntl
+        FICLONE = 0x40049409
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        shutil.copystat(src, dst)
+        return True
+    except Exception:
+        try:
+            os.remove(dst)
+        except OSError:
+            pass
+        return False
+
+class Provisioner:
+    def __init__(self, program_source: str, profile_source: str, cache_dir: str,
+                 link_mode: str = "hardlink", mutable: Iterable[str] = DEFAULT_MUTABLE):
+        if link_mode not in LINK_MODES:
+            raise ValueError(f"link_mode must be one of {LINK_MODES}")
+        self.program_source = program_source
+        self.profile_source = profile_source
+        self.link_mode = link_mode
+        self.mutable = tuple(p.lower() for p in mutable)
+        key = lambda p: hashlib.sha1(os.path.abspath(p).encode("utf-8")).hexdigest()[:16]
+        self.program = Manifest(program_source, os.path.join(cache_dir, f"program-{key(program_source)}.json"))
+        self.profile = Manifest(profile_source, os.path.join(cache_dir, f"profile-{key(profile_source)}.json"))
+        self._lock = threading.Lock()
+        self._inst_locks: Dict[str, threading.Lock] = {}
+
+    # ------------------------ planning ------------------------ #
+
+    def is_mutable(self, rel: str) -> bool:
+        rel = rel.lower()
+        return any(fnmatch.fnmatchcase(rel, pat) for pat in self.mutable)
+
+    def refresh_sources(self) -> None:
+        with self._lock:
+            self.program.refresh()
+            self.profile.refresh(PROFILE_OVERLAYS)
+
+    def source_digest(self) -> str:
+        """Identity of the current sources (used by the warm pool to detect staleness)."""
+        self.refresh_sources()
+        return hashlib.sha256((self.program.digest() + self.profile.digest()).encode("ascii")).hexdigest()
+
+    def plan(self) -> Dict[str, Tuple[str, str, str]]:
+        """instance rel path -> (source abs path, sha256, 'link' | 'copy')"""
+        desired = {}
+        for rel, (_, _, sha) in self.program.entries.items():
+            kind = "copy" if self.is_mutable(rel) or self.link_mode == "copy" else "link"
+            desired[rel] = (os.path.join(self.program_source, *rel.split("/")), sha, kind)
+        for rel, (_, _, sha) in self.profile.entries.items():
+            desired[rel] = (os.path.join(self.profile_source, *rel.split("/")), sha, "copy")
+        return desired
+
+    # ------------------------ applying ------------------------ #
+
+    def _place(self, src: str, dst: str, kind: str) -> str:
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        if os.path.lexists(dst):
+            os.remove(dst)
+        if kind == "link":
+            if self.link_mode == "reflink" and _reflink(src, dst):
+                return "reflink"
+            if self.link_mode == "hardlink":
+                try:
+                    os.link(src, dst)
+                    return "hardlink"
+                except OSError:
+                    pass  # cross-device / unsupported FS -> copy
+        shutil.copy2(src, dst)
+        return "copy"
+
+    @staticmethod
+    def _up_to_date(dst: str, src: str, sha: str, rec: Optional[dict]) -> bool:
+        if not rec or rec.get("sha") != sha:
+            return False
+        try:
+            st = os.stat(dst)
+        except OSError:
+            return False
+        if rec.get("how") == "hardlink":
+            try:
+                return os.path.samefile(src, dst)
+            except OSError:
+                return False
+        # copies/reflinks: untouched since we placed them?
+        return st.st_size == rec.get("size") and st.st_mtime_ns == rec.get("mtime_ns")
+
+    def sync(self, inst: str) -> Dict[str, int]:
+        """Bring `inst` in line with the sources; only differing entries are touched."""
+        with self._lock:
+            lock = self._inst_locks.setdefault(os.path.abspath(inst), threading.Lock())
+        with lock:
+            self.refresh_sources()
+            desired = self.plan()
+            os.makedirs(inst, exist_ok=True)
+            state_path = os.path.join(inst, STATE_FILE)
+            try:
+                with open(state_path, "r", encoding="utf-8") as f:
+                    state = json.load(f)
+            except Exception:
+                state = {}
+
+            stats = {"hardlink": 0, "reflink": 0, "copy": 0, "skipped": 0, "removed": 0, "bytes_copied": 0}
+            new_state = {}
+            for rel, (src, sha, kind) in desired.items():
+                dst = os.path.join(inst, *rel.split("/"))
+                rec = state.get(rel)
+                want_hardlink = kind == "link" and self.link_mode == "hardlink"
+                # a copy placed because os.link failed (other drive, FS without links) stays current
+                linked_as_wanted = (rec is not None and
+                                    ((rec["how"] == "hardlink") == want_hardlink or
+                                     (want_hardlink and rec.get("link_failed"))))
+                if linked_as_wanted and self._up_to_date(dst, src, sha, rec):
+                    new_state[rel] = rec
+                    stats["skipped"] += 1
+                    continue
+                how = self._place(src, dst, kind)
+                st = os.stat(dst)
+                stats[how] += 1
+                if how == "copy":
+                    stats["bytes_copied"] += st.st_size
+                new_state[rel] = {"sha": sha, "how": how, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+                if want_hardlink and how != "hardlink":
+                    new_state[rel]["link_failed"] = True
+
+            for rel in set(state) - set(desired):
+                try:
+                    os.remove(os.path.join(inst, *rel.split("/")))
+                    stats["removed"] += 1
+                except OSError:
+                    pass
+
+            os.makedirs(os.path.join(inst, "temp", "EBWebView"), exist_ok=True)
+            tmp = state_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(new_state, f)
+            os.replace(tmp, state_path)
+        return stats
@@ -0,0 +1,198 @@
+"""
+Fixed-memory rate limiting with idle-key eviction.
+
+Each key holds one sliding-window counter (window start, current count,
+previous count), so memory per key is constant no matter how many requests
+arrive. The estimate is prev * (overlap of the previous window) + cur, the
+usual two-bucket approximation of a true sliding log.
+
+Backends
+--------
+- MemoryBackend: per process (default)
+- SqliteBackend: counters in a SQLite file shared by every worker process on
+  the host, so limits stay correct under gunicorn/waitress with >1 worker
+"""
+import os, time, sqlite3, threading
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+class Decision(NamedTuple):
+    allowed: bool
+    remaining: int
+    retry_after: float
+
+def _slide(state: Optional[Tuple[float, int, int]], limit: int, window: float, now: float):
+    """Pure counter step. state = (window_start, cur, prev) -> (decision, new_state)."""
+    ws = now - (now % window)
+    if state is None:
+        start, cur, prev = ws, 0, 0
+    else:
+        start, cur, prev = state
+        if ws != start:
+            prev = cur if ws - start == window else 0
+            cur, start = 0, ws
+    weight = 1.0 - (now - start) / window
+    est = prev * weight + cur
+    if est + 1 > limit:
+        # time until enough of the previous window has slid out (or the next window starts)
+        if prev and cur < limit:
+            retry = max(0.0, (est + 1 - limit) / prev * window)
+        else:
+            retry = start + window - now
+        return Decision(False, 0, retry), (start, cur, prev)
+    cur += 1
+    return Decision(True, max(0, int(limit - est - 1)), 0.0), (start, cur, prev)
+
+class MemoryBackend:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state: Dict[str, Tuple[float, int, int]] = {}
+        self._seen: Dict[str, float] = {}
+
+    def hit(self, key: str, limit: int, window: float, now: float) -> Decision:
+        with self._lock:
+            decision, self._state[key] = _slide(self._state.get(key), limit, window, now)
+            self._seen[key] = now
+        return decision
+
+    def evict(self, older_than: float) -> int:
+        with self._lock:
+            stale = [k for k, t in self._seen.items() if t < older_than]
+            for k in stale:
+                del self._seen[k]
+                self._state.pop(k, None)
+        return len(stale)
+
+    def __len__(self) -> int:
+        return len(self._state)
+
+class SqliteBackend:
+    SCHEMA = """CREATE TABLE IF NOT EXISTS rate_limits (
+        key TEXT PRIMARY KEY,
+        start REAL NOT NULL,
+        cur INTEGER NOT NULL,
+        prev INTEGER NOT NULL,
+        seen REAL NOT NULL
+    )"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(self.SCHEMA)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_rate_limits_seen ON rate_limits(seen)")
+
+    def hit(self, key: str, limit: int, window: float, now: float) -> Decision:
+        with self._lock:
+            c = self._conn
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                row = c.execute("SELECT start, cur, prev FROM rate_limits WHERE key=?", (key,)).fetchone()
+                decision, (start, cur, prev) = _slide(tuple(row) if row else None, limit, window, now)
+                c.execute("INSERT OR REPLACE INTO rate_limits (key, start, cur, prev, seen) VALUES (?, ?, ?, ?, ?)",
+                          (key, start, cur, prev, now))
+            except BaseException:
+                c.execute("ROLLBACK")
+                raise
+            c.execute("COMMIT")
+        return decision
+
+    def evict(self, older_than: float) -> int:
+        with self._lock:
+            return self._conn.execute("DELETE FROM rate_limits WHERE seen < ?", (older_than,)).rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+
+def parse_rules(spec: str) -> Dict[str, Tuple[int, float]]:
+    """'webhook=5/10,webhook_batch=2/10' -> {'webhook': (5, 10.0), 'webhook_batch': (2, 10.0)}"""
+    rules = {}
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, val = part.partition("=")
+        limit, _, window = val.partition("/")
+        rules[name.strip()] = (int(limit), float(window or 60))
+    return rules
+
+class RateLimiter:
+    """
+    Per-route limits over a pluggable backend. Keys untouched for `idle_ttl`
+    seconds (default: twice the longest window) are evicted at most once per
+    `evict_interval`, piggybacking on hit() so no extra thread is needed.
+    """
+
+    def __init__(self, rules: Dict[str, Tuple[int, float]], backend=None,
+                 evict_interval: float = 60.0, idle_ttl: Optional[float] = None):
+        self.rules = dict(rules)
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.evict_interval = evict_interval
+        self.idle_ttl = idle_ttl or 2 * max((w for _, w in self.rules.values()), default=60.0)
+        self._next_evict = 0.0
+
+    def hit(self, route: str, key: str, now: Optional[float] = None) -> Decision:
+        now = time.time() if now is None else now
+        if now >= self._next_evict:
+            self._next_evict = now + self.evict_interval
+            self.backend.evict(now - self.idle_ttl)
+        rule = self.rules.get(route)
+        if rule is None:
+            return Decision(True, -1, 0.0)
+        limit, window = rule
+        return self.backend.hit(f"{route}|{key}", limit, window, now)
+
+def backend_from_env(default_dir: str):
+    kind = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+    if kind == "sqlite":
+        return SqliteBackend(os.getenv("RATE_LIMIT_DB") or os.path.join(default_dir, "ratelimit.db"))
+    return MemoryBackend()
+
+class TTLMap:
+    """
+    Dict of key -> timestamp with bounded lifetime and size, used for the
+    Basic-auth idle tracker. Entries older than `ttl` or beyond `max_keys`
+    (oldest first) are dropped during periodic sweeps; the size cap never drops
+    an entry younger than `keep_for` (a live session would lose its idle clock).
+    """
+
+    def __init__(self, ttl: float, max_keys: int = 10000, sweep_interval: float = 60.0,
+                 keep_for: float = 0.0):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.keep_for = keep_for
+        self.sweep_interval = sweep_interval
+        self._d: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_sweep = 0.0
+
+    def _sweep(self, now: float) -> None:
+        cutoff = now - self.ttl
+        keep = now - self.keep_for
+        while self._d:
+            k, t = next(iter(self._d.items()))
+            if t >= cutoff and (len(self._d) <= self.max_keys or t >= keep):
+                break
+            self._d.popitem(last=False)
+
+    def get(self, key: str, default: float = 0) -> float:
+        with self._lock:
+            return self._d.get(key, default)
+
+    def __setitem__(self, key: str, ts: float) -> None:
+        with self._lock:
+            self._d[key] = ts
+            self._d.move_to_end(key)
+            if ts >= self._next_sweep or len(self._d) > self.max_keys:
+                self._next_sweep = ts + self.sweep_interval
+                self._sweep(ts)
+
+    def pop(self, key: str, default=None):
+        with self._lock:
+            return self._d.pop(key, default)
+
+    def __len__(self) -> int:
+        return len(self._d)
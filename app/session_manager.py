@@ -17,9 +17,13 @@ import re
 import shutil
 import subprocess
 import logging
-import psutil
 from typing import Optional
 
+from .signal_journal import journal_path, close_writer
+from .process_snapshot import ProcessSnapshot
+from .provisioning import Provisioner
+from .warm_pool import WarmPool
+
 logger = logging.getLogger(__name__)
 
 # ------------------------ helpers ------------------------ #
@@ -50,6 +54,20 @@ def _copy_if_exists(src: str, dst: str) -> None:
         _ensure_dir(os.path.dirname(dst))
         shutil.copy2(src, dst)
 
+def _clear_signals(inst: str) -> None:
+    """
+    ลบ signal ค้าง (MQL5/Files/signals/ + signals.journal และ .ack) ของอินสแตนซ์
+    กัน EA เปิดออเดอร์เก่าซ้ำหลังลงทะเบียนบัญชีใหม่
+    """
+    path = journal_path(inst)
+    close_writer(path)
+    for f in (path, path + ".ack"):
+        try:
+            os.remove(f)
+        except FileNotFoundError:
+            pass
+    shutil.rmtree(os.path.join(inst, "MQL5", "Files", "signals"), ignore_errors=True)
+
 # ------------------------ core class ------------------------ #
 
 class SessionManager:
@@ -60,7 +78,10 @@ class SessionManager:
     - เปิดด้วย /portable (cwd=instance)
     """
 
-    def __init__(self, instances_root: str, profile_source: str, terminal_path: str):
+    def __init__(self, instances_root: str, profile_source: str, terminal_path: str,
+                 snapshot: Optional[ProcessSnapshot] = None, provision_mode: str = "incremental",
+                 link_mode: str = "hardlink", warm_pool_size: int = 0, warm_pool_concurrency: int = 1,
+                 warm_pool_check_interval: float = 300.0):
         """
         Parameters
         ----------
@@ -72,6 +93,16 @@ class SessionManager:
         terminal_path : str
             เส้นทางไปยัง terminal64.exe ของ MT5 หลัก (เช่น C:\\Program Files\\MetaTrader 5\\terminal64.exe)
             เราจะใช้โฟลเดอร์ของไฟล์นี้เป็น "โฟลเดอร์โปรแกรมต้นทาง"
+        snapshot : ProcessSnapshot, optional
+            ตาราง process ที่ใช้ตอบ is_alive (สแกนครั้งเดียวต่อรอบ + แจ้งเตือนทันทีเมื่อ child ที่เราเปิดจบการทำงาน)
+        provision_mode : str
+            "incremental" (ค่าเริ่มต้น: hardlink ไฟล์โปรแกรม + sync เฉพาะไฟล์ที่เปลี่ยน ดู app/provisioning.py)
+            หรือ "full" (ลบแล้วโคลนใหม่ทั้งโฟลเดอร์แบบเดิม)
+        link_mode : str
+            "hardlink" | "reflink" | "copy" สำหรับไฟล์โปรแกรมที่อินสแตนซ์ไม่แก้ไข
+        warm_pool_size, warm_pool_concurrency, warm_pool_check_interval : int, int, float
+            จำนวนอินสแตนซ์สำรองที่สร้างไว้ล่วงหน้า (.warm-*, 0 = ปิด), จำนวนที่สร้างพร้อมกันได้
+            และรอบตรวจว่า program_source/profile_source เปลี่ยนหรือไม่ (ดู app/warm_pool.py)
         """
         self.instances_root = os.path.abspath(instances_root)
         _ensure_dir(self.instances_root)
@@ -79,6 +110,8 @@ class SessionManager:
         self.profile_source = os.path.abspath(profile_source)
         self.terminal_path = os.path.abspath(terminal_path)
         self.program_source = os.path.dirname(self.terminal_path)
+        self.snapshot = snapshot or ProcessSnapshot()
+        self.provision_mode = provision_mode
 
         if not os.path.isfile(self.terminal_path):
             raise FileNotFoundError(f"terminal64.exe not found: {self.terminal_path}")
@@ -92,6 +125,12 @@ class SessionManager:
         if not os.path.isfile(servers_dat):
             logger.warning("servers.dat not found in MT5_PROFILE_SOURCE: %s", servers_dat)
 
+        self.provisioner = Provisioner(self.program_source, self.profile_source,
+                                       os.path.join(self.instances_root, ".provision-cache"), link_mode)
+        # ยังไม่เริ่มเติม pool จนกว่าจะเรียก warm_pool.start() (server.py เรียกตอน boot)
+        self.warm_pool = WarmPool(self.instances_root, self._build_instance, self.provisioner.source_digest,
+                                  warm_pool_size, warm_pool_concurrency, warm_pool_check_interval)
+
     # ------------------------ paths ------------------------ #
 
     def _instance_dir(self, account: str) -> str:
@@ -100,13 +139,40 @@ class SessionManager:
     # ------------------------ lifecycle ------------------------ #
 
     def ensure_instance(self, account: str) -> str:
+        """
+        เตรียมอินสแตนซ์ให้ตรงกับ program_source + profile_source ล่าสุด
+        - incremental: hardlink ไฟล์โปรแกรม, copy ไฟล์ที่อินสแตนซ์แก้ไขได้/โปรไฟล์,
+          sync เฉพาะไฟล์ที่ต่างจาก manifest (ไฟล์ที่แก้ในอินสแตนซ์จะถูกคืนค่า Default)
+          และล้าง signal ค้าง (signals/*.json, signals.journal) เหมือนตอนลบทิ้งแบบ full
+        - full: ลบของเก่าแล้วโคลนใหม่ทั้งหมด (แบบเดิม)
+        """
+        inst = self._instance_dir(account)
+        # บัญชีใหม่: ย้ายอินสแตนซ์ที่เตรียมไว้แล้วจาก warm pool มาใช้ (rename ครั้งเดียว)
+        if self.warm_pool.claim(inst):
+            logger.info("Claimed warm MT5 instance → %s", inst)
+            return inst
+        return self._build_instance(inst)
+
+    def _build_instance(self, inst: str) -> str:
+        if self.provision_mode == "full":
+            return self.clone_full(inst)
+
+        logger.info("Sync MT5 instance → %s", inst)
+        # sync ไม่ลบไฟล์ที่ EA สร้างเอง → ล้าง signal ของรอบก่อนเองก่อน
+        _clear_signals(inst)
+        stats = self.provisioner.sync(inst)
+        logger.info("Provisioned %s: %s", inst, stats)
+        return inst
+
+    def clone_full(self, inst: str) -> str:
         """
         สร้างอินสแตนซ์ใหม่ (ลบของเก่าออก เพื่อให้ได้ค่า Default ล่าสุดเสมอ)
         - โคลนโฟลเดอร์โปรแกรมทั้งหมด
         - overlay โปรไฟล์/ค่า default/EA จาก profile_source
         - เตรียม temp/EBWebView กัน error
         """
-        inst = self._instance_dir(account)
+        # ปล่อย mmap ของ signal journal ก่อน (Windows ลบไฟล์ที่ถูก map อยู่ไม่ได้)
+        close_writer(journal_path(inst))
 
         # ลบทิ้งถ้ามีของเก่า
         if os.path.exists(inst):
@@ -159,6 +225,7 @@ class SessionManager:
         cmd = [exe, "/portable"]
         logger.info("Starting MT5 (account=%s): %s", account, " ".join(cmd))
         proc = subprocess.Popen(cmd, cwd=inst, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.snapshot.watch(proc)
         return proc.pid
 
     def restart(self, pid: Optional[int], account: str) -> int:
@@ -178,16 +245,11 @@ class SessionManager:
                 os.kill(int(pid), 9)
         except Exception as e:
             logger.error("Error stopping process %s: %s", pid, e)
+        self.snapshot.forget(pid)
 
     def is_alive(self, pid: Optional[int]) -> bool:
         """
         ตรวจสอบว่า process MT5 (PID) ยังทำงานอยู่หรือไม่
-        ใช้โดย monitor_loop ใน server.py
+        ใช้โดย monitor_loop และ /accounts ใน server.py (ตอบจาก snapshot ไม่เรียก psutil ต่อ PID)
         """
-        if not pid:
-            return False
-        try:
-            p = psutil.Process(int(pid))
-            return p.is_running() and p.status() != psutil.STATUS_ZOMBIE
-        except (psutil.NoSuchProcess, psutil.AccessDenied, ValueError):
-            return False
+        return self.snapshot.is_alive(pid)
@@ -0,0 +1,177 @@
+"""
+Queryable history of every processed signal (signal_history table).
+
+The webhook paths call record() with the normalized signal and its outcome;
+that is a non-blocking queue put. A single writer thread drains the queue
+and inserts up to `batch_size` rows per transaction, at least every
+`flush_interval` seconds, so the request path never waits on SQLite. When
+the queue is full new rows are dropped and counted (stats()["dropped"]).
+
+query() pages newest-first by id (keyset pagination): the cursor is the id
+of the last row returned, so each page is one index range scan no matter
+how deep the client pages. Rows older than `retention` seconds are deleted
+by the writer in small chunks, at most once per `prune_interval`.
+"""
+import json, time, queue, threading, logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from .db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("received_ts", "route", "outcome", "account", "symbol_in", "symbol", "action", "volume",
+           "error", "signal_path", "client_ip", "group_name", "ref", "signal")
+SQL_INSERT = f"INSERT INTO signal_history ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+SQL_PRUNE = ("DELETE FROM signal_history WHERE id IN "
+             "(SELECT id FROM signal_history WHERE received_ts < ? ORDER BY id LIMIT ?)")
+FILTERS = {"account": "account = ?", "symbol": "symbol = ?", "outcome": "outcome = ?", "route": "route = ?",
+           "group": "group_name = ?", "since": "received_ts >= ?", "until": "received_ts < ?"}
+MAX_LIMIT = 500
+
+def parse_time(value: str) -> float:
+    """Epoch seconds, or an ISO-8601 date/time (naive = local time)."""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+class SignalHistory:
+    def __init__(self, enabled: bool = True, batch_size: int = 500, flush_interval: float = 0.5,
+                 max_queue: int = 10000, retention: float = 30 * 86400.0, prune_interval: float = 3600.0):
+        self.enabled = enabled
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.retention = retention
+        self.prune_interval = prune_interval
+        self._q: "queue.Queue[tuple]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._flushed = threading.Condition()
+        self._next_prune = 0.0
+        self.counters = {"recorded": 0, "written": 0, "dropped": 0, "pruned": 0, "failed": 0}
+
+    # ------------------------ producer side ------------------------ #
+
+    def record(self, route: str, outcome: str, account: Optional[str], raw: Any = None,
+               norm: Optional[Dict[str, Any]] = None, error: Optional[str] = None,
+               signal_path: Optional[str] = None, client_ip: str = "", group: Optional[str] = None,
+               ref: Optional[str] = None) -> bool:
+        """Queue one history row without blocking. Returns False if it was dropped."""
+        if not self.enabled:
+            return False
+        raw = raw if isinstance(raw, dict) else {}
+        src = norm or raw
+        try:
+            volume = float(src.get("volume")) if src.get("volume") is not None else None
+        except (TypeError, ValueError):
+            volume = None
+        row = (time.time(), route, outcome, str(account) if account not in (None, "") else None,
+               raw.get("symbol"), norm["symbol"] if norm else None, src.get("action"), volume,
+               error, signal_path, client_ip, group, ref, json.dumps(norm, ensure_ascii=False) if norm else None)
+        try:
+            self._q.put_nowait(row)
+        except queue.Full:
+            self.counters["dropped"] += 1
+            return False
+        self.counters["recorded"] += 1
+        return True
+
+    # ------------------------ writer ------------------------ #
+
+    def _drain(self, first: tuple) -> List[tuple]:
+        rows = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(rows) < self.batch_size:
+            try:
+                rows.append(self._q.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+        return rows
+
+    def _write(self, rows: List[tuple]) -> None:
+        try:
+            with transaction() as conn:
+                conn.executemany(SQL_INSERT, rows)
+            self.counters["written"] += len(rows)
+        except Exception:
+            self.counters["failed"] += len(rows)
+            logger.exception("signal history write failed (%d rows)", len(rows))
+
+    def prune(self, now: Optional[float] = None, chunk: int = 5000) -> int:
+        cutoff = (now or time.time()) - self.retention
+        total = 0
+        while True:
+            with connection() as conn:
+                n = conn.execute(SQL_PRUNE, (cutoff, chunk)).rowcount
+            total += n
+            if n < chunk:
+                break
+        self.counters["pruned"] += total
+        return total
+
+    def _run(self) -> None:
+        while True:
+            try:
+                first = self._q.get(timeout=1.0)
+            except queue.Empty:
+                first = None
+            try:
+                if first is not None:
+                    self._write(self._drain(first))
+                now = time.time()
+                if self.retention and now >= self._next_prune:
+                    self._next_prune = now + self.prune_interval
+                    n = self.prune(now)
+                    if n:
+                        logger.info("[HISTORY] pruned %d signals older than %.0f days", n, self.retention / 86400)
+            except Exception:
+                logger.exception("signal history writer error")
+            with self._flushed:
+                self._flushed.notify_all()
+
+    def start(self) -> None:
+        if self._thread is not None or not self.enabled:
+            return
+        self._thread = threading.Thread(target=self._run, name="signal-history", daemon=True)
+        self._thread.start()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until everything queued so far is written (tools/tests)."""
+        deadline = time.monotonic() + timeout
+        while not self._q.empty() and time.monotonic() < deadline:
+            with self._flushed:
+                self._flushed.wait(0.1)
+        with self._flushed:
+            self._flushed.wait(min(0.1 + self.flush_interval, max(0.0, deadline - time.monotonic())))
+        return self._q.empty()
+
+    # ------------------------ queries ------------------------ #
+
+    def query(self, filters: Dict[str, Any], cursor: Optional[str] = None,
+              limit: int = 100) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Newest first. -> (rows, next cursor or None). Raises ValueError on a bad filter/cursor."""
+        where, args = [], []
+        for key, value in filters.items():
+            if key not in FILTERS:
+                raise ValueError(f"unknown filter: {key}")
+            if value in (None, ""):
+                continue
+            where.append(FILTERS[key])
+            args.append(parse_time(value) if key in ("since", "until") else value)
+        if cursor:
+            where.append("id < ?")
+            args.append(int(cursor))
+        limit = max(1, min(int(limit), MAX_LIMIT))
+        sql = (f"SELECT id, {', '.join(COLUMNS)} FROM signal_history"
+               f"{' WHERE ' + ' AND '.join(where) if where else ''} ORDER BY id DESC LIMIT ?")
+        with connection() as conn:
+            rows = conn.execute(sql, (*args, limit + 1)).fetchall()
+        more = len(rows) > limit
+        out = []
+        for r in rows[:limit]:
+            d = dict(zip(("id",) + COLUMNS, r))
+            d["signal"] = json.loads(d["signal"]) if d["signal"] else None
+            out.append(d)
+        return out, (str(out[-1]["id"]) if more else None)
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.counters, queued=self._q.qsize(), enabled=self.enabled)
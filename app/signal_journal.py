@@ -0,0 +1,271 @@
+"""
+Fixed-size, memory-mapped ring journal for signal delivery (one per instance).
+
+Alternative to one-JSON-file-per-signal: the file is created once at a fixed
+size, every signal is a single append into the mapping, and the EA reads
+forward from its last sequence number instead of listing a directory.
+
+File layout (little-endian)
+---------------------------
+Header, HEADER_SIZE (64) bytes:
+    0   4s   magic        b"SGJ1"
+    4   u16  version      1
+    6   u16  header_size  64
+    8   u32  capacity     size of the data area in bytes (multiple of 8)
+    12  u32  reserved
+    16  u64  write_seq    seq of the last committed record (0 = none yet)
+    24  u64  write_off    data offset where the next record goes
+    32  u64  tail_seq     seq of the oldest record still readable
+    40  u64  tail_off     data offset of that record
+    48  16x  reserved
+
+Data area, `capacity` bytes, holding records back to back:
+    0   u32  length       payload length, or WRAP (0xFFFFFFFF) = continue at 0
+    4   u32  crc32        of the payload
+    8   u64  seq
+    16  ...  payload      compact UTF-8 JSON, zero-padded to an 8-byte boundary
+
+If fewer than RECORD_HEADER bytes remain before the end of the data area the
+reader wraps to offset 0 without a marker. The writer advances tail_* before
+overwriting old records and publishes write_off / write_seq only after the
+record bytes are in place, so a reader that sees write_seq = N can read every
+seq in [tail_seq, N]. A reader that falls more than a lap behind detects it
+(seq mismatch or tail_seq past its cursor) and resynchronizes at the tail,
+counting the skipped records as lost.
+
+There must be a single writer per journal (this process); any number of readers.
+
+    python -m app.signal_journal dump <path>     # print header + records
+"""
+import os, sys, json, mmap, struct, zlib, threading
+from typing import Any, Dict, List, Optional, Tuple
+
+MAGIC = b"SGJ1"
+VERSION = 1
+HEADER_SIZE = 64
+RECORD_HEADER = 16
+WRAP = 0xFFFFFFFF
+DEFAULT_CAPACITY = 4 * 1024 * 1024
+
+_HDR = struct.Struct("<4sHHII QQQQ 16x")
+_REC = struct.Struct("<IIQ")
+_U32 = struct.Struct("<I")
+
+assert _HDR.size == HEADER_SIZE and _REC.size == RECORD_HEADER
+
+def _align8(n: int) -> int:
+    return (n + 7) & ~7
+
+def encode(signal: Dict[str, Any]) -> bytes:
+    return json.dumps(signal, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class _Mapped:
+    def __init__(self, path: str, capacity: Optional[int], create: bool):
+        self.path = path
+        if create and not os.path.exists(path):
+            cap = _align8(capacity or DEFAULT_CAPACITY)
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(_HDR.pack(MAGIC, VERSION, HEADER_SIZE, cap, 0, 0, 0, 1, 0))
+                f.truncate(HEADER_SIZE + cap)
+            os.replace(tmp, path)
+        self._f = open(path, "r+b" if create else "rb")
+        access = mmap.ACCESS_WRITE if create else mmap.ACCESS_READ
+        self.mm = mmap.mmap(self._f.fileno(), 0, access=access)
+        magic, version, hsize, cap = _HDR.unpack_from(self.mm, 0)[:4]
+        if magic != MAGIC or version != VERSION or hsize != HEADER_SIZE:
+            self.close()
+            raise ValueError(f"Not a signal journal: {path}")
+        if len(self.mm) < HEADER_SIZE + cap:
+            self.close()
+            raise ValueError(f"Truncated signal journal: {path}")
+        self.capacity = cap
+
+    def header(self) -> Tuple[int, int, int, int]:
+        """(write_seq, write_off, tail_seq, tail_off)"""
+        return _HDR.unpack_from(self.mm, 0)[5:9]
+
+    def close(self) -> None:
+        try:
+            self.mm.close()
+        finally:
+            self._f.close()
+
+class JournalWriter(_Mapped):
+    """Appends records; create the file if missing. Thread-safe within a process."""
+
+    def __init__(self, path: str, capacity: int = DEFAULT_CAPACITY, fsync: bool = False):
+        super().__init__(path, capacity, create=True)
+        self.fsync = fsync
+        self._lock = threading.Lock()
+
+    def _set_tail(self, seq: int, off: int) -> None:
+        struct.pack_into("<QQ", self.mm, 32, seq, off)
+
+    def _evict(self, start: int, end: int) -> None:
+        """Drop every live record whose start offset falls in [start, end)."""
+        cap = self.capacity
+        write_seq, _, tail_seq, tail_off = self.header()
+        while tail_seq <= write_seq and start <= tail_off < end:
+            if cap - tail_off < RECORD_HEADER or _U32.unpack_from(self.mm, HEADER_SIZE + tail_off)[0] == WRAP:
+                tail_off = 0
+            else:
+                length = _U32.unpack_from(self.mm, HEADER_SIZE + tail_off)[0]
+                tail_off += _align8(RECORD_HEADER + length)
+                tail_seq += 1
+                if tail_off >= cap:
+                    tail_off = 0
+            self._set_tail(tail_seq, tail_off)
+
+    def _append_locked(self, payload: bytes) -> int:
+        cap = self.capacity
+        size = _align8(RECORD_HEADER + len(payload))
+        if size > cap:
+            raise ValueError(f"Record of {len(payload)} bytes does not fit journal capacity {cap}")
+        write_seq, pos, tail_seq, _ = self.header()
+        was_empty = tail_seq > write_seq
+        if cap - pos < size:
+            self._evict(pos, cap)
+            if cap - pos >= RECORD_HEADER:
+                _U32.pack_into(self.mm, HEADER_SIZE + pos, WRAP)
+            pos = 0
+        self._evict(pos, pos + size)
+        seq = write_seq + 1
+        base = HEADER_SIZE + pos
+        _REC.pack_into(self.mm, base, len(payload), zlib.crc32(payload), seq)
+        self.mm[base + RECORD_HEADER: base + RECORD_HEADER + len(payload)] = payload
+        pad = size - RECORD_HEADER - len(payload)
+        if pad:
+            self.mm[base + size - pad: base + size] = b"\0" * pad
+        if was_empty or self.header()[2] > write_seq:
+            self._set_tail(seq, pos)
+        new_off = pos + size
+        # publish: offset first, then the sequence number readers poll on
+        struct.pack_into("<Q", self.mm, 24, 0 if new_off >= cap else new_off)
+        struct.pack_into("<Q", self.mm, 16, seq)
+        return seq
+
+    def append(self, signal: Dict[str, Any]) -> int:
+        """Append one signal; returns its sequence number."""
+        return self.append_many([signal])[0]
+
+    def append_many(self, signals: List[Dict[str, Any]]) -> List[int]:
+        payloads = [encode(s) for s in signals]
+        with self._lock:
+            seqs = [self._append_locked(p) for p in payloads]
+            if self.fsync:
+                self.mm.flush()
+        return seqs
+
+class JournalReader(_Mapped):
+    """
+    Reads forward from a cursor. `next_seq=None` starts at the oldest record;
+    `lost` counts records that were overwritten before they could be read.
+    """
+
+    def __init__(self, path: str, next_seq: Optional[int] = None):
+        super().__init__(path, None, create=False)
+        write_seq, _, tail_seq, tail_off = self.header()
+        self.lost = 0
+        self.next_seq = tail_seq if next_seq is None else next_seq
+        self._off = tail_off if next_seq is None or next_seq <= tail_seq else None
+
+    def _resync(self) -> None:
+        _, _, tail_seq, tail_off = self.header()
+        if self.next_seq < tail_seq:
+            self.lost += tail_seq - self.next_seq
+            self.next_seq = tail_seq
+        self._off = tail_off if self.next_seq == tail_seq else None
+
+    def _seek(self, write_seq: int) -> None:
+        """Find the offset of next_seq by walking from the tail (cursor given by seq only)."""
+        _, _, tail_seq, off = self.header()
+        seq = tail_seq
+        while seq < self.next_seq and seq <= write_seq:
+            if self.capacity - off < RECORD_HEADER or _U32.unpack_from(self.mm, HEADER_SIZE + off)[0] == WRAP:
+                off = 0
+                continue
+            length = _U32.unpack_from(self.mm, HEADER_SIZE + off)[0]
+            off += _align8(RECORD_HEADER + length)
+            if off >= self.capacity:
+                off = 0
+            seq += 1
+        self._off = off
+
+    def read(self, limit: int = 1000) -> List[Tuple[int, Dict[str, Any]]]:
+        out = []
+        cap = self.capacity
+        while len(out) < limit:
+            write_seq, _, tail_seq, _ = self.header()
+            if self.next_seq > write_seq:
+                break
+            if self.next_seq < tail_seq:
+                self._resync()
+            if self._off is None:
+                self._seek(write_seq)
+            off = self._off
+            if cap - off < RECORD_HEADER or _U32.unpack_from(self.mm, HEADER_SIZE + off)[0] == WRAP:
+                self._off = 0
+                continue
+            length, crc, seq = _REC.unpack_from(self.mm, HEADER_SIZE + off)
+            start = HEADER_SIZE + off + RECORD_HEADER
+            payload = bytes(self.mm[start:start + length]) if off + RECORD_HEADER + length <= cap else b""
+            if seq != self.next_seq or zlib.crc32(payload) != crc or self.header()[2] > seq:
+                # overwritten under us: jump to the oldest surviving record
+                self._resync()
+                if self.next_seq <= seq and self._off == off:
+                    break  # writer mid-update; try again on the next poll
+                continue
+            out.append((seq, json.loads(payload.decode("utf-8"))))
+            self.next_seq += 1
+            nxt = off + _align8(RECORD_HEADER + length)
+            self._off = 0 if nxt >= cap else nxt
+        return out
+
+# ------------------------ per-instance registry ------------------------ #
+
+JOURNAL_NAME = "signals.journal"
+_writers: Dict[str, JournalWriter] = {}
+_writers_lock = threading.Lock()
+
+def journal_path(inst_dir: str) -> str:
+    return os.path.join(inst_dir, "MQL5", "Files", JOURNAL_NAME)
+
+def get_writer(path: str) -> JournalWriter:
+    w = _writers.get(path)
+    if w is None:
+        with _writers_lock:
+            w = _writers.get(path)
+            if w is None:
+                w = JournalWriter(path,
+                                  capacity=int(os.getenv("SIGNAL_JOURNAL_SIZE", str(DEFAULT_CAPACITY))),
+                                  fsync=os.getenv("SIGNAL_JOURNAL_FSYNC", "false").lower() == "true")
+                _writers[path] = w
+    return w
+
+def close_writer(path: str) -> None:
+    with _writers_lock:
+        w = _writers.pop(path, None)
+    if w is not None:
+        w.close()
+
+# ------------------------ CLI ------------------------ #
+
+def _dump(path: str) -> None:
+    r = JournalReader(path)
+    write_seq, write_off, tail_seq, tail_off = r.header()
+    print(f"capacity={r.capacity} write_seq={write_seq} write_off={write_off} tail_seq={tail_seq} tail_off={tail_off}")
+    while True:
+        batch = r.read()
+        if not batch:
+            break
+        for seq, rec in batch:
+            print(seq, json.dumps(rec, ensure_ascii=False))
+    r.close()
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "dump":
+        _dump(sys.argv[2])
+    else:
+        print(__doc__)
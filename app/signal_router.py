@@ -1,6 +1,8 @@
 import os, json, time, uuid, difflib
-from typing import Dict, Any, List
+from typing import Callable, Dict, Any, List, Optional, Tuple
 from .mt5_handler import instance_dir_for
+from .symbol_resolver import resolver, SymbolIndex
+from .signal_journal import journal_path, get_writer
 
 def load_symbol_list(instances_root: str, account: str) -> List[str]:
     inst = instance_dir_for(instances_root, account)
@@ -35,18 +37,22 @@ ACTION_MAP = {
 
 REQUIRED = ["account_number","symbol","action","volume"]
 
-def normalize_payload(payload: Dict[str, Any], instances_root: str, cutoff: float=0.65) -> Dict[str, Any]:
+def _check_fields(payload: Dict[str, Any]) -> str:
+    if not isinstance(payload, dict):
+        raise ValueError("Signal must be a JSON object")
     for f in REQUIRED:
         if f not in payload:
             raise ValueError(f"Missing field: {f}")
-    account = str(payload.get("account_number")).strip()
+    return str(payload.get("account_number")).strip()
+
+def _build_norm(payload: Dict[str, Any], account: str, index: SymbolIndex, cutoff: float) -> Dict[str, Any]:
     action_in = str(payload.get("action") or "").strip().upper()
     action = ACTION_MAP.get(action_in, action_in)
     if action in ("BUY_LIMIT","SELL_LIMIT","BUY_STOP","SELL_STOP") and payload.get("price") is None:
         raise ValueError("price is required for pending orders")
 
-    available = load_symbol_list(instances_root, account)
-    symbol = auto_map_symbol(payload.get("symbol"), available, cutoff=cutoff)
+    # cached per-account index (exact / suffix / n-gram shortlist + LRU)
+    symbol = index.resolve(payload.get("symbol"), cutoff=cutoff)
 
     norm = {
         "account_number": account,
@@ -62,12 +68,87 @@ def normalize_payload(payload: Dict[str, Any], instances_root: str, cutoff: floa
     }
     return norm
 
-def write_signal(instances_root: str, account: str, signal: Dict[str, Any]) -> str:
+def normalize_payload(payload: Dict[str, Any], instances_root: str, cutoff: float=0.65,
+                      lap: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+    """`lap`, if given, is called after the symbol index load and after normalization
+    (stage timing for the webhook metrics)."""
+    account = _check_fields(payload)
+    index = resolver.index_for(instances_root, account)
+    if lap:
+        lap("symbol_load")
+    norm = _build_norm(payload, account, index, cutoff)
+    if lap:
+        lap("normalize")
+    return norm
+
+def normalize_batch(payloads: List[Any], instances_root: str, cutoff: float=0.65) -> List[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Normalize many signals at once. Returns (norm, None) or (None, error) per item,
+    in input order. The symbol index is looked up once per account, not per item.
+    """
+    indexes: Dict[str, SymbolIndex] = {}
+    out = []
+    for payload in payloads:
+        try:
+            account = _check_fields(payload)
+            index = indexes.get(account)
+            if index is None:
+                index = indexes[account] = resolver.index_for(instances_root, account)
+            out.append((_build_norm(payload, account, index, cutoff), None))
+        except Exception as e:
+            out.append((None, str(e)))
+    return out
+
+def _signal_dir(instances_root: str, account: str) -> str:
     inst_dir = instance_dir_for(instances_root, account)
     sig_dir = os.path.join(inst_dir, "MQL5", "Files", "signals")
     os.makedirs(sig_dir, exist_ok=True)
+    return sig_dir
+
+def _write_file(sig_dir: str, signal: Dict[str, Any]) -> str:
     name = f"signal_{int(time.time())}_{uuid.uuid4().hex[:8]}.json"
     path = os.path.join(sig_dir, name)
     with open(path, "w", encoding="utf-8") as f:
         json.dump(signal, f, ensure_ascii=False, indent=2)
     return path
+
+def write_signal(instances_root: str, account: str, signal: Dict[str, Any]) -> str:
+    return _write_file(_signal_dir(instances_root, account), signal)
+
+def write_signals(instances_root: str, account: str, signals: List[Dict[str, Any]]) -> List[Tuple[Optional[str], Optional[str]]]:
+    """Write several signals for one account; returns (path, None) or (None, error) per signal."""
+    try:
+        sig_dir = _signal_dir(instances_root, account)
+    except Exception as e:
+        return [(None, str(e))] * len(signals)
+    out = []
+    for signal in signals:
+        try:
+            out.append((_write_file(sig_dir, signal), None))
+        except Exception as e:
+            out.append((None, str(e)))
+    return out
+
+
+def _journal_writer(instances_root: str, account: str):
+    return get_writer(journal_path(instance_dir_for(instances_root, account)))
+
+def deliver_signal(instances_root: str, account: str, signal: Dict[str, Any], mode: str = "file") -> str:
+    """
+    Deliver one signal using the account's delivery mode.
+    'file' -> path of the new JSON file; 'journal' -> "<journal path>#<seq>".
+    """
+    if mode == "journal":
+        w = _journal_writer(instances_root, account)
+        return f"{w.path}#{w.append(signal)}"
+    return write_signal(instances_root, account, signal)
+
+def deliver_signals(instances_root: str, account: str, signals: List[Dict[str, Any]], mode: str = "file") -> List[Tuple[Optional[str], Optional[str]]]:
+    """Batch form of deliver_signal(); journal mode appends all records under one lock."""
+    if mode == "journal":
+        try:
+            w = _journal_writer(instances_root, account)
+            return [(f"{w.path}#{seq}", None) for seq in w.append_many(signals)]
+        except Exception as e:
+            return [(None, str(e))] * len(signals)
+    return write_signals(instances_root, account, signals)
@@ -0,0 +1,147 @@
+"""
+Signal spool lifecycle for instances/<acct>/MQL5/Files/signals/.
+
+Ack protocol (EA side)
+----------------------
+- file mode: after executing signal_<ts>_<id>.json the EA creates an empty
+  signal_<ts>_<id>.ack next to it (or simply deletes the .json).
+- journal mode: the EA writes the last consumed sequence number as plain text
+  to signals.journal.ack next to signals.journal.
+
+The host sweeps acknowledged files in the background (delete, or move to
+signals/archive/YYYYMMDD/) and keeps a pending-depth counter per account so
+the webhook can push back instead of piling up orders the EA is not reading.
+"""
+import os, time, shutil, threading, logging
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from .mt5_handler import instance_dir_for
+from .signal_journal import journal_path, get_writer
+
+logger = logging.getLogger(__name__)
+
+ACK_SUFFIX = ".ack"
+ACK_ACTIONS = ("delete", "archive")
+
+class SpoolManager:
+    def __init__(self, instances_root: str, max_pending: int = 500,
+                 sweep_interval: float = 30.0, ack_action: str = "delete"):
+        if ack_action not in ACK_ACTIONS:
+            raise ValueError(f"ack_action must be one of {ACK_ACTIONS}")
+        self.instances_root = instances_root
+        self.max_pending = max_pending
+        self.sweep_interval = sweep_interval
+        self.ack_action = ack_action
+        self._depth: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------ paths ------------------------ #
+
+    def signal_dir(self, account: str) -> str:
+        return os.path.join(instance_dir_for(self.instances_root, account), "MQL5", "Files", "signals")
+
+    # ------------------------ depth ------------------------ #
+
+    def note_written(self, account: str, n: int = 1) -> None:
+        """Called after a file-mode delivery so depth stays current between sweeps."""
+        with self._lock:
+            if account in self._depth:
+                self._depth[account] += n
+
+    def pending(self, account: str, mode: str = "file") -> int:
+        if mode == "journal":
+            return self._journal_pending(account)
+        with self._lock:
+            depth = self._depth.get(account)
+        if depth is None:
+            depth = self.sweep_account(account)[1]
+        return depth
+
+    def over_limit(self, account: str, mode: str = "file") -> Tuple[bool, int]:
+        """(True, depth) when the account's EA has fallen too far behind."""
+        if self.max_pending <= 0:
+            return False, 0
+        depth = self.pending(account, mode)
+        return depth >= self.max_pending, depth
+
+    def _journal_pending(self, account: str) -> int:
+        path = journal_path(instance_dir_for(self.instances_root, account))
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path + ACK_SUFFIX, "r", encoding="utf-8") as f:
+                acked = int((f.read().strip() or "0"))
+        except (OSError, ValueError):
+            acked = 0
+        write_seq, _, tail_seq, _ = get_writer(path).header()
+        # records already overwritten by the ring cannot be pending
+        return max(0, write_seq - max(acked, tail_seq - 1))
+
+    # ------------------------ sweep ------------------------ #
+
+    def _dispose(self, sig_dir: str, name: str) -> None:
+        src = os.path.join(sig_dir, name)
+        if self.ack_action == "archive":
+            dst_dir = os.path.join(sig_dir, "archive", time.strftime("%Y%m%d"))
+            os.makedirs(dst_dir, exist_ok=True)
+            shutil.move(src, os.path.join(dst_dir, name))
+        else:
+            os.remove(src)
+
+    def sweep_account(self, account: str) -> Tuple[int, int]:
+        """One scandir pass: dispose acked signals, drop their markers. Returns (removed, pending)."""
+        sig_dir = self.signal_dir(account)
+        signals, acks = set(), set()
+        try:
+            with os.scandir(sig_dir) as it:
+                for e in it:
+                    if not e.is_file():
+                        continue
+                    stem, ext = os.path.splitext(e.name)
+                    if ext == ".json":
+                        signals.add(stem)
+                    elif ext == ACK_SUFFIX:
+                        acks.add(stem)
+        except FileNotFoundError:
+            pass
+        removed = 0
+        for stem in acks:
+            try:
+                if stem in signals:
+                    self._dispose(sig_dir, stem + ".json")
+                    removed += 1
+                os.remove(os.path.join(sig_dir, stem + ACK_SUFFIX))
+            except OSError as e:
+                logger.warning("Spool sweep failed for %s/%s: %s", account, stem, e)
+        depth = len(signals - acks)
+        with self._lock:
+            self._depth[account] = depth
+        return removed, depth
+
+    def sweep(self, accounts: Iterable[str]) -> int:
+        total = 0
+        for acc in accounts:
+            total += self.sweep_account(acc)[0]
+        return total
+
+    def forget(self, account: str) -> None:
+        with self._lock:
+            self._depth.pop(account, None)
+
+    def start(self, accounts_fn: Callable[[], Iterable[str]]) -> None:
+        """Run sweep(accounts_fn()) every sweep_interval seconds in a daemon thread."""
+        if self._thread is not None:
+            return
+
+        def loop():
+            while True:
+                try:
+                    removed = self.sweep(accounts_fn())
+                    if removed:
+                        logger.info("[SPOOL] swept %d acknowledged signal(s)", removed)
+                except Exception:
+                    logger.exception("spool sweep error")
+                time.sleep(max(1.0, self.sweep_interval))
+
+        self._thread = threading.Thread(target=loop, name="spool-sweeper", daemon=True)
+        self._thread.start()
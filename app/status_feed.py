@@ -0,0 +1,142 @@
+"""
+Versioned account-status snapshot for the dashboard.
+
+The feed keeps the last published list of account rows (registry row +
+"alive") and a version counter that only moves when something visible
+changed. /accounts uses the version as its ETag (304 when unchanged) and
+/accounts/stream pushes only the rows that changed since the client's
+version. Rows are rebuilt from the in-memory registry and the process
+snapshot, so a refresh costs no DB query and no per-account psutil call.
+
+A refresh happens every `interval` seconds on a background thread, and
+immediately when poke() is called (registry change, child process exit).
+"""
+import time, uuid, threading, logging
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# fields the dashboard shows; a change in any of them is a new version
+FIELDS = ("id", "account", "nickname", "pid", "created_at", "last_state", "delivery", "auto_restart", "alive")
+
+class StatusFeed:
+    def __init__(self, rows_fn: Callable[[], List[Dict[str, Any]]], alive_fn: Callable[[Any], bool],
+                 interval: float = 2.0, history: int = 256):
+        self.rows_fn = rows_fn
+        self.alive_fn = alive_fn
+        self.interval = interval
+        self.boot = uuid.uuid4().hex[:8]      # versions from a previous process are never reused
+        self.version = 0
+        self._rows: Dict[int, Dict[str, Any]] = {}
+        self._order: List[int] = []
+        self._deltas: "deque[Tuple[int, List[int], List[int]]]" = deque(maxlen=history)
+        self._cond = threading.Condition()
+        self._wake = threading.Event()
+        self._refreshed = 0.0
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------ building ------------------------ #
+
+    def _build(self) -> Dict[int, Dict[str, Any]]:
+        out = {}
+        for r in self.rows_fn():
+            row = {k: r.get(k) for k in FIELDS if k != "alive"}
+            row["alive"] = bool(self.alive_fn(r.get("pid")))
+            out[row["id"]] = row
+        return out
+
+    def refresh(self) -> int:
+        rows = self._build()
+        with self._cond:
+            self._refreshed = time.monotonic()
+            changed = [i for i, r in rows.items() if self._rows.get(i) != r]
+            removed = [i for i in self._rows if i not in rows]
+            if changed or removed:
+                self.version += 1
+                self._rows = rows
+                self._order = sorted(rows, reverse=True)
+                self._deltas.append((self.version, changed, removed))
+                self._cond.notify_all()
+            return self.version
+
+    def refresh_if_stale(self, max_age: Optional[float] = None) -> int:
+        if time.monotonic() - self._refreshed >= (self.interval if max_age is None else max_age):
+            return self.refresh()
+        return self.version
+
+    def poke(self) -> None:
+        self._refreshed = 0.0      # next refresh_if_stale() rebuilds right away
+        self._wake.set()
+
+    # ------------------------ reading ------------------------ #
+
+    def tag(self, version: Optional[int] = None) -> str:
+        return f"{self.boot}-{self.version if version is None else version}"
+
+    def etag(self, version: Optional[int] = None) -> str:
+        return f'W/"{self.tag(version)}"'
+
+    def parse_tag(self, tag: Optional[str]) -> Optional[int]:
+        """Client tag -> version, or None if it is not from this process."""
+        if not tag:
+            return None
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        boot, _, ver = tag.strip('"').partition("-")
+        if boot != self.boot:
+            return None
+        try:
+            return int(ver)
+        except ValueError:
+            return None
+
+    def snapshot(self) -> Tuple[int, List[Dict[str, Any]]]:
+        with self._cond:
+            return self.version, [dict(self._rows[i]) for i in self._order]
+
+    def changes_since(self, version: Optional[int]) -> Optional[Dict[str, Any]]:
+        """Delta from `version` to now; None if the client needs a full snapshot."""
+        with self._cond:
+            if version is None or version > self.version:
+                return None
+            if version == self.version:
+                return {"version": self.version, "changed": [], "removed": []}
+            if not self._deltas or self._deltas[0][0] > version + 1:
+                return None       # fell out of the history window
+            changed, removed = set(), set()
+            for v, ch, rm in self._deltas:
+                if v > version:
+                    changed.update(ch)
+                    changed.difference_update(rm)
+                    removed.update(rm)
+                    removed.difference_update(ch)
+            return {"version": self.version,
+                    "changed": [dict(self._rows[i]) for i in self._order if i in changed],
+                    "removed": sorted(removed)}
+
+    def wait(self, version: int, timeout: float) -> int:
+        """Block until the version moves past `version` (or timeout)."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    # ------------------------ background ------------------------ #
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+
+        def loop():
+            while True:
+                try:
+                    self.refresh()
+                except Exception:
+                    logger.exception("status feed refresh failed")
+                self._wake.wait(self.interval)
+                self._wake.clear()
+
+        self.refresh()
+        self._thread = threading.Thread(target=loop, name="status-feed", daemon=True)
+        self._thread.start()
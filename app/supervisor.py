@@ -0,0 +1,235 @@
+"""
+Supervisor: brings crashed MT5 instances back for accounts with auto_restart on.
+
+monitor_loop reports every online -> offline transition through
+notify_down(). For a supervised account a restart is scheduled:
+
+- backoff: the n-th consecutive attempt waits base_delay * 2^(n-1), capped at
+  max_delay, with +-20% jitter so instances that died together (host hiccup,
+  broker outage) do not all come back in the same second.
+- throttling: at most `max_concurrent` restarts run at once (terminal start-up
+  is the expensive part); due restarts wait for a slot, oldest outage first.
+- crash loop: `crash_limit` downs inside `crash_window` seconds park the
+  account in "crash_loop" with one alert and no further restarts, until it is
+  restarted by hand or auto_restart is switched off and on again (clear()).
+- an instance that stays up `stable_after` seconds resets its backoff.
+
+Right before each attempt the account row is read again: a deleted account,
+auto_restart switched off, or a pid that changed since the outage (manual
+stop/restart) cancels the pending restart instead of fighting the operator;
+a pid that is alive again (missed process snapshot) marks the account
+running without restarting it.
+
+Recovery time (outage noticed -> instance running again, across failed
+attempts) goes to the supervisor_recovery_seconds histogram.
+"""
+import time, random, threading, logging
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+RECOVERY_BUCKETS = [1, 2, 5, 10, 20, 30, 60, 120, 300, 600, 1200, 1800, 3600]
+
+metrics.describe("supervisor_restarts_total", "Automatic restarts by result (ok/failed/cancelled)")
+metrics.describe("supervisor_crash_loops_total", "Accounts parked after too many crashes in the crash window")
+metrics.describe("supervisor_recovery_seconds", "Time from a detected outage to the instance running again",
+                 buckets=RECOVERY_BUCKETS)
+
+class _Entry:
+    __slots__ = ("acc_id", "account", "status", "attempt", "down_pid", "down_at", "next_at",
+                 "up_since", "downs", "last_error")
+
+    def __init__(self, acc_id: int, account: str):
+        self.acc_id = acc_id
+        self.account = account
+        self.status = "running"     # pending | restarting | running | crash_loop
+        self.attempt = 0
+        self.down_pid: Optional[int] = None
+        self.down_at: Optional[float] = None
+        self.next_at = 0.0
+        self.up_since: Optional[float] = None
+        self.downs: deque = deque()
+        self.last_error: Optional[str] = None
+
+class Supervisor:
+    def __init__(self, restart_fn: Callable[[Dict[str, Any]], int],
+                 row_fn: Callable[[int], Optional[Dict[str, Any]]],
+                 alive_fn: Callable[[Optional[int]], bool],
+                 alert_fn: Optional[Callable[[str, str], Any]] = None,
+                 max_concurrent: int = 2, base_delay: float = 5.0, max_delay: float = 300.0,
+                 crash_window: float = 600.0, crash_limit: int = 5, stable_after: float = 300.0,
+                 enabled: bool = True):
+        """restart_fn(row) -> new pid (raises on failure); row_fn(acc_id) -> current account row;
+        alive_fn(pid) -> whether that process is running."""
+        self.restart_fn = restart_fn
+        self.row_fn = row_fn
+        self.alive_fn = alive_fn
+        self.alert_fn = alert_fn
+        self.max_concurrent = max(1, max_concurrent)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.crash_window = crash_window
+        self.crash_limit = crash_limit
+        self.stable_after = stable_after
+        self.enabled = enabled
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+        self._entries: Dict[int, _Entry] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------ events ------------------------ #
+
+    def delay(self, attempt: int) -> float:
+        d = min(self.max_delay, self.base_delay * (2 ** max(0, attempt - 1)))
+        return d * random.uniform(0.8, 1.2)
+
+    def notify_down(self, row: Dict[str, Any]) -> None:
+        """monitor_loop saw `row` go offline."""
+        if not self.enabled or not row.get("auto_restart"):
+            return
+        now = time.time()
+        with self._lock:
+            e = self._entries.get(row["id"])
+            if e is None:
+                e = self._entries[row["id"]] = _Entry(row["id"], row["account"])
+            if e.status in ("pending", "restarting", "crash_loop"):
+                return
+            self._schedule(e, now, row.get("pid"))
+        self._wake.set()
+
+    def _schedule(self, e: _Entry, now: float, pid: Optional[int]) -> None:
+        """Count one down for `e` and queue the next attempt, or park it (caller holds the lock)."""
+        e.downs.append(now)
+        while e.downs and e.downs[0] < now - self.crash_window:
+            e.downs.popleft()
+        e.down_pid = pid
+        if e.down_at is None:
+            e.down_at = now
+        if self.crash_limit and len(e.downs) >= self.crash_limit:
+            e.status = "crash_loop"
+            metrics.inc("supervisor_crash_loops_total")
+            logger.error("[SUPERVISOR] account=%s crash loop: %d downs in %.0fs, auto restart paused",
+                         e.account, len(e.downs), self.crash_window)
+            if self.alert_fn:
+                self.alert_fn("MT5 Instance Crash Loop",
+                              f"Account {e.account} went down {len(e.downs)} times in "
+                              f"{self.crash_window / 60:.0f} min. Automatic restart is paused until "
+                              f"it is restarted manually.")
+            return
+        e.attempt += 1
+        e.status = "pending"
+        e.next_at = now + self.delay(e.attempt)
+        logger.info("[SUPERVISOR] account=%s down, restart #%d in %.1fs", e.account, e.attempt, e.next_at - now)
+
+    def clear(self, acc_id: int) -> None:
+        """Forget backoff / crash-loop state (manual open/restart/stop, delete, auto_restart toggled)."""
+        with self._lock:
+            self._entries.pop(acc_id, None)
+
+    # ------------------------ restarts ------------------------ #
+
+    def _cancel(self, e: _Entry, why: str) -> None:
+        with self._lock:
+            if self._entries.get(e.acc_id) is e:
+                del self._entries[e.acc_id]
+        metrics.inc("supervisor_restarts_total", result="cancelled")
+        logger.info("[SUPERVISOR] account=%s restart cancelled: %s", e.account, why)
+
+    def _attempt(self, e: _Entry) -> None:
+        try:
+            row = self.row_fn(e.acc_id)
+            if not row:
+                return self._cancel(e, "account deleted")
+            if not row.get("auto_restart"):
+                return self._cancel(e, "auto restart disabled")
+            if row.get("pid") != e.down_pid:
+                return self._cancel(e, "instance was started or stopped manually")
+            if self.alive_fn(row.get("pid")):
+                with self._lock:
+                    e.status, e.up_since, e.down_at = "running", time.time(), None
+                metrics.inc("supervisor_restarts_total", result="cancelled")
+                logger.info("[SUPERVISOR] account=%s is running again (PID %s), no restart needed",
+                            e.account, row.get("pid"))
+                return
+            try:
+                pid = self.restart_fn(row)
+            except Exception as ex:
+                metrics.inc("supervisor_restarts_total", result="failed")
+                logger.warning("[SUPERVISOR] account=%s restart #%d failed: %s", e.account, e.attempt, ex)
+                with self._lock:
+                    e.last_error = str(ex)
+                    self._schedule(e, time.time(), row.get("pid"))
+                return
+            now = time.time()
+            metrics.inc("supervisor_restarts_total", result="ok")
+            with self._lock:
+                recovery = now - (e.down_at or now)
+                e.status, e.up_since, e.down_at, e.last_error = "running", now, None, None
+            metrics.observe("supervisor_recovery_seconds", recovery)
+            logger.info("[SUPERVISOR] account=%s restarted (PID %s) after %.1fs, attempt #%d",
+                        e.account, pid, recovery, e.attempt)
+        except Exception:
+            logger.exception("supervisor restart error")
+        finally:
+            self._slots.release()
+            self._wake.set()
+
+    def tick(self, now: Optional[float] = None) -> int:
+        """Dispatch due restarts while restart slots are free. Returns how many were started."""
+        now = now or time.time()
+        with self._lock:
+            for e in list(self._entries.values()):
+                if (e.status == "running" and e.up_since and now - e.up_since >= self.stable_after
+                        and e.attempt):
+                    del self._entries[e.acc_id]     # stayed up: next crash starts from base_delay again
+            due = sorted((e for e in self._entries.values() if e.status == "pending" and e.next_at <= now),
+                         key=lambda e: e.down_at or 0)
+        started = 0
+        for e in due:
+            if not self._slots.acquire(blocking=False):
+                break   # throttled: stays pending until a running restart finishes
+            with self._lock:
+                e.status = "restarting"
+            threading.Thread(target=self._attempt, args=(e,), name=f"restart-{e.account}", daemon=True).start()
+            started += 1
+        return started
+
+    def _next_wait(self) -> float:
+        with self._lock:
+            pending = [e.next_at for e in self._entries.values() if e.status == "pending"]
+        return max(0.2, min(5.0, min(pending) - time.time())) if pending else 5.0
+
+    def start(self) -> None:
+        if self._thread is not None or not self.enabled:
+            return
+
+        def loop():
+            while True:
+                try:
+                    self.tick()
+                except Exception:
+                    logger.exception("supervisor tick error")
+                self._wake.wait(self._next_wait())
+                self._wake.clear()
+
+        self._thread = threading.Thread(target=loop, name="supervisor", daemon=True)
+        self._thread.start()
+
+    # ------------------------ status ------------------------ #
+
+    def status(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            accounts = {e.account: {"status": e.status, "attempt": e.attempt,
+                                    "next_in": round(max(0.0, e.next_at - now), 1) if e.status == "pending" else None,
+                                    "down_for": round(now - e.down_at, 1) if e.down_at else None,
+                                    "downs_in_window": sum(1 for t in e.downs if t >= now - self.crash_window),
+                                    "last_error": e.last_error}
+                        for e in self._entries.values()}
+        restarting = sum(1 for a in accounts.values() if a["status"] == "restarting")
+        return {"enabled": self.enabled, "max_concurrent": self.max_concurrent, "restarting": restarting,
+                "base_delay": self.base_delay, "max_delay": self.max_delay, "crash_window": self.crash_window,
+                "crash_limit": self.crash_limit, "stable_after": self.stable_after, "accounts": accounts}
@@ -1,25 +1,199 @@
-import os, json
-import MetaTrader5 as mt5
+"""
+Symbol fetching in an isolated worker-process pool.
+
+The MetaTrader5 Python module keeps one process-global session
+(mt5.initialize / mt5.shutdown), so two fetches in the same process race on
+it. Every fetch therefore runs in a ProcessPoolExecutor worker; a worker runs
+one task at a time, so each process owns at most one MT5 session.
+
+Results are cached per account for SYMBOL_FETCH_TTL seconds, concurrent
+requests for the same account share one in-flight fetch, and
+symbols_list.json is only rewritten (and the resolver index invalidated) when
+the symbol set actually changed.
+
+The MT5 module is imported lazily inside the worker by name
+(SYMBOL_FETCH_MT5_MODULE, default "MetaTrader5"), so the pool can run against
+tools.fake_mt5 on machines without MetaTrader.
+"""
+import os, json, time, threading, logging, importlib
+from concurrent.futures import Future, BrokenExecutor   # BrokenProcessPool is a subclass
+from typing import Dict, List, Optional, Tuple
 from .mt5_handler import instance_dir_for
+from .symbol_resolver import resolver
 
-def fetch_symbols(terminal_path: str, instances_root: str, account: str) -> list[str]:
-    """Initialize MT5 in portable mode for this instance and fetch symbols.
-    Requires MT5 installed; does not store passwords.
-    """
-    inst_dir = instance_dir_for(instances_root, account)
+logger = logging.getLogger(__name__)
+
+SYMBOLS_FILE = "symbols_list.json"
+DEFAULT_MT5_MODULE = "MetaTrader5"
+
+# ------------------------ worker side ------------------------ #
+
+def _fetch_in_worker(module_name: str, terminal_path: str, inst_dir: str) -> Optional[List[str]]:
+    """Runs inside a pool process. None = terminal could not be initialized."""
+    mt5 = importlib.import_module(module_name)
     ok = mt5.initialize(path=terminal_path, portable=True, data_path=inst_dir)
     if not ok:
-        return []
+        return None
     try:
         infos = mt5.symbols_get()
-        symbols = sorted({s.name for s in infos}) if infos else []
+        return sorted({s.name for s in infos}) if infos else []
     finally:
         mt5.shutdown()
-    # save to file
-    out = os.path.join(inst_dir, "symbols_list.json")
+
+# ------------------------ service ------------------------ #
+
+def _read_symbols(path: str) -> Optional[List[str]]:
     try:
-        with open(out, "w", encoding="utf-8") as f:
-            json.dump(symbols, f, ensure_ascii=False, indent=2)
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return sorted(data) if isinstance(data, list) else None
     except Exception:
-        pass
-    return symbols
+        return None
+
+class SymbolFetchService:
+    def __init__(self, terminal_path: str, instances_root: str, workers: int = 2,
+                 ttl: float = 3600.0, timeout: float = 60.0, mt5_module: str = DEFAULT_MT5_MODULE):
+        self.terminal_path = terminal_path
+        self.instances_root = instances_root
+        self.workers = max(1, workers)
+        self.ttl = ttl
+        self.timeout = timeout
+        self.mt5_module = mt5_module
+        self._pool = None   # ProcessPoolExecutor, created by _executor()
+        self._cache: Dict[str, Tuple[float, List[str]]] = {}
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.stats = {"fetched": 0, "cache_hits": 0, "written": 0, "unchanged": 0, "failed": 0}
+
+    @classmethod
+    def from_env(cls, terminal_path: str, instances_root: str) -> "SymbolFetchService":
+        return cls(terminal_path, instances_root,
+                   workers=int(os.getenv("SYMBOL_FETCH_WORKERS", "2")),
+                   ttl=float(os.getenv("SYMBOL_FETCH_TTL", "3600")),
+                   timeout=float(os.getenv("SYMBOL_FETCH_TIMEOUT", "60")),
+                   mt5_module=os.getenv("SYMBOL_FETCH_MT5_MODULE") or DEFAULT_MT5_MODULE)
+
+    def _executor(self):
+        # caller holds self._lock; processes (and multiprocessing itself) only on first use
+        if self._pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def cached(self, account: str) -> Optional[List[str]]:
+        with self._lock:
+            hit = self._cache.get(account)
+        if hit and time.monotonic() - hit[0] < self.ttl:
+            return hit[1]
+        return None
+
+    def submit(self, account: str, force: bool = False) -> Future:
+        """Non-blocking fetch; the future resolves to the symbol list ([] on failure)."""
+        if not force:
+            hit = self.cached(account)
+            if hit is not None:
+                self.stats["cache_hits"] += 1
+                done: Future = Future()
+                done.set_result(hit)
+                return done
+        with self._lock:
+            fut = self._inflight.get(account)
+            if fut is not None:
+                return fut
+            inst_dir = instance_dir_for(self.instances_root, account)
+            args = (_fetch_in_worker, self.mt5_module, self.terminal_path, inst_dir)
+            try:
+                try:
+                    raw = self._executor().submit(*args)
+                except BrokenExecutor:
+                    self._pool = None
+                    raw = self._executor().submit(*args)
+            except RuntimeError:
+                # interpreter shutting down: no new worker processes
+                logger.warning("symbol fetch pool unavailable, skipped %s", account)
+                done = Future()
+                done.set_result([])
+                return done
+            fut = Future()
+            self._inflight[account] = fut
+        raw.add_done_callback(lambda r: self._complete(account, r, fut))
+        return fut
+
+    def fetch(self, account: str, force: bool = False) -> List[str]:
+        """Blocking fetch with timeout; returns [] if the terminal could not be reached."""
+        try:
+            return self.submit(account, force).result(self.timeout)
+        except Exception:
+            logger.warning("symbol fetch for %s did not finish", account, exc_info=True)
+            return []
+
+    def _complete(self, account: str, raw: Future, fut: Future) -> None:
+        symbols: List[str] = []
+        try:
+            result = raw.result()
+            if result is None:
+                self.stats["failed"] += 1
+                logger.warning("MT5 initialize failed for %s", account)
+            else:
+                symbols = result
+                self.stats["fetched"] += 1
+                self._store(account, symbols)
+        except Exception:
+            self.stats["failed"] += 1
+            logger.exception("symbol fetch for %s failed", account)
+            if isinstance(raw.exception(), BrokenExecutor):
+                with self._lock:
+                    self._pool = None
+        finally:
+            with self._lock:
+                self._inflight.pop(account, None)
+            fut.set_result(symbols)
+
+    def _store(self, account: str, symbols: List[str]) -> None:
+        """Cache the result; touch symbols_list.json only if the set changed."""
+        with self._lock:
+            prev = self._cache.get(account)
+            self._cache[account] = (time.monotonic(), symbols)
+        out = os.path.join(instance_dir_for(self.instances_root, account), SYMBOLS_FILE)
+        known = prev[1] if prev else _read_symbols(out)
+        if known == symbols and os.path.isfile(out):
+            self.stats["unchanged"] += 1
+            return
+        try:
+            tmp = out + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(symbols, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, out)
+            self.stats["written"] += 1
+        except Exception:
+            logger.exception("write %s failed", out)
+            return
+        resolver.invalidate(self.instances_root, account)
+
+    def forget(self, account: str) -> None:
+        with self._lock:
+            self._cache.pop(account, None)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+_services: Dict[Tuple[str, str], SymbolFetchService] = {}
+_services_lock = threading.Lock()
+
+def get_service(terminal_path: str, instances_root: str) -> SymbolFetchService:
+    """Process-wide service per (terminal, instances root), built from env on first use."""
+    key = (terminal_path, instances_root)
+    with _services_lock:
+        svc = _services.get(key)
+        if svc is None:
+            svc = _services[key] = SymbolFetchService.from_env(terminal_path, instances_root)
+        return svc
+
+def fetch_symbols(terminal_path: str, instances_root: str, account: str) -> list[str]:
+    """Fetch the symbol list of this instance (portable MT5) and save it to symbols_list.json.
+    Requires MT5 installed; does not store passwords.
+    """
+    return get_service(terminal_path, instances_root).fetch(account)
@@ -0,0 +1,151 @@
+import os, json, re, threading, difflib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from .mt5_handler import instance_dir_for
+
+# Broker decorations stripped when building the normalized-suffix map:
+# a separator suffix (EURUSD.r, GBPUSD-ECN, US30#, BTCUSD_i) or a trailing
+# lower-case run after an upper-case base (XAUUSDm, EURUSDpro).
+_SEP_SUFFIX_RE = re.compile(r"[._#\-+!][A-Za-z0-9]*$")
+_LOWER_SUFFIX_RE = re.compile(r"(?<=[A-Z0-9]{3})[a-z]+$")
+_NON_ALNUM_RE = re.compile(r"[^A-Z0-9]+")
+
+NGRAM = 2
+SHORTLIST_SIZE = 32
+LRU_SIZE = 1024
+
+def normalize_symbol(symbol: str) -> str:
+    """Drop a broker suffix and separators, then upper-case (case-sensitive input)."""
+    s = (symbol or "").strip()
+    base = _LOWER_SUFFIX_RE.sub("", _SEP_SUFFIX_RE.sub("", s)) or s
+    return _NON_ALNUM_RE.sub("", base.upper()) or s.upper()
+
+def _ngrams(s: str) -> set:
+    if len(s) <= NGRAM:
+        return {s} if s else set()
+    return {s[i:i + NGRAM] for i in range(len(s) - NGRAM + 1)}
+
+class SymbolIndex:
+    """Precomputed lookup structures for one account's symbols_list.json.
+
+    Resolution order: exact match, normalized-suffix match, then fuzzy match
+    scored with difflib only against an n-gram shortlist instead of the whole
+    list. Results are memoized in a small LRU keyed by (input, cutoff).
+    """
+
+    def __init__(self, symbols: List[str], stamp: Tuple[int, int] = (0, 0)):
+        self.stamp = stamp
+        raw = [str(s) for s in symbols]
+        self.symbols = [s.upper() for s in raw]
+        self.exact = set(self.symbols)
+        self.by_norm: Dict[str, List[str]] = {}
+        self.by_gram: Dict[str, List[int]] = {}
+        for i, sym in enumerate(self.symbols):
+            self.by_norm.setdefault(normalize_symbol(raw[i]), []).append(sym)
+            for g in _ngrams(sym):
+                self.by_gram.setdefault(g, []).append(i)
+        self._lru: "OrderedDict[Tuple[str, float], str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _shortlist(self, s: str) -> List[str]:
+        hits: Dict[int, int] = {}
+        for g in _ngrams(s):
+            for i in self.by_gram.get(g, ()):
+                hits[i] = hits.get(i, 0) + 1
+        if len(hits) > SHORTLIST_SIZE:
+            best = sorted(hits.items(), key=lambda kv: kv[1], reverse=True)[:SHORTLIST_SIZE]
+            return [self.symbols[i] for i, _ in best]
+        return [self.symbols[i] for i in hits]
+
+    @staticmethod
+    def _best(s: str, candidates: List[str], cutoff: float) -> Optional[str]:
+        # Same scoring and tie-break as difflib.get_close_matches(n=1)
+        sm = difflib.SequenceMatcher()
+        sm.set_seq2(s)
+        best = None
+        for x in candidates:
+            sm.set_seq1(x)
+            if sm.real_quick_ratio() >= cutoff and sm.quick_ratio() >= cutoff:
+                score = sm.ratio()
+                if score >= cutoff and (best is None or (score, x) > best):
+                    best = (score, x)
+        return best[1] if best else None
+
+    def _lookup(self, raw: str, cutoff: float) -> str:
+        s = raw.upper()
+        if s in self.exact:
+            return s
+        norm = self.by_norm.get(normalize_symbol(raw))
+        if norm:
+            return norm[0] if len(norm) == 1 else (self._best(s, norm, 0.0) or norm[0])
+        return self._best(s, self._shortlist(s), cutoff) or s
+
+    def resolve(self, symbol: str, cutoff: float = 0.65) -> str:
+        raw = (symbol or "").strip()
+        if not raw or not self.symbols:
+            return raw.upper()
+        key = (raw, cutoff)
+        with self._lock:
+            hit = self._lru.get(key)
+            if hit is not None:
+                self._lru.move_to_end(key)
+                return hit
+        out = self._lookup(raw, cutoff)
+        with self._lock:
+            self._lru[key] = out
+            if len(self._lru) > LRU_SIZE:
+                self._lru.popitem(last=False)
+        return out
+
+_EMPTY = SymbolIndex([])
+
+class SymbolResolver:
+    """Per-account cache of SymbolIndex objects.
+
+    Each lookup costs one os.stat(); the index is rebuilt only when the file's
+    (mtime, size) stamp changes or fetch_symbols calls invalidate().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indexes: Dict[str, SymbolIndex] = {}
+
+    @staticmethod
+    def _path(instances_root: str, account: str) -> str:
+        return os.path.join(instance_dir_for(instances_root, account), "symbols_list.json")
+
+    def index_for(self, instances_root: str, account: str) -> SymbolIndex:
+        path = self._path(instances_root, account)
+        try:
+            st = os.stat(path)
+        except OSError:
+            with self._lock:
+                self._indexes.pop(path, None)
+            return _EMPTY
+        with self._lock:
+            idx = self._indexes.get(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        if idx is not None and idx.stamp == stamp:
+            return idx
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                symbols = json.load(f)
+        except Exception:
+            symbols = []
+        idx = SymbolIndex(symbols if isinstance(symbols, list) else [], stamp)
+        with self._lock:
+            self._indexes[path] = idx
+        return idx
+
+    def resolve(self, instances_root: str, account: str, symbol: str, cutoff: float = 0.65) -> str:
+        return self.index_for(instances_root, account).resolve(symbol, cutoff)
+
+    def invalidate(self, instances_root: str, account: str) -> None:
+        with self._lock:
+            self._indexes.pop(self._path(instances_root, account), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+
+resolver = SymbolResolver()
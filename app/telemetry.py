@@ -0,0 +1,134 @@
+"""
+Per-instance resource telemetry for the terminals SessionManager launched.
+
+Every `interval` seconds one pass over the tracked (account, pid) pairs
+reads CPU%, RSS, thread count, handle count (open fds on POSIX) and uptime
+for each process inside psutil's oneshot() (one /proc read or one Windows
+query per process). psutil.Process objects are kept between passes because
+cpu_percent() is the CPU time used since the previous call on the same
+object. A new pid for an account (restart) or a reused pid with a
+different create_time starts a fresh object.
+
+Samples go into a fixed-size deque per account (`history` entries), so
+memory stays flat however long the server runs. Accounts that disappear
+from the registry are dropped on the next pass.
+"""
+import time, threading, logging
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# one sample: (ts, cpu_pct, rss_bytes, threads, handles)
+FIELDS = ("ts", "cpu_pct", "rss", "threads", "handles")
+
+class TelemetrySampler:
+    def __init__(self, targets_fn: Callable[[], Iterable[Tuple[str, Optional[int]]]],
+                 interval: float = 5.0, history: int = 720):
+        """targets_fn() -> [(account, pid or None)]; history = samples kept per account
+        (720 x 5 s = one hour)."""
+        self.targets_fn = targets_fn
+        self.interval = interval
+        self.history = history
+        self._procs: Dict[str, Any] = {}                 # account -> psutil.Process
+        self._rings: Dict[str, deque] = {}
+        self._current: Dict[str, Dict[str, Any]] = {}
+        self._host: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.last_pass_ms = 0.0
+
+    # ------------------------ sampling ------------------------ #
+
+    def _process(self, psutil, account: str, pid: int):
+        p = self._procs.get(account)
+        if p is not None and p.pid == pid:
+            return p
+        p = psutil.Process(pid)
+        p.cpu_percent(None)     # prime: the first call always returns 0.0
+        self._procs[account] = p
+        return p
+
+    def sample_once(self) -> None:
+        import psutil
+        t0 = time.perf_counter()
+        now = time.time()
+        targets = {str(a): pid for a, pid in self.targets_fn()}
+        current = {}
+        samples: List[Tuple[str, tuple]] = []
+        for account, pid in targets.items():
+            if not pid:
+                self._procs.pop(account, None)
+                current[account] = {"pid": None, "running": False}
+                continue
+            try:
+                p = self._process(psutil, account, int(pid))
+                if not p.is_running():      # pid reused by another process (create_time differs)
+                    self._procs.pop(account, None)
+                    p = self._process(psutil, account, int(pid))
+                with p.oneshot():
+                    cpu = p.cpu_percent(None)
+                    rss = p.memory_info().rss
+                    threads = p.num_threads()
+                    handles = p.num_handles() if hasattr(p, "num_handles") else p.num_fds()
+                    started = p.create_time()
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                self._procs.pop(account, None)
+                current[account] = {"pid": pid, "running": False}
+                continue
+            except psutil.AccessDenied:
+                current[account] = {"pid": pid, "running": True, "error": "access denied"}
+                continue
+            sample = (now, round(cpu, 1), rss, threads, handles)
+            samples.append((account, sample))
+            current[account] = dict(zip(FIELDS, sample), pid=pid, running=True, uptime=round(now - started))
+        host = {"cpu_pct": psutil.cpu_percent(None), "cpu_count": psutil.cpu_count() or 1,
+                "mem_used": psutil.virtual_memory().used, "mem_total": psutil.virtual_memory().total}
+        with self._lock:
+            for account in [a for a in self._rings if a not in targets]:
+                del self._rings[account]
+            for account in [a for a in self._procs if a not in targets]:
+                del self._procs[account]
+            for account, sample in samples:
+                ring = self._rings.get(account)
+                if ring is None:
+                    ring = self._rings[account] = deque(maxlen=self.history)
+                ring.append(sample)
+            self._current = current
+            self._host = dict(host, ts=now)
+        self.last_pass_ms = (time.perf_counter() - t0) * 1000
+
+    # ------------------------ reading ------------------------ #
+
+    def current(self) -> Dict[str, Any]:
+        with self._lock:
+            accounts = {a: dict(v) for a, v in self._current.items()}
+            host = dict(self._host)
+        return {"interval": self.interval, "history": self.history, "pass_ms": round(self.last_pass_ms, 2),
+                "host": host, "accounts": accounts}
+
+    def series(self, account: str, n: Optional[int] = None) -> Optional[Dict[str, List]]:
+        """Column-wise history, oldest first: {"ts": [...], "cpu_pct": [...], ...}; None if unknown."""
+        with self._lock:
+            ring = self._rings.get(str(account))
+            if ring is None:
+                return None
+            rows = list(ring)
+        if n:
+            rows = rows[-n:]
+        return {f: [r[i] for r in rows] for i, f in enumerate(FIELDS)}
+
+    def start(self) -> None:
+        if self._thread is not None or self.interval <= 0:
+            return
+
+        def loop():
+            while True:
+                try:
+                    self.sample_once()
+                except Exception:
+                    logger.exception("telemetry sample error")
+                time.sleep(max(0.5, self.interval))
+
+        self._thread = threading.Thread(target=loop, name="telemetry", daemon=True)
+        self._thread.start()
@@ -0,0 +1,174 @@
+"""
+Warm pool of pre-provisioned instance directories.
+
+Provisioning an instance (ensure_instance) on the /register path costs a
+full walk + link/copy of the MT5 program and profile trees. The pool keeps
+`size` instances already built under instances_root:
+
+    .warm-build-<token>          being built (removed at start if left over)
+    .warm-<digest>-<token>       ready, built from sources with that digest
+
+claim(dst) renames a ready directory to the account's instance directory,
+one os.rename on the same file system, and wakes the refill thread; it does
+not touch the source trees. The digest is Provisioner.source_digest()
+(program_source + profile_source content), computed by the refill thread
+at start and every `check_interval` seconds: when either source changes,
+ready entries with the old digest are deleted and rebuilt, and claim() only
+hands out entries matching the last computed digest.
+"""
+import os, time, uuid, shutil, threading, logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PREFIX = ".warm-"
+BUILD_PREFIX = ".warm-build-"
+DIGEST_LEN = 16
+
+class WarmPool:
+    def __init__(self, root: str, build_fn: Callable[[str], Any], digest_fn: Callable[[], str],
+                 size: int = 2, concurrency: int = 1, check_interval: float = 300.0):
+        """build_fn(path) provisions a fresh instance at `path`; digest_fn() -> current source digest."""
+        self.root = root
+        self.build_fn = build_fn
+        self.digest_fn = digest_fn
+        self.size = max(0, size)
+        self.concurrency = max(1, concurrency)
+        self.check_interval = check_interval
+        self._ready: List[str] = []         # directory names, oldest first
+        self._building = 0
+        self._digest: Optional[str] = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.counters = {"claimed": 0, "missed": 0, "built": 0, "failed": 0, "discarded": 0}
+        self.last_build_s: Optional[float] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def _tag(self, digest: str) -> str:
+        return f"{PREFIX}{digest[:DIGEST_LEN]}-"
+
+    # ------------------------ claiming ------------------------ #
+
+    def claim(self, dst: str) -> bool:
+        """Move a ready instance to `dst` (which must not exist yet). False = build it yourself."""
+        if self._thread is None or os.path.exists(dst):
+            return False
+        with self._lock:
+            # digest cached by refill(): no walk over the source trees on the register path
+            tag = self._tag(self._digest) if self._digest else None
+            name = next((n for n in self._ready if n.startswith(tag)), None) if tag else None
+            if name is not None:
+                self._ready.remove(name)
+        self._wake.set()    # refill, and re-check the sources for staleness
+        if name is None:
+            self.counters["missed"] += 1
+            return False
+        try:
+            os.rename(os.path.join(self.root, name), dst)
+        except OSError as e:
+            self.counters["missed"] += 1
+            logger.warning("Warm pool claim failed (%s -> %s): %s", name, dst, e)
+            self._discard(name)
+            return False
+        self.counters["claimed"] += 1
+        return True
+
+    # ------------------------ refilling ------------------------ #
+
+    def _discard(self, name: str) -> None:
+        shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+        self.counters["discarded"] += 1
+
+    def _build(self, digest: str) -> None:
+        token = uuid.uuid4().hex[:12]
+        tmp = os.path.join(self.root, BUILD_PREFIX + token)
+        name = None
+        t0 = time.perf_counter()
+        try:
+            self.build_fn(tmp)
+            os.rename(tmp, os.path.join(self.root, self._tag(digest) + token))
+            name = self._tag(digest) + token
+            self.last_build_s = round(time.perf_counter() - t0, 3)
+            self.counters["built"] += 1
+        except Exception:
+            self.counters["failed"] += 1
+            logger.exception("Warm pool build failed")
+            shutil.rmtree(tmp, ignore_errors=True)
+        finally:
+            with self._lock:
+                self._building -= 1
+                if name:
+                    self._ready.append(name)
+            self._wake.set()
+
+    def _scan(self) -> None:
+        """Adopt ready directories left by a previous run; remove half-built ones."""
+        try:
+            names = sorted(os.listdir(self.root))
+        except FileNotFoundError:
+            return
+        for name in names:
+            if name.startswith(BUILD_PREFIX):
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+            elif name.startswith(PREFIX):
+                with self._lock:
+                    if name not in self._ready:
+                        self._ready.append(name)
+
+    def refill(self) -> int:
+        """Drop stale entries and start builds up to `size`. Returns how many builds were started."""
+        digest = self.digest_fn()
+        tag = self._tag(digest)
+        with self._lock:
+            self._digest = digest
+            stale = [n for n in self._ready if not n.startswith(tag)]
+            self._ready = [n for n in self._ready if n.startswith(tag)]
+            missing = self.size - len(self._ready) - self._building
+            n = max(0, min(missing, self.concurrency - self._building))
+            self._building += n
+        for name in stale:
+            self._discard(name)
+        if stale:
+            logger.info("Warm pool: sources changed, discarded %d stale instance(s)", len(stale))
+        if n and self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="warm-pool")
+        for i in range(n):
+            try:
+                self._executor.submit(self._build, digest)
+            except RuntimeError:    # interpreter shutting down
+                with self._lock:
+                    self._building -= n - i
+                return i
+        return n
+
+    def start(self) -> None:
+        if self._thread is not None or not self.enabled:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        self._scan()
+
+        def loop():
+            while True:
+                self._wake.clear()
+                try:
+                    self.refill()
+                except Exception:
+                    logger.exception("warm pool refill error")
+                self._wake.wait(self.check_interval)
+
+        self._thread = threading.Thread(target=loop, name="warm-pool", daemon=True)
+        self._thread.start()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            tag = self._tag(self._digest) if self._digest else None
+            ready = sum(1 for n in self._ready if tag is None or n.startswith(tag))
+            return dict(self.counters, size=self.size, concurrency=self.concurrency, ready=ready,
+                        stale=len(self._ready) - ready, building=self._building,
+                        last_build_s=self.last_build_s, started=self._thread is not None)
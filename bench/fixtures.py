@@ -0,0 +1,117 @@
+"""
+Benchmark fixtures: a throw-away MT5_INSTANCES_DIR with N fake accounts.
+
+Each account gets a symbols_list.json shaped like a real broker's: forex
+majors/crosses/exotics, metals, indices, energies, crypto and a long tail of
+CFD stock tickers, all with one broker suffix style per account ("m", ".r",
+"_i", "pro" or none). Deterministic for a given seed, so runs are comparable.
+
+    python -m bench.fixtures --out /tmp/instances --accounts 20 --symbols 3000
+"""
+import os, sys, json, random, argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.mt5_handler import instance_dir_for  # noqa: E402
+
+CURRENCIES = ["USD", "EUR", "GBP", "JPY", "CHF", "AUD", "NZD", "CAD", "SEK", "NOK", "DKK", "PLN",
+              "HUF", "CZK", "TRY", "ZAR", "MXN", "SGD", "HKD", "CNH", "THB", "ILS", "RUB", "INR"]
+METALS = ["XAUUSD", "XAGUSD", "XPTUSD", "XPDUSD", "XAUEUR", "XAGEUR", "XAUAUD", "XAUJPY"]
+INDICES = ["US30", "US500", "NAS100", "GER40", "UK100", "FRA40", "JP225", "AUS200", "HK50", "ESP35",
+           "EU50", "SWI20", "NETH25", "CHINA50", "US2000", "USDX"]
+ENERGIES = ["USOIL", "UKOIL", "XNGUSD", "BRENT", "WTI"]
+CRYPTO_BASES = ["BTC", "ETH", "LTC", "XRP", "BCH", "ADA", "DOT", "SOL", "DOGE", "LINK", "AVAX", "MATIC",
+                "UNI", "XLM", "TRX", "ATOM", "ETC", "FIL", "NEAR", "ALGO"]
+SUFFIXES = ["m", ".r", "_i", "pro", ""]
+
+def core_symbols() -> list:
+    """Suffix-free instruments a TradingView alert would name."""
+    fx = [a + b for a in CURRENCIES for b in CURRENCIES if a != b]
+    crypto = [c + q for c in CRYPTO_BASES for q in ("USD", "EUR", "JPY")]
+    return METALS + INDICES + ENERGIES + fx + crypto
+
+def _tickers(rnd: random.Random, n: int) -> list:
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    out = set()
+    while len(out) < n:
+        out.add("".join(rnd.choice(letters) for _ in range(rnd.randint(2, 5))) + rnd.choice([".US", ".UK", ".DE", ".FR", ""]))
+    return sorted(out)
+
+def broker_symbols(rnd: random.Random, count: int, suffix: str) -> list:
+    core = core_symbols()
+    names = [s + suffix for s in core[:count]]
+    if len(names) < count:
+        names += [t + suffix for t in _tickers(rnd, count - len(names))]
+    return sorted(set(names))
+
+def build_instances(root: str, accounts: int, symbols: int, seed: int = 4609) -> dict:
+    """-> {account number: suffix}; writes <root>/<account>/symbols_list.json and the signals dir."""
+    rnd = random.Random(seed)
+    out = {}
+    for i in range(accounts):
+        acc = str(90000000 + i)
+        suffix = SUFFIXES[i % len(SUFFIXES)]
+        inst = instance_dir_for(root, acc)
+        os.makedirs(os.path.join(inst, "MQL5", "Files", "signals"), exist_ok=True)
+        with open(os.path.join(inst, "symbols_list.json"), "w", encoding="utf-8") as f:
+            json.dump(broker_symbols(rnd, symbols, suffix), f)
+        out[acc] = suffix
+    return out
+
+# signal mixes: kind -> weight
+DEFAULT_MIX = {"exact": 60, "bare": 30, "fuzzy": 8, "invalid": 2}
+
+def parse_mix(spec: str) -> dict:
+    """'exact=60,bare=30,fuzzy=8,invalid=2' -> {kind: weight}"""
+    mix = {}
+    for part in (spec or "").split(","):
+        if part.strip():
+            k, _, v = part.partition("=")
+            mix[k.strip()] = float(v or 1)
+    unknown = set(mix) - set(DEFAULT_MIX)
+    if unknown:
+        raise ValueError(f"unknown signal kinds: {sorted(unknown)}")
+    return mix or dict(DEFAULT_MIX)
+
+def _typo(rnd: random.Random, s: str) -> str:
+    i = rnd.randrange(len(s))
+    return s[:i] + s[i + 1:] if rnd.random() < 0.5 else s[:i] + rnd.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") + s[i:]
+
+def make_signal(rnd: random.Random, account: str, suffix: str, kind: str) -> dict:
+    """One webhook payload. exact: broker name; bare: without suffix; fuzzy: with a typo; invalid: no volume."""
+    base = rnd.choice(METALS + INDICES[:6] + ["EURUSD", "GBPUSD", "USDJPY", "AUDUSD", "USDCAD", "BTCUSD"])
+    symbol = {"exact": base + suffix, "bare": base, "fuzzy": _typo(rnd, base)}.get(kind, base)
+    sig = {"account_number": account, "symbol": symbol, "action": rnd.choice(["BUY", "SELL", "LONG", "SHORT"]),
+           "volume": round(rnd.uniform(0.01, 2), 2), "take_profit": 2000.0, "stop_loss": 1990.0}
+    if kind == "invalid":
+        del sig["volume"]
+    return sig
+
+def signal_stream(accounts: dict, mix: dict, seed: int = 4609):
+    """Endless deterministic sequence of (kind, payload)."""
+    rnd = random.Random(seed)
+    kinds, weights = list(mix), list(mix.values())
+    accs = sorted(accounts)
+    while True:
+        kind = rnd.choices(kinds, weights)[0]
+        acc = rnd.choice(accs)
+        yield kind, make_signal(rnd, acc, accounts[acc], kind)
+
+def build_log(path: str, lines: int, seed: int = 4609) -> int:
+    """Pre-fill a log file so /logs has something realistic to tail. Returns its size."""
+    rnd = random.Random(seed)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(lines):
+            f.write(f"2024-01-01 00:{i // 3600 % 60:02d}:{i % 60:02d},000 [INFO] [WEBHOOK] acc={90000000 + rnd.randint(0, 99)} "
+                    f"sym_in=XAUUSD sym_out=XAUUSDm action=BUY vol=0.{rnd.randint(1, 9)}\n")
+    return os.path.getsize(path)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--out", required=True)
+    ap.add_argument("--accounts", type=int, default=20)
+    ap.add_argument("--symbols", type=int, default=3000)
+    ap.add_argument("--seed", type=int, default=4609)
+    args = ap.parse_args()
+    accs = build_instances(args.out, args.accounts, args.symbols, args.seed)
+    print(json.dumps({"instances_dir": os.path.abspath(args.out), "accounts": len(accs)}, indent=2))
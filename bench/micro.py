@@ -0,0 +1,90 @@
+"""
+Micro-benchmarks for the per-signal hot path, on bench.fixtures data.
+
+- symbol mapping: auto_map_symbol (difflib over the whole list, the original
+  path) vs the cached per-account resolver, for each signal kind
+- signal delivery: write_signal (one JSON file per signal) vs journal append
+
+    python -m bench.micro --accounts 5 --symbols 3000 --iterations 2000 --json results/micro.json
+"""
+import os, sys, json, time, random, shutil, argparse, tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench.fixtures import build_instances, make_signal  # noqa: E402
+from app.signal_router import auto_map_symbol, load_symbol_list, write_signal, deliver_signal  # noqa: E402
+from app.symbol_resolver import SymbolResolver  # noqa: E402
+from app.signal_journal import close_writer, journal_path  # noqa: E402
+from app.mt5_handler import instance_dir_for  # noqa: E402
+
+def stats(samples: list) -> dict:
+    """Latency summary in microseconds (samples are seconds)."""
+    if not samples:
+        return {"n": 0}
+    s = sorted(samples)
+    pick = lambda q: s[min(len(s) - 1, int(q * len(s)))]
+    return {"n": len(s), "mean_us": round(sum(s) / len(s) * 1e6, 2), "p50_us": round(pick(0.5) * 1e6, 2),
+            "p99_us": round(pick(0.99) * 1e6, 2), "max_us": round(s[-1] * 1e6, 2),
+            "ops_per_s": round(len(s) / sum(s), 1) if sum(s) else None}
+
+def _time_each(fn, args_list) -> list:
+    out = []
+    clock = time.perf_counter
+    for args in args_list:
+        t0 = clock()
+        fn(*args)
+        out.append(clock() - t0)
+    return out
+
+def bench_symbol_mapping(root: str, accounts: dict, iterations: int, seed: int) -> dict:
+    rnd = random.Random(seed)
+    res = {}
+    resolver = SymbolResolver()
+    lists = {a: load_symbol_list(root, a) for a in accounts}
+    for kind in ("exact", "bare", "fuzzy"):
+        cases = []
+        for _ in range(iterations):
+            acc = rnd.choice(sorted(accounts))
+            cases.append((acc, make_signal(rnd, acc, accounts[acc], kind)["symbol"]))
+        legacy = [(sym, lists[acc], 0.65) for acc, sym in cases]
+        # difflib is slow on large lists: sample fewer legacy calls
+        res[f"auto_map_symbol[{kind}]"] = stats(_time_each(auto_map_symbol, legacy[:max(50, iterations // 10)]))
+        resolver.clear()
+        first = list({acc: (acc, sym) for acc, sym in reversed(cases)}.values())   # one per account
+        res[f"resolver.cold[{kind}]"] = stats(_time_each(lambda a, s: resolver.resolve(root, a, s), first))
+        res[f"resolver[{kind}]"] = stats(_time_each(lambda a, s: resolver.resolve(root, a, s), cases))
+    return res
+
+def bench_delivery(root: str, accounts: dict, iterations: int, seed: int) -> dict:
+    rnd = random.Random(seed)
+    acc = sorted(accounts)[0]
+    signals = [(root, acc, make_signal(rnd, acc, accounts[acc], "exact")) for _ in range(iterations)]
+    res = {"write_signal": stats(_time_each(write_signal, signals))}
+    res["deliver_signal[journal]"] = stats(_time_each(lambda r, a, s: deliver_signal(r, a, s, "journal"), signals))
+    close_writer(journal_path(instance_dir_for(root, acc)))
+    return res
+
+def run(accounts: int, symbols: int, iterations: int, seed: int = 4609) -> dict:
+    work = tempfile.mkdtemp(prefix="micro-bench-")
+    try:
+        accs = build_instances(work, accounts, symbols, seed)
+        out = {"params": {"accounts": accounts, "symbols": symbols, "iterations": iterations, "seed": seed}}
+        out["symbol_mapping"] = bench_symbol_mapping(work, accs, iterations, seed)
+        out["delivery"] = bench_delivery(work, accs, iterations, seed)
+        return out
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--accounts", type=int, default=5)
+    ap.add_argument("--symbols", type=int, default=3000)
+    ap.add_argument("--iterations", type=int, default=2000)
+    ap.add_argument("--seed", type=int, default=4609)
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args()
+    result = run(args.accounts, args.symbols, args.iterations, args.seed)
+    print(json.dumps(result, indent=2))
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,111 @@
+"""
+Benchmark: full clone (rmtree + copytree + overlay) vs incremental provisioning
+vs claiming a pre-built instance from the warm pool.
+
+Builds a synthetic MT5 program folder + profile folder in a temp dir, then
+provisions --accounts instances each way and reports wall time and bytes
+written. Runs anywhere (no MT5 needed).
+
+    python -m bench.provision_bench --accounts 20 --files 400 --size-mb 300
+    python -m bench.provision_bench --json results/provision.json
+"""
+import os, sys, json, time, shutil, random, argparse, tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.session_manager import SessionManager  # noqa: E402
+
+def build_sources(root: str, files: int, size_mb: float, seed: int = 4609):
+    """Program tree weighted like a real MT5 install: a few big binaries, many small files."""
+    rnd = random.Random(seed)
+    prog = os.path.join(root, "program")
+    prof = os.path.join(root, "profile")
+    total = int(size_mb * 1024 * 1024)
+    big = {"terminal64.exe": 0.35, "metaeditor64.exe": 0.25, "MetaTester64.exe": 0.15}
+    for name, share in big.items():
+        with open(os.path.join(_mk(prog), name), "wb") as f:
+            f.write(os.urandom(int(total * share)))
+    rest = int(total * (1 - sum(big.values())))
+    dirs = ["Sounds", "Config", "MQL5/Include/Std", "MQL5/Indicators/Examples", "Languages", "webinstall"]
+    for i in range(files):
+        d = os.path.join(prog, *rnd.choice(dirs).split("/"))
+        with open(os.path.join(_mk(d), f"f{i:05d}.bin"), "wb") as f:
+            f.write(os.urandom(max(1, rest // files)))
+    for sub, n in (("config", 4), ("MQL5/Profiles/Default", 6), ("MQL5/Experts", 2)):
+        d = os.path.join(prof, *sub.split("/"))
+        for i in range(n):
+            with open(os.path.join(_mk(d), f"p{i}.dat"), "wb") as f:
+                f.write(os.urandom(8 * 1024))
+    return prog, prof
+
+def _mk(d: str) -> str:
+    os.makedirs(d, exist_ok=True)
+    return d
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return time.perf_counter() - t0, out
+
+def run(accounts: int, files: int, size_mb: float, link_mode: str) -> dict:
+    work = tempfile.mkdtemp(prefix="provision-bench-")
+    try:
+        prog, prof = build_sources(work, files, size_mb)
+        terminal = os.path.join(prog, "terminal64.exe")
+        res = {"accounts": accounts, "files": files, "size_mb": size_mb, "link_mode": link_mode}
+
+        full = SessionManager(os.path.join(work, "full"), prof, terminal, provision_mode="full")
+        t, _ = _timed(lambda: [full.ensure_instance(f"A{i}") for i in range(accounts)])
+        res["full_clone_s"] = round(t, 3)
+        t, _ = _timed(lambda: [full.ensure_instance(f"A{i}") for i in range(accounts)])
+        res["full_reclone_s"] = round(t, 3)
+
+        inc = SessionManager(os.path.join(work, "inc"), prof, terminal, link_mode=link_mode)
+        t, stats = _timed(lambda: [inc.provisioner.sync(inc._instance_dir(f"A{i}")) for i in range(accounts)])
+        res["incremental_first_s"] = round(t, 3)
+        res["incremental_first_bytes_copied"] = sum(s["bytes_copied"] for s in stats)
+        t, stats = _timed(lambda: [inc.provisioner.sync(inc._instance_dir(f"A{i}")) for i in range(accounts)])
+        res["incremental_resync_noop_s"] = round(t, 3)
+        res["incremental_resync_noop_touched"] = sum(s["hardlink"] + s["reflink"] + s["copy"] for s in stats)
+
+        # one profile file changes at the source -> only that file is re-copied per instance
+        with open(os.path.join(prof, "config", "p0.dat"), "ab") as f:
+            f.write(b"changed")
+        t, stats = _timed(lambda: [inc.provisioner.sync(inc._instance_dir(f"A{i}")) for i in range(accounts)])
+        res["incremental_resync_one_change_s"] = round(t, 3)
+        res["incremental_resync_one_change_touched"] = sum(s["hardlink"] + s["reflink"] + s["copy"] for s in stats)
+        # warm pool: instances built ahead of time, /register only renames one into place
+        warm = SessionManager(os.path.join(work, "warm"), prof, terminal, link_mode=link_mode,
+                              warm_pool_size=accounts, warm_pool_concurrency=4, warm_pool_check_interval=3600)
+        warm.warm_pool.start()
+        deadline = time.time() + 600
+        while warm.warm_pool.stats()["ready"] < accounts and time.time() < deadline:
+            time.sleep(0.05)
+        t, _ = _timed(lambda: [warm.ensure_instance(f"A{i}") for i in range(accounts)])
+        res["warm_claim_s"] = round(t, 6)   # a rename per account: sub-millisecond
+        res["warm_claimed"] = warm.warm_pool.stats()["claimed"]
+        warm.warm_pool.size = 0     # no refill into a work dir about to be removed
+        while warm.warm_pool.stats()["building"] and time.time() < deadline:
+            time.sleep(0.05)
+        res["full_bytes_written"] = int(size_mb * 1024 * 1024) * accounts
+        res["speedup_first"] = round(res["full_clone_s"] / max(res["incremental_first_s"], 1e-9), 1)
+        res["speedup_warm"] = round(res["incremental_first_s"] / max(res["warm_claim_s"], 1e-9), 1)
+        res["speedup_resync"] = round(res["full_reclone_s"] / max(res["incremental_resync_noop_s"], 1e-9), 1)
+        return res
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--accounts", type=int, default=10)
+    ap.add_argument("--files", type=int, default=300)
+    ap.add_argument("--size-mb", type=float, default=100)
+    ap.add_argument("--link-mode", default="hardlink", choices=["hardlink", "reflink", "copy"])
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args()
+
+    result = run(args.accounts, args.files, args.size_mb, args.link_mode)
+    print(json.dumps(result, indent=2))
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
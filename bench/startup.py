@@ -0,0 +1,128 @@
+"""
+Startup-time profile: `import server` and `server.create_app()` in a fresh
+interpreter, against a throw-away environment (temp DB, logs, instances dir).
+
+Reports median/min import and boot time over --runs, the slowest modules
+imported by server (from -X importtime) and any heavy dependency that got
+imported eagerly although it should load on first use (LAZY).
+
+    python -m bench.startup
+    python -m bench.startup --runs 7 --top 15 --json results/startup.json
+    python -m bench.startup --import-budget-ms 600 --boot-budget-ms 0   # 0 = no boot budget
+
+Exit status is 1 when a budget is exceeded or a LAZY module was imported by
+`import server`. The default budgets (IMPORT_BUDGET_MS / BOOT_BUDGET_MS,
+or STARTUP_IMPORT_BUDGET_MS / STARTUP_BOOT_BUDGET_MS) are the measured
+medians, about 230 ms import and 10 ms boot on the reference box, plus
+headroom for slower machines.
+"""
+import os, sys, json, shutil, argparse, tempfile, subprocess, statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# must not be imported by `import server` (loaded on first use instead)
+LAZY = ("MetaTrader5", "numpy", "psutil", "smtplib", "multiprocessing", "concurrent.futures.process")
+
+IMPORT_BUDGET_MS = 400.0
+BOOT_BUDGET_MS = 100.0
+
+CHILD = """
+import sys, time, json, threading
+t0 = time.perf_counter()
+import server
+t1 = time.perf_counter()
+eager = [m for m in %r if m in sys.modules]
+threads = threading.active_count()
+server.create_app()
+t2 = time.perf_counter()
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "boot_ms": (t2 - t1) * 1000, "eager": eager,
+                  "threads_after_import": threads, "threads_after_boot": threading.active_count()}))
+""" % (LAZY,)
+
+def _env(work: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "DB_PATH": os.path.join(work, "startup.db"), "LOG_DIR": os.path.join(work, "logs"),
+        "MT5_INSTANCES_DIR": os.path.join(work, "instances"), "MT5_MAIN_PATH": os.path.join(work, "terminal64.exe"),
+        "SYMBOL_AUTO_FETCH": "false", "SMTP_HOST": "", "MONITOR_INTERVAL": "3600", "PYTHONDONTWRITEBYTECODE": "1",
+    })
+    return env
+
+def _child(work: str, importtime: bool = False) -> subprocess.CompletedProcess:
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", CHILD]
+    return subprocess.run(cmd, cwd=ROOT, env=_env(work), capture_output=True, text=True, check=True)
+
+def parse_importtime(stderr: str, top: int) -> list:
+    """Modules imported (directly) by server, slowest first: [(name, cumulative ms)]."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum, name = line[len("import time:"):].split("|")
+        if not cum.strip().isdigit():
+            continue    # header line
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((depth, name.strip(), int(cum) / 1000))
+    end = next((i for i, (d, n, _) in enumerate(rows) if d == 0 and n == "server"), None)
+    if end is None:
+        return []
+    start = max((i for i, (d, _, _) in enumerate(rows[:end]) if d == 0), default=-1) + 1
+    children = [(n, round(ms, 2)) for d, n, ms in rows[start:end] if d == 1]
+    return sorted(children, key=lambda r: -r[1])[:top]
+
+def run(runs: int = 5, top: int = 10) -> dict:
+    samples = []
+    for _ in range(max(1, runs)):
+        work = tempfile.mkdtemp(prefix="startup-bench-")
+        try:
+            samples.append(json.loads(_child(work).stdout.strip().splitlines()[-1]))
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+    work = tempfile.mkdtemp(prefix="startup-bench-")
+    try:
+        slowest = parse_importtime(_child(work, importtime=True).stderr, top)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    imp = [s["import_ms"] for s in samples]
+    boot = [s["boot_ms"] for s in samples]
+    return {"params": {"runs": len(samples), "python": sys.version.split()[0], "platform": sys.platform},
+            "import_ms": round(statistics.median(imp), 2), "import_min_ms": round(min(imp), 2),
+            "boot_ms": round(statistics.median(boot), 2), "boot_min_ms": round(min(boot), 2),
+            "threads_after_import": samples[-1]["threads_after_import"],
+            "threads_after_boot": samples[-1]["threads_after_boot"],
+            "eager_heavy": samples[-1]["eager"],
+            "slowest_imports_ms": dict(slowest)}
+
+def check(result: dict, import_budget: float = 0.0, boot_budget: float = 0.0) -> list:
+    problems = []
+    if import_budget and result["import_ms"] > import_budget:
+        problems.append(f"import {result['import_ms']:.1f} ms > budget {import_budget:.0f} ms")
+    if boot_budget and result["boot_ms"] > boot_budget:
+        problems.append(f"boot {result['boot_ms']:.1f} ms > budget {boot_budget:.0f} ms")
+    if result["eager_heavy"]:
+        problems.append(f"imported eagerly by `import server`: {', '.join(result['eager_heavy'])}")
+    if result["threads_after_import"] > 1:
+        problems.append(f"{result['threads_after_import'] - 1} thread(s) started by `import server`")
+    return problems
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=10)
+    ap.add_argument("--import-budget-ms", type=float, default=float(os.getenv("STARTUP_IMPORT_BUDGET_MS", IMPORT_BUDGET_MS)))
+    ap.add_argument("--boot-budget-ms", type=float, default=float(os.getenv("STARTUP_BOOT_BUDGET_MS", BOOT_BUDGET_MS)))
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args(argv)
+    result = run(args.runs, args.top)
+    print(json.dumps(result, indent=2))
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    problems = check(result, args.import_budget_ms, args.boot_budget_ms)
+    for p in problems:
+        print(f"!! {p}", file=sys.stderr)
+    return 1 if problems else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
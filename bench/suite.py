@@ -0,0 +1,123 @@
+"""
+Run the whole benchmark suite and compare it with a saved baseline.
+
+    python -m bench.suite --json results/current.json
+    python -m bench.suite --json results/current.json --baseline results/baseline.json --tolerance 0.15
+    python -m bench.suite --compare results/baseline.json results/current.json
+
+Runs bench.micro in-process, bench.startup (fresh interpreters) and
+bench.webhook_bench once per driver in a child process (each boots its own
+server.py environment). Comparison walks both result trees: throughput keys
+(*_rps, ops_per_s) regress when they drop, latency keys (p50/p90/p99) and
+startup times (import_ms, boot_ms) when they grow, by more than --tolerance.
+Exit status is 1 when --fail-on-regression is given and anything regressed.
+"""
+import os, sys, json, argparse, tempfile, subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench import micro, startup  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run_webhook(driver: str, args) -> dict:
+    fd, out = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        cmd = [sys.executable, "-m", "bench.webhook_bench", "--driver", driver, "--json", out,
+               "--concurrency", str(args.concurrency), "--requests", str(args.requests),
+               "--duration", str(args.duration), "--accounts", str(args.accounts),
+               "--symbols", str(args.symbols), "--log-lines", str(args.log_lines), "--mix", args.mix]
+        subprocess.run(cmd, cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+        with open(out, "r", encoding="utf-8") as f:
+            return json.load(f)
+    finally:
+        os.remove(out)
+
+def _flatten(tree, prefix=""):
+    if isinstance(tree, dict):
+        for k, v in tree.items():
+            if k in ("params", "status"):
+                continue
+            yield from _flatten(v, f"{prefix}.{k}" if prefix else k)
+    elif isinstance(tree, (int, float)) and not isinstance(tree, bool):
+        yield prefix, float(tree)
+
+def _direction(key: str) -> int:
+    """+1 higher is better, -1 lower is better, 0 not compared."""
+    leaf = key.rsplit(".", 1)[-1]
+    if leaf.endswith("_rps") or leaf == "ops_per_s":
+        return 1
+    if leaf.startswith(("p50", "p90", "p99")) or leaf in ("import_ms", "boot_ms"):
+        return -1
+    return 0
+
+def compare(baseline: dict, current: dict, tolerance: float = 0.10) -> list:
+    """-> [(key, baseline, current, change ratio, 'regression' | 'improvement' | 'ok')]"""
+    base = dict(_flatten(baseline))
+    rows = []
+    for key, cur in _flatten(current):
+        d = _direction(key)
+        if not d or key not in base or not base[key]:
+            continue
+        change = (cur - base[key]) / base[key]
+        better = change * d
+        verdict = "regression" if better < -tolerance else "improvement" if better > tolerance else "ok"
+        rows.append((key, base[key], cur, change, verdict))
+    return rows
+
+def print_comparison(rows: list) -> None:
+    width = max((len(r[0]) for r in rows), default=10)
+    for key, b, c, change, verdict in rows:
+        mark = {"regression": "!!", "improvement": "++"}.get(verdict, "  ")
+        print(f"{mark} {key:<{width}}  {b:>12.3f} -> {c:>12.3f}  {change * 100:+7.1f}%")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--drivers", default="client,http")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--duration", type=float, default=0.0)
+    ap.add_argument("--accounts", type=int, default=20)
+    ap.add_argument("--symbols", type=int, default=3000)
+    ap.add_argument("--log-lines", type=int, default=200000)
+    ap.add_argument("--mix", default="")
+    ap.add_argument("--iterations", type=int, default=2000, help="micro-benchmark iterations")
+    ap.add_argument("--startup-runs", type=int, default=5, help="0 = skip the startup profile")
+    ap.add_argument("--json", help="write results to this file")
+    ap.add_argument("--baseline", help="compare against this earlier result file")
+    ap.add_argument("--tolerance", type=float, default=0.10)
+    ap.add_argument("--fail-on-regression", action="store_true")
+    ap.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="only compare two result files")
+    args = ap.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0], "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        with open(args.compare[1], "r", encoding="utf-8") as f:
+            current = json.load(f)
+    else:
+        current = {"micro": micro.run(min(args.accounts, 5), args.symbols, args.iterations)}
+        if args.startup_runs:
+            current["startup"] = startup.run(args.startup_runs)
+        for drv in [d for d in args.drivers.split(",") if d]:
+            current[f"webhook_{drv}"] = run_webhook(drv, args)
+        if args.json:
+            os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(current, f, indent=2)
+        baseline = None
+        if args.baseline:
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        else:
+            print(json.dumps(current, indent=2))
+
+    if baseline is not None:
+        rows = compare(baseline, current, args.tolerance)
+        print_comparison(rows)
+        if args.fail_on_regression and any(r[4] == "regression" for r in rows):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""
+Load driver for /webhook, /accounts and /logs.
+
+Boots server.py against a throw-away environment (fixture instances, SQLite
+file, pre-filled log, fake terminal path, no rate limit / backpressure / SMTP)
+and drives it with `--concurrency` worker threads through either
+
+- client: Flask's test client, in-process (measures the app itself)
+- http:   a real threaded werkzeug server on 127.0.0.1 with keep-alive
+          http.client connections (adds the HTTP stack)
+
+Reports throughput and p50/p90/p99 latency per scenario.
+
+    python -m bench.webhook_bench --driver client --concurrency 8 --requests 3000
+    python -m bench.webhook_bench --driver http --duration 10 --mix exact=80,bare=20
+    python -m bench.webhook_bench --scenarios webhook --json results/webhook.json
+"""
+import os, sys, json, time, base64, shutil, logging, argparse, tempfile, threading, itertools, http.client
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench.fixtures import build_instances, build_log, signal_stream, parse_mix, DEFAULT_MIX  # noqa: E402
+
+TOKEN = "bench-token"
+USER, PASS = "bench", "bench"
+AUTH = {"Authorization": "Basic " + base64.b64encode(f"{USER}:{PASS}".encode()).decode()}
+SCENARIOS = ("webhook", "accounts", "logs")
+
+def boot(work: str, accounts: int, symbols: int, log_lines: int, seed: int = 4609):
+    """Prepare env + fixtures, import and boot server. Returns (server module, {account: suffix})."""
+    inst = os.path.join(work, "instances")
+    accs = build_instances(inst, accounts, symbols, seed)
+    terminal = os.path.join(work, "terminal64.exe")
+    open(terminal, "wb").close()
+    os.makedirs(os.path.join(work, "profile"), exist_ok=True)
+    build_log(os.path.join(work, "logs", "trading_bot.log"), log_lines, seed)
+    os.environ.update({
+        "MT5_INSTANCES_DIR": inst, "MT5_MAIN_PATH": terminal, "MT5_PROFILE_SOURCE": os.path.join(work, "profile"),
+        "LOG_DIR": os.path.join(work, "logs"), "LOG_MAX_BYTES": str(1 << 40),
+        "WEBHOOK_TOKEN": TOKEN, "BASIC_USER": USER, "BASIC_PASS": PASS,
+        "RATE_LIMITS": "webhook=1000000000/1,webhook_batch=1000000000/1",
+        "SPOOL_MAX_PENDING": "0", "SYMBOL_AUTO_FETCH": "false", "SMTP_HOST": "", "MONITOR_INTERVAL": "3600",
+    })
+    import app.db
+    app.db.DB_PATH = os.path.join(work, "bench.db")
+    import server
+    server.create_app()
+    # keep the file handler (it is part of the real request cost), drop console spam
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        if type(h) is logging.StreamHandler:
+            root.removeHandler(h)
+    for acc in accs:
+        app.db.add_account(acc, f"bench-{acc}")
+    return server, accs
+
+# ------------------------ drivers ------------------------ #
+
+class ClientDriver:
+    name = "client"
+
+    def __init__(self, server):
+        self.app = server.app
+
+    def session(self):
+        c = self.app.test_client()
+
+        def call(method, path, body=None, headers=None):
+            r = c.open(path, method=method, data=body, headers=headers or {},
+                       content_type="application/json" if body is not None else None)
+            r.get_data()
+            return r.status_code
+        return call
+
+    def close(self):
+        pass
+
+class HttpDriver:
+    name = "http"
+
+    def __init__(self, server):
+        from werkzeug.serving import make_server
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        self.httpd = make_server("127.0.0.1", 0, server.app, threaded=True)
+        self.port = self.httpd.server_port
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def session(self):
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+
+        def call(method, path, body=None, headers=None):
+            nonlocal conn
+            h = dict(headers or {})
+            if body is not None:
+                h["Content-Type"] = "application/json"
+            try:
+                conn.request(method, path, body=body, headers=h)
+                r = conn.getresponse()
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+                conn.request(method, path, body=body, headers=h)
+                r = conn.getresponse()
+            r.read()
+            if r.getheader("Connection", "").lower() == "close":
+                conn.close()
+            return r.status
+        return call
+
+    def close(self):
+        self.httpd.shutdown()
+
+# ------------------------ load loop ------------------------ #
+
+def percentile(sorted_s: list, q: float) -> float:
+    return sorted_s[min(len(sorted_s) - 1, int(q * len(sorted_s)))] if sorted_s else 0.0
+
+def summarize(samples: list, statuses: dict, wall: float) -> dict:
+    s = sorted(samples)
+    ms = lambda v: round(v * 1000, 3)
+    return {"requests": len(s), "wall_s": round(wall, 3),
+            "throughput_rps": round(len(s) / wall, 1) if wall else None,
+            "p50_ms": ms(percentile(s, 0.5)), "p90_ms": ms(percentile(s, 0.9)),
+            "p99_ms": ms(percentile(s, 0.99)), "max_ms": ms(s[-1]) if s else 0.0,
+            "status": {str(k): v for k, v in sorted(statuses.items())}}
+
+def drive(driver, requests_iter, concurrency: int, total: int = 0, duration: float = 0.0) -> dict:
+    """Run pre-built (method, path, body, headers) requests from `concurrency` threads."""
+    lock = threading.Lock()
+    samples, statuses = [], {}
+    counter = itertools.count()
+    stop_at = time.perf_counter() + duration if duration else None
+
+    def worker():
+        call = driver.session()
+        local, local_st = [], {}
+        clock = time.perf_counter
+        while True:
+            n = next(counter)
+            if total and n >= total:
+                break
+            if stop_at and clock() >= stop_at:
+                break
+            method, path, body, headers = requests_iter(n)
+            t0 = clock()
+            code = call(method, path, body, headers)
+            local.append(clock() - t0)
+            local_st[code] = local_st.get(code, 0) + 1
+        with lock:
+            samples.extend(local)
+            for k, v in local_st.items():
+                statuses[k] = statuses.get(k, 0) + v
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return summarize(samples, statuses, time.perf_counter() - t0)
+
+def build_requests(scenario: str, accounts: dict, mix: dict, n: int, seed: int):
+    if scenario == "webhook":
+        stream = signal_stream(accounts, mix, seed)
+        bodies = [json.dumps(p).encode() for _, p in itertools.islice(stream, n)]
+        return lambda i: ("POST", f"/webhook/{TOKEN}", bodies[i % len(bodies)], None)
+    if scenario == "accounts":
+        return lambda i: ("GET", "/accounts", None, AUTH)
+    if scenario == "logs":
+        return lambda i: ("GET", "/logs", None, AUTH)
+    raise ValueError(f"unknown scenario {scenario}")
+
+def run(driver_name: str = "client", scenarios=SCENARIOS, concurrency: int = 8, requests: int = 2000,
+        duration: float = 0.0, accounts: int = 20, symbols: int = 3000, log_lines: int = 200000,
+        mix: dict = None, seed: int = 4609, work: str = None) -> dict:
+    own = work is None
+    work = work or tempfile.mkdtemp(prefix="webhook-bench-")
+    mix = mix or dict(DEFAULT_MIX)
+    try:
+        server, accs = boot(work, accounts, symbols, log_lines, seed)
+        driver = (HttpDriver if driver_name == "http" else ClientDriver)(server)
+        out = {"params": {"driver": driver_name, "concurrency": concurrency, "requests": requests,
+                          "duration": duration, "accounts": accounts, "symbols": symbols,
+                          "log_lines": log_lines, "mix": mix, "seed": seed,
+                          "python": sys.version.split()[0], "platform": sys.platform}}
+        try:
+            for sc in scenarios:
+                reqs = build_requests(sc, accs, mix, max(requests, 1000), seed)
+                drive(driver, reqs, concurrency, total=min(200, requests or 200))          # warm-up
+                out[sc] = drive(driver, reqs, concurrency, total=0 if duration else requests, duration=duration)
+        finally:
+            driver.close()
+        return out
+    finally:
+        if own:
+            shutil.rmtree(work, ignore_errors=True)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--driver", choices=["client", "http"], default="client")
+    ap.add_argument("--scenarios", default=",".join(SCENARIOS))
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--requests", type=int, default=2000, help="per scenario (ignored with --duration)")
+    ap.add_argument("--duration", type=float, default=0.0, help="seconds per scenario")
+    ap.add_argument("--accounts", type=int, default=20)
+    ap.add_argument("--symbols", type=int, default=3000)
+    ap.add_argument("--log-lines", type=int, default=200000)
+    ap.add_argument("--mix", default="", help="e.g. exact=60,bare=30,fuzzy=8,invalid=2")
+    ap.add_argument("--seed", type=int, default=4609)
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args(argv)
+    result = run(args.driver, [s for s in args.scenarios.split(",") if s], args.concurrency, args.requests,
+                 args.duration, args.accounts, args.symbols, args.log_lines, parse_mix(args.mix), args.seed)
+    print(json.dumps(result, indent=2))
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    return result
+
+if __name__ == "__main__":
+    main()
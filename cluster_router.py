@@ -0,0 +1,261 @@
+"""
+Webhook router for cluster mode: one public endpoint in front of several
+server.py nodes, each running its own MT5 terminals.
+
+Nodes started with CLUSTER_ROUTER_URL heartbeat their account list here
+(app/cluster.py); the router keeps the account -> node map and forwards
+
+- POST /webhook/<token>        to the node hosting account_number (group
+                               webhooks to every node that defines the group)
+- POST /webhook/<token>/batch  split per node, forwarded in parallel, results
+                               merged back in input order
+- POST /register               to the live node with the most free room
+
+over pooled keep-alive connections. GET /accounts merges the nodes' status
+rows; GET /cluster/nodes lists nodes with heartbeat age and pool counters.
+
+    CLUSTER_TOKEN=secret python cluster_router.py
+    python -m tools.cluster_demo --nodes 3 --accounts 12     # local multi-process demo
+"""
+import os, json, hmac, base64, functools, logging, http.client
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, request, jsonify, Response
+from dotenv import load_dotenv
+
+from app.cluster import NodeRegistry, TOKEN_HEADER, CLIENT_IP_HEADER
+
+load_dotenv()
+app = Flask(__name__)
+log = logging.getLogger("cluster")
+
+ROUTER_HOST = os.getenv("ROUTER_HOST", "127.0.0.1")
+ROUTER_PORT = int(os.getenv("ROUTER_PORT", "5100"))
+CLUSTER_TOKEN = os.getenv("CLUSTER_TOKEN", "")
+CLUSTER_NODE_TIMEOUT = float(os.getenv("CLUSTER_NODE_TIMEOUT", "15"))   # missed heartbeats -> node down
+ROUTER_POOL_SIZE = int(os.getenv("ROUTER_POOL_SIZE", "16"))             # idle keep-alive connections per node
+ROUTER_FORWARD_TIMEOUT = float(os.getenv("ROUTER_FORWARD_TIMEOUT", "15"))
+ROUTER_FANOUT_WORKERS = int(os.getenv("ROUTER_FANOUT_WORKERS", "16"))
+WEBHOOK_TOKEN = os.getenv("WEBHOOK_TOKEN", "dev-token")
+WEBHOOK_BATCH_MAX = int(os.getenv("WEBHOOK_BATCH_MAX", "100"))
+BASIC_USER = os.getenv("BASIC_USER", "admin")
+BASIC_PASS = os.getenv("BASIC_PASS", "admin")
+
+nodes = NodeRegistry(CLUSTER_NODE_TIMEOUT, ROUTER_POOL_SIZE, ROUTER_FORWARD_TIMEOUT)
+fanout = ThreadPoolExecutor(max_workers=max(1, ROUTER_FANOUT_WORKERS), thread_name_prefix="route")
+
+# ----- Auth -----
+def requires_auth(f):
+    @functools.wraps(f)
+    def wrapper(*args, **kwargs):
+        auth = request.headers.get("Authorization", "")
+        try:
+            user, pwd = base64.b64decode(auth.split(" ", 1)[1]).decode("utf-8").split(":", 1)
+        except Exception:
+            user = pwd = None
+        if not auth.startswith("Basic ") or user != BASIC_USER or pwd != BASIC_PASS:
+            return Response("Authentication required", 401, {"WWW-Authenticate": 'Basic realm="Login Required"'})
+        return f(*args, **kwargs)
+    return wrapper
+
+def _cluster_auth() -> bool:
+    return bool(CLUSTER_TOKEN) and hmac.compare_digest(request.headers.get(TOKEN_HEADER, ""), CLUSTER_TOKEN)
+
+def _client_ip() -> str:
+    return request.headers.get("CF-Connecting-IP") or request.remote_addr or "0.0.0.0"
+
+# ----- Forwarding -----
+def _headers(extra=None) -> dict:
+    h = {"Content-Type": "application/json", TOKEN_HEADER: CLUSTER_TOKEN, CLIENT_IP_HEADER: _client_ip()}
+    key = request.headers.get("Idempotency-Key")
+    if key:
+        h["Idempotency-Key"] = key
+    h.update(extra or {})
+    return h
+
+def _call(node_id, pool, path: str, body: bytes, headers: dict):
+    """-> (status, body bytes); a node that cannot be reached becomes a 502."""
+    try:
+        status, _, data = pool.request("POST", path, body, headers)
+        return status, data
+    except (OSError, http.client.HTTPException) as e:
+        log.warning("[FORWARD] node=%s %s failed: %s", node_id, path, e)
+        return 502, json.dumps({"ok": False, "error": f"Node {node_id} unreachable: {e}"}).encode("utf-8")
+
+def _relay(node_id, status: int, data: bytes) -> Response:
+    return Response(data, status, mimetype="application/json", headers={"X-Cluster-Node": node_id})
+
+def _json(data: bytes, status: int):
+    try:
+        return json.loads(data)
+    except ValueError:
+        return {"ok": False, "error": f"Node answered {status}"}
+
+def _error(status: int, error: str) -> Response:
+    return jsonify({"ok": False, "error": error}), status
+
+# ----- Cluster membership -----
+@app.post("/cluster/heartbeat")
+def cluster_heartbeat():
+    if not _cluster_auth():
+        return _error(403, "Bad cluster token")
+    data = request.get_json(force=True, silent=True) or {}
+    node_id, url = str(data.get("node_id") or "").strip(), str(data.get("url") or "").strip()
+    if not node_id or not url or not isinstance(data.get("accounts", []), list):
+        return _error(400, "node_id, url and accounts are required")
+    try:
+        res = nodes.heartbeat(node_id, url, data.get("accounts") or [], data.get("groups") or [],
+                              int(data.get("capacity") or 0))
+    except ValueError as e:
+        return _error(400, str(e))
+    return jsonify({"ok": True, **res})
+
+
+@app.get("/cluster/nodes")
+@requires_auth
+def cluster_nodes():
+    return jsonify({"nodes": nodes.nodes()})
+
+
+@app.delete("/cluster/nodes/<node_id>")
+@requires_auth
+def cluster_node_remove(node_id: str):
+    if not nodes.remove(node_id):
+        return _error(404, "Not found")
+    return jsonify({"ok": True})
+
+
+@app.get("/accounts")
+@requires_auth
+def accounts():
+    """Every node's accounts as of its last heartbeat, tagged with `node` / `node_alive`."""
+    return jsonify({"accounts": nodes.accounts(), "nodes": nodes.nodes()})
+
+
+@app.post("/register")
+@requires_auth
+def register():
+    data = request.get_json(force=True, silent=True) or {}
+    account = str(data.get("account", "")).strip()
+    if not account:
+        return _error(400, "Missing account")
+    node_id, pool, alive = nodes.route(account)
+    if node_id is None:
+        picked = nodes.pick()
+        if picked is None:
+            return _error(503, "No live node with free capacity")
+        node_id, pool = picked
+        nodes.assign(account, node_id)
+    elif not alive:
+        return _error(503, f"Node {node_id} hosting account {account} is down")
+    status, body = _call(node_id, pool, "/register", request.get_data(),
+                         _headers({"Authorization": request.headers.get("Authorization", "")}))
+    log.info("[REGISTER] account=%s node=%s status=%s", account, node_id, status)
+    return _relay(node_id, status, body)
+
+
+# ----- Webhooks -----
+@app.post("/webhook/<token>")
+def webhook(token):
+    if token != WEBHOOK_TOKEN:
+        log.warning("[UNAUTHORIZED] ip=%s", _client_ip())
+        return _error(401, "Unauthorized")
+    body = request.get_data()
+    try:
+        raw = json.loads(body)
+    except ValueError:
+        return _error(400, "Invalid JSON")
+    if not isinstance(raw, dict):
+        return _error(400, "Expected a JSON object")
+    path = f"/webhook/{token}"
+
+    if raw.get("group") not in (None, ""):
+        name = str(raw["group"])
+        targets = nodes.group_nodes(name)
+        if not targets:
+            return _error(404, f"Unknown group: {name}")
+        if len(targets) == 1:
+            return _relay(targets[0][0], *_call(*targets[0], path, body, _headers()))
+        # members of one group may live on several nodes: each node delivers its own part
+        headers = _headers()
+        futs = [(nid, fanout.submit(_call, nid, pool, path, body, headers)) for nid, pool in targets]
+        parts = {nid: f.result() for nid, f in futs}
+        out = {nid: _json(data, status) for nid, (status, data) in parts.items()}
+        ok = all(status < 300 for status, _ in parts.values())
+        code = 200 if any(status < 300 for status, _ in parts.values()) else max(s for s, _ in parts.values())
+        return jsonify({"ok": ok, "group": name, "nodes": out}), code
+
+    account = str(raw.get("account_number") or "").strip()
+    if not account:
+        return _error(400, "Missing account_number")
+    node_id, pool, alive = nodes.route(account)
+    if node_id is None:
+        return _error(404, "Account not registered")
+    if not alive:
+        return _error(503, f"Node {node_id} hosting account {account} is down")
+    return _relay(node_id, *_call(node_id, pool, path, body, _headers()))
+
+
+@app.post("/webhook/<token>/batch")
+def webhook_batch(token):
+    """Split by node, forward the sub-batches in parallel, merge results in input order."""
+    if token != WEBHOOK_TOKEN:
+        log.warning("[UNAUTHORIZED] ip=%s", _client_ip())
+        return _error(401, "Unauthorized")
+    raw = request.get_json(force=True, silent=True)
+    items = raw.get("signals") if isinstance(raw, dict) else raw
+    if not isinstance(items, list) or not items:
+        return _error(400, "Expected a non-empty array of signals")
+    if len(items) > WEBHOOK_BATCH_MAX:
+        return _error(413, f"Batch too large (max {WEBHOOK_BATCH_MAX})")
+    idem = request.headers.get("Idempotency-Key") or (raw.get("idempotency_key") if isinstance(raw, dict) else None)
+
+    results = [None] * len(items)
+    parts = {}      # node id -> (pool, [original index])
+    for i, item in enumerate(items):
+        account = str(item.get("account_number") or "").strip() if isinstance(item, dict) else ""
+        node_id, pool, alive = nodes.route(account) if account else (None, None, False)
+        if node_id is None:
+            results[i] = {"index": i, "ok": False, "error": "Account not registered" if account else "Missing account_number"}
+        elif not alive:
+            results[i] = {"index": i, "ok": False, "error": f"Node {node_id} is down"}
+        else:
+            parts.setdefault(node_id, (pool, []))[1].append(i)
+
+    base = _headers()
+
+    def send(node_id, pool, idx):
+        sub = {"signals": [items[i] for i in idx]}
+        headers = dict(base)
+        if idem:    # one key per node: a retried batch is replayed part by part
+            sub["idempotency_key"] = headers["Idempotency-Key"] = f"{idem}:{node_id}"
+        return _call(node_id, pool, f"/webhook/{token}/batch", json.dumps(sub).encode("utf-8"), headers)
+
+    futs = {nid: fanout.submit(send, nid, pool, idx) for nid, (pool, idx) in parts.items()}
+    for node_id, fut in futs.items():
+        idx = parts[node_id][1]
+        status, data = fut.result()
+        reply = _json(data, status)
+        node_results = reply.get("results") if isinstance(reply, dict) else None
+        if not isinstance(node_results, list) or len(node_results) != len(idx):
+            err = (reply.get("error") if isinstance(reply, dict) else None) or f"Node {node_id} answered {status}"
+            node_results = [{"ok": False, "error": err} for _ in idx]
+        for i, r in zip(idx, node_results):
+            results[i] = dict(r, index=i, node=node_id)
+
+    accepted = sum(1 for r in results if r["ok"])
+    rejected = len(results) - accepted
+    log.info("[WEBHOOK_BATCH] ip=%s nodes=%d accepted=%d rejected=%d", _client_ip(), len(parts), accepted, rejected)
+    return jsonify({"ok": not rejected, "accepted": accepted, "rejected": rejected, "results": results})
+
+
+@app.route("/health", methods=["GET", "HEAD"])
+def health():
+    live = sum(1 for n in nodes.nodes() if n["alive"])
+    return jsonify({"status": "ok" if live else "no_nodes", "nodes_alive": live}), 200
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    if not CLUSTER_TOKEN:
+        log.warning("CLUSTER_TOKEN is empty: node heartbeats will be rejected")
+    app.run(host=ROUTER_HOST, port=ROUTER_PORT, threaded=True)
@@ -1,30 +1,54 @@
-import os, time, functools, base64, threading, logging
-from flask import Flask, request, jsonify, send_from_directory, render_template, Response
+import os, hmac, json, time, socket, functools, base64, threading, logging
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import RotatingFileHandler
+from flask import Flask, request, jsonify, send_from_directory, render_template, Response, stream_with_context
 from dotenv import load_dotenv
 
-from app.db import init_db, add_account, list_accounts, delete_account, get_account, set_pid, set_state
+from app.db import init_db, add_account, list_accounts, delete_account, get_account, set_pid, set_state, set_delivery, batch, DELIVERY_MODES
+from app.db import set_auto_restart
+from app.db import save_group, delete_group
+from app.group_router import group_routes, parse_members
+from app.account_registry import registry
 from app.session_manager import SessionManager
-from app.email_handler import send_email
-from app.signal_router import normalize_payload, write_signal
-from app.symbol_fetcher import fetch_symbols
+from app.process_snapshot import ProcessSnapshot
+from app.spool import SpoolManager
+from app.jobs import JobManager, JobQueueFull
+from app.rate_limiter import RateLimiter, TTLMap, parse_rules, backend_from_env
+from app.alert_dispatcher import send_alert
+from app.signal_router import normalize_payload, normalize_batch, deliver_signal, deliver_signals
+from app.symbol_fetcher import SymbolFetchService
+from app.log_tail import tail, read_since
+from app.status_feed import StatusFeed
+from app.telemetry import TelemetrySampler
+from app.metrics import metrics, Stopwatch
+from app.ingest_queue import IngestQueue, Retry
+from app.idempotency import IdempotencyCache
+from app.signal_history import SignalHistory
+from app.supervisor import Supervisor
+from app.cluster import HeartbeatClient, TOKEN_HEADER, CLIENT_IP_HEADER
 
 # ----- Flask & Env -----
 load_dotenv()
 app = Flask(__name__, static_folder="static", template_folder="templates")
 
-# ----- Ensure logs/ exists, then configure logging -----
+# ----- Logging (handlers are installed by boot(), see bottom of file) -----
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-LOG_DIR = os.path.join(BASE_DIR, "logs")
-os.makedirs(LOG_DIR, exist_ok=True)
-
+LOG_DIR = os.getenv("LOG_DIR") or os.path.join(BASE_DIR, "logs")
 LOG_FILE = os.path.join(LOG_DIR, "trading_bot.log")
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[logging.FileHandler(LOG_FILE, encoding="utf-8"), logging.StreamHandler()]
-)
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
 log = logging.getLogger("mt5")
 
+def _configure_logging() -> None:
+    """Ensure logs/ exists, then log to a rotating file + console."""
+    os.makedirs(LOG_DIR, exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        handlers=[RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"),
+                  logging.StreamHandler()]
+    )
+
 # ----- Config (.env) -----
 BASIC_USER = os.getenv("BASIC_USER", "admin")
 BASIC_PASS = os.getenv("BASIC_PASS", "admin")
@@ -45,21 +69,114 @@ SYMBOL_AUTO_FETCH = os.getenv("SYMBOL_AUTO_FETCH", "true").lower() == "true"
 SYMBOL_MATCH_CUTOFF = float(os.getenv("SYMBOL_MATCH_CUTOFF", "0.65"))
 
 MONITOR_INTERVAL = int(os.getenv("MONITOR_INTERVAL", "10"))
+PROCESS_SNAPSHOT_INTERVAL = float(os.getenv("PROCESS_SNAPSHOT_INTERVAL", "2"))
+STATUS_REFRESH_INTERVAL = float(os.getenv("STATUS_REFRESH_INTERVAL", "2"))
+STATUS_STREAM_MAX_SECONDS = int(os.getenv("STATUS_STREAM_MAX_SECONDS", "300"))
+# each open SSE stream (/accounts/stream, /logs/stream) holds one server thread; past this -> 503, clients poll
+SSE_MAX_STREAMS = int(os.getenv("SSE_MAX_STREAMS", "8"))
+TELEMETRY_INTERVAL = float(os.getenv("TELEMETRY_INTERVAL", "5"))   # 0 = sampler off
+TELEMETRY_HISTORY = int(os.getenv("TELEMETRY_HISTORY", "720"))     # samples kept per account
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_ACTIVE = int(os.getenv("JOB_MAX_ACTIVE", "20"))
+JOB_MAX_CONCURRENCY = int(os.getenv("JOB_MAX_CONCURRENCY", "8"))
+JOB_DEFAULT_CONCURRENCY = int(os.getenv("JOB_DEFAULT_CONCURRENCY", "4"))
+
+PROVISION_MODE = os.getenv("PROVISION_MODE", "incremental")  # incremental | full
+PROVISION_LINK_MODE = os.getenv("PROVISION_LINK_MODE", "hardlink")  # hardlink | reflink | copy
+# Pre-provisioned instances claimed by /register (see app/warm_pool.py); 0 = off
+WARM_POOL_SIZE = int(os.getenv("WARM_POOL_SIZE", "2"))
+WARM_POOL_CONCURRENCY = int(os.getenv("WARM_POOL_CONCURRENCY", "1"))
+WARM_POOL_CHECK_INTERVAL = float(os.getenv("WARM_POOL_CHECK_INTERVAL", "300"))  # source staleness check
+
+SPOOL_MAX_PENDING = int(os.getenv("SPOOL_MAX_PENDING", "500"))  # 0 = no backpressure
+SPOOL_SWEEP_INTERVAL = float(os.getenv("SPOOL_SWEEP_INTERVAL", "30"))
+SPOOL_ACK_ACTION = os.getenv("SPOOL_ACK_ACTION", "delete")  # delete | archive
+
+GROUP_FANOUT_WORKERS = int(os.getenv("GROUP_FANOUT_WORKERS", "8"))
 
-# ----- Init DB & session manager -----
-init_db()
-session_mgr = SessionManager(MT5_INSTANCES_DIR, MT5_PROFILE_SOURCE, MT5_MAIN_PATH)
+# Auto restart of crashed instances (accounts with auto_restart on, see app/supervisor.py)
+SUPERVISOR_ENABLED = os.getenv("SUPERVISOR_ENABLED", "true").lower() == "true"
+SUPERVISOR_MAX_CONCURRENT = int(os.getenv("SUPERVISOR_MAX_CONCURRENT", "2"))
+SUPERVISOR_BASE_DELAY = float(os.getenv("SUPERVISOR_BASE_DELAY", "5"))
+SUPERVISOR_MAX_DELAY = float(os.getenv("SUPERVISOR_MAX_DELAY", "300"))
+SUPERVISOR_CRASH_WINDOW = float(os.getenv("SUPERVISOR_CRASH_WINDOW", "600"))
+SUPERVISOR_CRASH_LIMIT = int(os.getenv("SUPERVISOR_CRASH_LIMIT", "5"))   # 0 = never park
+SUPERVISOR_STABLE_AFTER = float(os.getenv("SUPERVISOR_STABLE_AFTER", "300"))
+
+# Cluster node mode: heartbeat to the webhook router (cluster_router.py); empty URL = standalone
+CLUSTER_ROUTER_URL = os.getenv("CLUSTER_ROUTER_URL", "").strip()
+CLUSTER_TOKEN = os.getenv("CLUSTER_TOKEN", "")
+CLUSTER_NODE_ID = os.getenv("CLUSTER_NODE_ID", "") or f"{socket.gethostname()}:{FLASK_PORT}"
+CLUSTER_NODE_URL = os.getenv("CLUSTER_NODE_URL", "") or \
+    f"http://{'127.0.0.1' if FLASK_HOST in ('0.0.0.0', '') else FLASK_HOST}:{FLASK_PORT}"
+CLUSTER_HEARTBEAT_INTERVAL = float(os.getenv("CLUSTER_HEARTBEAT_INTERVAL", "5"))
+CLUSTER_NODE_CAPACITY = int(os.getenv("CLUSTER_NODE_CAPACITY", "0"))   # max accounts; 0 = no limit
+
+# ----- Services: constructed here without I/O; boot() opens the DB and starts the threads -----
+proc_snapshot = ProcessSnapshot(PROCESS_SNAPSHOT_INTERVAL)
+spool = SpoolManager(MT5_INSTANCES_DIR, SPOOL_MAX_PENDING, SPOOL_SWEEP_INTERVAL, SPOOL_ACK_ACTION)
+symbol_service = SymbolFetchService.from_env(MT5_MAIN_PATH, MT5_INSTANCES_DIR)
+status_feed = StatusFeed(registry.all, proc_snapshot.is_alive, STATUS_REFRESH_INTERVAL)
+registry.add_listener(status_feed.poke)
+telemetry = TelemetrySampler(lambda: [(r["account"], r.get("pid")) for r in registry.all()],
+                             TELEMETRY_INTERVAL, TELEMETRY_HISTORY)
+supervisor = Supervisor(lambda acc: _supervised_restart(acc), get_account, proc_snapshot.is_alive,
+                        lambda subj, body: send_alert(subj, body),
+                        max_concurrent=SUPERVISOR_MAX_CONCURRENT, base_delay=SUPERVISOR_BASE_DELAY,
+                        max_delay=SUPERVISOR_MAX_DELAY, crash_window=SUPERVISOR_CRASH_WINDOW,
+                        crash_limit=SUPERVISOR_CRASH_LIMIT, stable_after=SUPERVISOR_STABLE_AFTER,
+                        enabled=SUPERVISOR_ENABLED)
+heartbeat = HeartbeatClient(CLUSTER_ROUTER_URL, CLUSTER_TOKEN, CLUSTER_NODE_ID, CLUSTER_NODE_URL,
+                            lambda: {"accounts": status_feed.snapshot()[1], "groups": group_routes.names()},
+                            CLUSTER_HEARTBEAT_INTERVAL, CLUSTER_NODE_CAPACITY) if CLUSTER_ROUTER_URL else None
+jobs = JobManager(JOB_WORKERS, JOB_MAX_ACTIVE, max_concurrency=JOB_MAX_CONCURRENCY)
+# group fan-out: member deliveries run in parallel (threads are spawned on first use)
+fanout_pool = ThreadPoolExecutor(max_workers=max(1, GROUP_FANOUT_WORKERS), thread_name_prefix="fanout")
 
 # ----- In-memory state -----
-# Rate limit (IP+token)
-RATE_LIMIT_WINDOW = 10
-RATE_LIMIT_MAX = 5
-_rate_mem = {}
+# Rate limit (IP+token), per route: RATE_LIMITS="webhook=5/10,webhook_batch=5/10"
+RATE_LIMIT_WINDOW = float(os.getenv("RATE_LIMIT_WINDOW", "10"))
+RATE_LIMIT_MAX = int(os.getenv("RATE_LIMIT_MAX", "5"))
+WEBHOOK_BATCH_MAX = int(os.getenv("WEBHOOK_BATCH_MAX", "100"))
+_rate_rules = {"webhook": (RATE_LIMIT_MAX, RATE_LIMIT_WINDOW), "webhook_batch": (RATE_LIMIT_MAX, RATE_LIMIT_WINDOW)}
+_rate_rules.update(parse_rules(os.getenv("RATE_LIMITS", "")))
+rate_limiter = RateLimiter(_rate_rules, backend_from_env(BASE_DIR),
+                           evict_interval=float(os.getenv("RATE_LIMIT_EVICT_INTERVAL", "60")))
+
+# Basic auth + idle timeout (method 2); IPs idle longer than LAST_SEEN_TTL are forgotten.
+# LAST_SEEN_MAX_KEYS only evicts IPs already idle past BASIC_IDLE_TIMEOUT
+_last_seen = TTLMap(ttl=max(BASIC_IDLE_TIMEOUT, int(os.getenv("LAST_SEEN_TTL", "86400"))),
+                    max_keys=int(os.getenv("LAST_SEEN_MAX_KEYS", "10000")), keep_for=BASIC_IDLE_TIMEOUT)
 
-# Basic auth + idle timeout (method 2)
-_last_seen = {}
+# Session manager: validates MT5_MAIN_PATH / MT5_PROFILE_SOURCE and creates the instances
+# dir, so it is built on first use (a host without MT5 can still import and serve webhooks)
+_session_mgr = None
+_session_lock = threading.Lock()
+
+def sessions() -> SessionManager:
+    global _session_mgr
+    if _session_mgr is None:
+        with _session_lock:
+            if _session_mgr is None:
+                _session_mgr = SessionManager(MT5_INSTANCES_DIR, MT5_PROFILE_SOURCE, MT5_MAIN_PATH, proc_snapshot,
+                                              provision_mode=PROVISION_MODE, link_mode=PROVISION_LINK_MODE,
+                                              warm_pool_size=WARM_POOL_SIZE, warm_pool_concurrency=WARM_POOL_CONCURRENCY,
+                                              warm_pool_check_interval=WARM_POOL_CHECK_INTERVAL)
+    return _session_mgr
 
 # ----- Helpers -----
+_sse_slots = threading.BoundedSemaphore(max(1, SSE_MAX_STREAMS))
+
+def _sse_response(gen):
+    """Stream gen() as text/event-stream if a slot is free; 503 otherwise (the dashboard then polls)."""
+    if SSE_MAX_STREAMS <= 0 or not _sse_slots.acquire(blocking=False):
+        return jsonify({"ok": False, "error": "Too many open streams, use polling"}), 503
+    resp = Response(stream_with_context(gen()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    resp.call_on_close(_sse_slots.release)
+    return resp
+
 def _auth_fail():
     return Response("Unauthorized", 401, {"WWW-Authenticate": 'Basic realm="mt5-admin"'})
 
@@ -90,12 +207,9 @@ def requires_auth(f):
     return wrapper
 
 def get_account_id_by_account(account: str) -> int:
-    """Map account_number -> id from current list."""
-    rows = list_accounts()
-    for r in rows:
-        if r["account"] == account:
-            return r["id"]
-    return -1
+    """Map account_number -> id from the in-memory registry."""
+    r = registry.get(account)
+    return r["id"] if r else -1
 
 # ----- Routes -----
 @app.get("/")
@@ -112,44 +226,176 @@ def get_webhook_url():
 @app.get("/accounts")
 @requires_auth
 def accounts():
-    rows = list_accounts()
-    for r in rows:
-        r["alive"] = session_mgr.is_alive(r.get("pid"))
-    return jsonify({"accounts": rows})
+    """Versioned snapshot; If-None-Match with the current ETag -> 304."""
+    status_feed.refresh_if_stale()
+    version, rows = status_feed.snapshot()
+    headers = {"ETag": status_feed.etag(version), "Cache-Control": "no-cache"}
+    inm = request.headers.get("If-None-Match", "")
+    if any(status_feed.parse_tag(t) == version for t in inm.split(",") if t.strip()):
+        return Response(status=304, headers=headers)
+    resp = jsonify({"accounts": rows, "version": status_feed.tag(version)})
+    resp.headers.update(headers)
+    return resp
 
 
-@app.post("/register")
+@app.get("/accounts/stream")
 @requires_auth
-def register():
-    data = request.get_json(force=True)
-    account = str(data.get("account", "")).strip()
-    nickname = str(data.get("nickname", "")).strip()
-    if not account:
-        return jsonify({"ok": False, "error": "Missing account"}), 400
+def accounts_stream():
+    """SSE: a `snapshot` event first (unless resuming), then `delta` events with only
+    the changed/removed accounts. Event id = version; reconnects resume via Last-Event-ID."""
+    since = status_feed.parse_tag(request.headers.get("Last-Event-ID") or request.args.get("since"))
+
+    def event(kind, payload):
+        return f"event: {kind}\nid: {payload['version']}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n"
+
+    def gen():
+        yield "retry: 2000\n\n"
+        cur = since
+        deadline = time.monotonic() + STATUS_STREAM_MAX_SECONDS
+        while time.monotonic() < deadline:
+            delta = status_feed.changes_since(cur)
+            if delta is None:
+                version, rows = status_feed.snapshot()
+                yield event("snapshot", {"version": status_feed.tag(version), "accounts": rows})
+                cur = version
+            elif delta["changed"] or delta["removed"]:
+                cur = delta["version"]
+                delta["version"] = status_feed.tag(cur)
+                yield event("delta", delta)
+            if status_feed.wait(cur, min(15.0, max(0.0, deadline - time.monotonic()))) == cur:
+                yield ": keep-alive\n\n"
 
+    return _sse_response(gen)
+
+
+# ----- Resource telemetry (per MT5 instance) -----
+@app.get("/telemetry")
+@requires_auth
+def telemetry_view():
+    """Latest CPU/RSS/threads/handles/uptime per account; ?history=N adds the last N samples."""
+    out = telemetry.current()
+    n = request.args.get("history", type=int)
+    if n:
+        out["series"] = {a: telemetry.series(a, n) for a in out["accounts"] if out["accounts"][a].get("running")}
+    return jsonify(out)
+
+@app.get("/telemetry/<account>")
+@requires_auth
+def telemetry_account(account: str):
+    series = telemetry.series(account, request.args.get("n", type=int))
+    if series is None:
+        return jsonify({"ok": False, "error": "No samples for this account"}), 404
+    return jsonify({"ok": True, "account": account, "interval": telemetry.interval, "series": series})
+
+
+# ----- Account lifecycle (shared by the routes and background jobs) -----
+def _register_account(account: str, nickname: str) -> dict:
+    """Create/sync the instance, add the account, then auto-open MT5.
+    Raises if the instance cannot be created; an open failure is logged only."""
     try:
-        session_mgr.ensure_instance(account)
+        sessions().ensure_instance(account)
     except Exception as e:
         log.exception("Create instance failed")
-        return jsonify({"ok": False, "error": f"Create instance failed: {e}"}), 500
+        raise RuntimeError(f"Create instance failed: {e}")
+    spool.forget(account)   # the sync cleared the instance's old signals
 
-    add_account(account, nickname)
+    acc_id = add_account(account, nickname)
 
     # Auto open MT5 after add
     try:
-        pid = session_mgr.open(account)
+        pid = sessions().open(account)
         if SYMBOL_AUTO_FETCH:
-            _ = fetch_symbols(MT5_MAIN_PATH, MT5_INSTANCES_DIR, account)
-        acc_id = get_account_id_by_account(account)
-        if acc_id != -1:
-            set_pid(acc_id, pid)
-            set_state(acc_id, "online")
-        send_email("MT5 Instance Online", f"Account {account} ({nickname}) is online (PID {pid}).")
+            symbol_service.submit(account)
+        set_pid(acc_id, pid)
+        set_state(acc_id, "online")
+        send_alert("MT5 Instance Online", f"Account {account} ({nickname}) is online (PID {pid}).")
         log.info("[ONLINE] account=%s pid=%s", account, pid)
+        return {"id": acc_id, "pid": pid}
     except Exception as e:
         log.exception("Auto open failed")
+        return {"id": acc_id, "pid": None, "warning": f"Auto open failed: {e}"}
 
-    return jsonify({"ok": True})
+def _open_account(acc: dict) -> dict:
+    supervisor.clear(acc["id"])
+    pid = sessions().open(acc["account"])
+    set_pid(acc["id"], pid)
+    if SYMBOL_AUTO_FETCH:
+        symbol_service.submit(acc["account"])
+    set_state(acc["id"], "online")
+    send_alert("MT5 Instance Online", f"Account {acc['account']} ({acc['nickname']}) is online (PID {pid}).")
+    log.info("[ONLINE] account=%s pid=%s", acc["account"], pid)
+    return {"pid": pid}
+
+def _restart_account(acc: dict) -> dict:
+    supervisor.clear(acc["id"])   # a manual restart also lifts a crash-loop pause
+    pid = sessions().restart(acc.get("pid"), acc["account"])
+    set_pid(acc["id"], pid)
+    if SYMBOL_AUTO_FETCH:
+        symbol_service.submit(acc["account"])
+    set_state(acc["id"], "online")
+    send_alert("MT5 Instance Online", f"Account {acc['account']} ({acc['nickname']}) restarted (PID {pid}).")
+    log.info("[RESTART] account=%s pid=%s", acc["account"], pid)
+    return {"pid": pid}
+
+def _stop_account(acc: dict) -> dict:
+    supervisor.clear(acc["id"])
+    if acc.get("pid"):
+        sessions().stop(acc["pid"])
+        set_pid(acc["id"], None)
+    set_state(acc["id"], "offline")
+    send_alert("MT5 Instance Offline", f"Account {acc['account']} ({acc['nickname']}) stopped.")
+    log.info("[OFFLINE] account=%s", acc["account"])
+    return {}
+
+def _supervised_restart(acc: dict) -> int:
+    """Restart issued by the supervisor; unlike _restart_account it keeps the backoff state."""
+    pid = sessions().restart(acc.get("pid"), acc["account"])
+    set_pid(acc["id"], pid)
+    if SYMBOL_AUTO_FETCH:
+        symbol_service.submit(acc["account"])
+    set_state(acc["id"], "online")
+    send_alert("MT5 Instance Online", f"Account {acc['account']} ({acc['nickname']}) was restarted automatically (PID {pid}).")
+    log.info("[AUTO-RESTART] account=%s pid=%s", acc["account"], pid)
+    return pid
+
+BULK_ACTIONS = {"open": _open_account, "restart": _restart_account, "stop": _stop_account}
+
+def _submit_job(kind, items, fn, concurrency, label):
+    try:
+        job = jobs.submit(kind, items, fn, concurrency=concurrency, label=label)
+    except JobQueueFull as e:
+        return jsonify({"ok": False, "error": str(e)}), 503
+    return jsonify({"ok": True, "job_id": job.id, "job": job.to_dict(with_items=False)}), 202
+
+def _job_concurrency(data: dict) -> int:
+    """The request's "concurrency" as a positive int; ValueError (-> 400) otherwise."""
+    try:
+        n = int(data.get("concurrency", JOB_DEFAULT_CONCURRENCY))
+    except (TypeError, ValueError):
+        n = 0
+    if n < 1:
+        raise ValueError("concurrency must be a positive integer")
+    return n
+
+
+@app.post("/register")
+@requires_auth
+def register():
+    data = request.get_json(force=True)
+    account = str(data.get("account", "")).strip()
+    nickname = str(data.get("nickname", "")).strip()
+    if not account:
+        return jsonify({"ok": False, "error": "Missing account"}), 400
+
+    # {"async": true} -> run in the job pool and return 202 + job id
+    if data.get("async") or request.args.get("async") == "1":
+        return _submit_job("register", [(account, nickname)], lambda it: _register_account(*it),
+                           1, lambda it: it[0])
+    try:
+        res = _register_account(account, nickname)
+    except RuntimeError as e:
+        return jsonify({"ok": False, "error": str(e)}), 500
+    return jsonify({"ok": True, **res})
 
 
 @app.post("/open/<int:acc_id>")
@@ -158,14 +404,7 @@ def open_acc(acc_id: int):
     acc = get_account(acc_id)
     if not acc:
         return jsonify({"ok": False, "error": "Not found"}), 404
-    pid = session_mgr.open(acc["account"])
-    set_pid(acc_id, pid)
-    if SYMBOL_AUTO_FETCH:
-        _ = fetch_symbols(MT5_MAIN_PATH, MT5_INSTANCES_DIR, acc["account"])
-    set_state(acc_id, "online")
-    send_email("MT5 Instance Online", f"Account {acc['account']} ({acc['nickname']}) is online (PID {pid}).")
-    log.info("[ONLINE] account=%s pid=%s", acc["account"], pid)
-    return jsonify({"ok": True, "pid": pid})
+    return jsonify({"ok": True, **_open_account(acc)})
 
 
 @app.post("/restart/<int:acc_id>")
@@ -174,14 +413,7 @@ def restart(acc_id: int):
     acc = get_account(acc_id)
     if not acc:
         return jsonify({"ok": False, "error": "Not found"}), 404
-    pid = session_mgr.restart(acc.get("pid"), acc["account"])
-    set_pid(acc_id, pid)
-    if SYMBOL_AUTO_FETCH:
-        _ = fetch_symbols(MT5_MAIN_PATH, MT5_INSTANCES_DIR, acc["account"])
-    set_state(acc_id, "online")
-    send_email("MT5 Instance Online", f"Account {acc['account']} ({acc['nickname']}) restarted (PID {pid}).")
-    log.info("[RESTART] account=%s pid=%s", acc["account"], pid)
-    return jsonify({"ok": True, "pid": pid})
+    return jsonify({"ok": True, **_restart_account(acc)})
 
 
 @app.post("/stop/<int:acc_id>")
@@ -190,13 +422,84 @@ def stop(acc_id: int):
     acc = get_account(acc_id)
     if not acc:
         return jsonify({"ok": False, "error": "Not found"}), 404
-    if acc.get("pid"):
-        session_mgr.stop(acc["pid"])
-        set_pid(acc_id, None)
-    set_state(acc_id, "offline")
-    send_email("MT5 Instance Offline", f"Account {acc['account']} ({acc['nickname']}) stopped.")
-    log.info("[OFFLINE] account=%s", acc["account"])
-    return jsonify({"ok": True})
+    return jsonify({"ok": True, **_stop_account(acc)})
+
+
+# ----- Jobs (bulk / async lifecycle) -----
+@app.post("/jobs/register")
+@requires_auth
+def jobs_register():
+    """Bulk onboarding: {"accounts": [{"account": "...", "nickname": "..."}, ...], "concurrency": 4}"""
+    data = request.get_json(force=True) or {}
+    if not isinstance(data, dict) or not isinstance(data.get("accounts") or [], list):
+        return jsonify({"ok": False, "error": "Expected {\"accounts\": [...]}"}), 400
+    try:
+        concurrency = _job_concurrency(data)
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    entries = []
+    for a in data.get("accounts") or []:
+        a = a if isinstance(a, dict) else {"account": a}
+        account = str(a.get("account", "")).strip()
+        if account:
+            entries.append((account, str(a.get("nickname", "")).strip()))
+    if not entries:
+        return jsonify({"ok": False, "error": "No accounts"}), 400
+    return _submit_job("register", entries, lambda it: _register_account(*it),
+                       concurrency, lambda it: it[0])
+
+
+@app.post("/jobs/bulk")
+@requires_auth
+def jobs_bulk():
+    """{"action": "open"|"stop"|"restart", "ids": [1, 2, ...] | "all": true, "concurrency": 4}"""
+    data = request.get_json(force=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"ok": False, "error": "Expected a JSON object"}), 400
+    action = str(data.get("action", "")).lower()
+    fn = BULK_ACTIONS.get(action)
+    if not fn:
+        return jsonify({"ok": False, "error": f"action must be one of {', '.join(BULK_ACTIONS)}"}), 400
+    try:
+        concurrency = _job_concurrency(data)
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    if data.get("all"):
+        accs = list_accounts()
+    else:
+        ids = data.get("ids") or []
+        try:
+            if not isinstance(ids, list):
+                raise ValueError
+            wanted = {int(i) for i in ids}
+        except (TypeError, ValueError):
+            return jsonify({"ok": False, "error": "ids must be a list of account ids"}), 400
+        accs = [a for a in list_accounts() if a["id"] in wanted]
+    if not accs:
+        return jsonify({"ok": False, "error": "No matching accounts"}), 400
+    def run(a):
+        # re-read each row when its turn comes: the PID may have changed, or the account gone, while queued
+        row = get_account(a["id"])
+        if row is None:
+            raise ValueError("account deleted")
+        return fn(row)
+
+    return _submit_job(action, accs, run, concurrency, lambda a: a["account"])
+
+
+@app.get("/jobs")
+@requires_auth
+def jobs_list():
+    return jsonify({"jobs": [j.to_dict(with_items=False) for j in jobs.list()]})
+
+
+@app.get("/jobs/<job_id>")
+@requires_auth
+def job_status(job_id: str):
+    job = jobs.get(job_id)
+    if not job:
+        return jsonify({"ok": False, "error": "Not found"}), 404
+    return jsonify({"ok": True, "job": job.to_dict()})
 
 
 @app.delete("/delete/<int:acc_id>")
@@ -206,65 +509,533 @@ def delete_acc(acc_id: int):
     if not acc:
         return jsonify({"ok": False, "error": "Not found"}), 404
     if acc.get("pid"):
-        session_mgr.stop(acc["pid"])
+        sessions().stop(acc["pid"])
     delete_account(acc_id)
+    supervisor.clear(acc_id)
+    spool.forget(acc["account"])
+    symbol_service.forget(acc["account"])
     log.info("[DELETE] account=%s", acc["account"])
     return jsonify({"ok": True})
 
 
+@app.post("/delivery/<int:acc_id>")
+@requires_auth
+def set_delivery_mode(acc_id: int):
+    """Switch how signals reach the EA: {"mode": "file"} or {"mode": "journal"}."""
+    acc = get_account(acc_id)
+    if not acc:
+        return jsonify({"ok": False, "error": "Not found"}), 404
+    mode = str((request.get_json(force=True) or {}).get("mode", "")).strip().lower()
+    if mode not in DELIVERY_MODES:
+        return jsonify({"ok": False, "error": f"mode must be one of {', '.join(DELIVERY_MODES)}"}), 400
+    set_delivery(acc_id, mode)
+    log.info("[DELIVERY] account=%s mode=%s", acc["account"], mode)
+    return jsonify({"ok": True, "mode": mode})
+
+
+@app.post("/auto-restart/<int:acc_id>")
+@requires_auth
+def set_auto_restart_mode(acc_id: int):
+    """Let the supervisor restart this instance when it dies: {"enabled": true|false}."""
+    acc = get_account(acc_id)
+    if not acc:
+        return jsonify({"ok": False, "error": "Not found"}), 404
+    enabled = (request.get_json(force=True) or {}).get("enabled")
+    if not isinstance(enabled, bool):
+        return jsonify({"ok": False, "error": "enabled must be true or false"}), 400
+    set_auto_restart(acc_id, enabled)
+    supervisor.clear(acc_id)   # toggling also resets backoff and a crash-loop pause
+    log.info("[AUTO-RESTART] account=%s enabled=%s", acc["account"], enabled)
+    return jsonify({"ok": True, "enabled": enabled})
+
+
+@app.get("/supervisor")
+@requires_auth
+def supervisor_view():
+    """Pending/running automatic restarts, backoff and crash-loop state per account."""
+    return jsonify(supervisor.status())
+
+
+@app.get("/warm-pool")
+@requires_auth
+def warm_pool_view():
+    """Ready / building / stale pre-provisioned instances and claim hit counts."""
+    if _session_mgr is None:
+        return jsonify({"size": WARM_POOL_SIZE, "started": False})
+    return jsonify(_session_mgr.warm_pool.stats())
+
+
+# ----- Copy-trading groups -----
+def _group_view(name: str, members) -> dict:
+    return {"name": name, "members": [{"account": m.account, "volume_mult": m.volume_mult,
+                                       "symbol_map": m.symbol_map, "registered": registry.get(m.account) is not None}
+                                      for m in members]}
+
+@app.get("/groups")
+@requires_auth
+def groups_list():
+    return jsonify({"groups": [_group_view(n, group_routes.get(n) or ()) for n in group_routes.names()]})
+
+@app.put("/groups/<name>")
+@requires_auth
+def group_save(name: str):
+    """Create or replace a group: {"members": [{"account", "volume_mult", "symbol_map"}]}"""
+    data = request.get_json(silent=True) or {}
+    name = name.strip()
+    if not name:
+        return jsonify({"ok": False, "error": "group name is required"}), 400
+    try:
+        members = parse_members(data.get("members"))
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    save_group(name, members)
+    log.info("[GROUP] saved %s members=%d", name, len(members))
+    return jsonify({"ok": True, "group": _group_view(name, members)})
+
+@app.delete("/groups/<name>")
+@requires_auth
+def group_delete(name: str):
+    if not delete_group(name):
+        return jsonify({"ok": False, "error": "Not found"}), 404
+    log.info("[GROUP] deleted %s", name)
+    return jsonify({"ok": True})
+
+
 # ----- Webhook -----
-@app.post("/webhook/<token>")
-def webhook(token):
-    client_ip = request.headers.get("CF-Connecting-IP") or request.remote_addr or "0.0.0.0"
+def _client_ip() -> str:
+    # forwarded by the cluster router: the original client address travels in a header
+    if CLUSTER_TOKEN and hmac.compare_digest(request.headers.get(TOKEN_HEADER, ""), CLUSTER_TOKEN):
+        fwd = request.headers.get(CLIENT_IP_HEADER)
+        if fwd:
+            return fwd
+    return request.headers.get("CF-Connecting-IP") or request.remote_addr or "0.0.0.0"
+
+def _webhook_guard(token: str, client_ip: str, route: str = "webhook", sw: Stopwatch = None):
+    """Token check + rate limit. Returns an error response, or None to proceed.
+    A batch request counts as a single hit against the rate limit."""
     if token != WEBHOOK_TOKEN:
-        send_email("Unauthorized Webhook", f"Bad token from {client_ip}")
+        send_alert("Unauthorized Webhook", f"Bad token from {client_ip}")
         logging.warning("[UNAUTHORIZED] ip=%s", client_ip)
-        return jsonify({"ok": False, "error": "Unauthorized"}), 401
+        return _webhook_done(sw, route, "unauthorized", (jsonify({"ok": False, "error": "Unauthorized"}), 401))
+    if sw:
+        sw.lap("token")
 
     # rate-limit
-    now = time.time()
-    key = f"{client_ip}:{token}"
-    arr = [t for t in _rate_mem.get(key, []) if now - t <= RATE_LIMIT_WINDOW]
-    if len(arr) >= RATE_LIMIT_MAX:
-        _rate_mem[key] = arr
-        return jsonify({"ok": False, "error": "Too Many Requests"}), 429
-    arr.append(now)
-    _rate_mem[key] = arr
+    decision = rate_limiter.hit(route, f"{client_ip}:{token}")
+    if sw:
+        sw.lap("rate_limit")
+    if not decision.allowed:
+        return _webhook_done(sw, route, "rate_limited",
+                             (jsonify({"ok": False, "error": "Too Many Requests"}), 429,
+                              {"Retry-After": str(max(1, int(decision.retry_after + 0.999)))}))
+    return None
 
-    try:
-        raw = request.get_json(force=True)
-    except Exception:
-        send_email("Bad Payload", f"Invalid JSON from {client_ip}")
-        logging.error("[BAD_PAYLOAD] ip=%s json=parse_error", client_ip)
-        return jsonify({"ok": False, "error": "Invalid JSON"}), 400
+# ----- Ingestion: sync (deliver inside the request) | async (202 + durable queue) -----
+INGEST_MODE = os.getenv("INGEST_MODE", "sync").lower()
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "4"))
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "5"))
+INGEST_RETENTION_HOURS = float(os.getenv("INGEST_RETENTION_HOURS", "24"))
+
+# ----- Idempotency: retried webhooks return the first response instead of a second order -----
+# IDEMPOTENCY_MODE: off | key (payload idempotency_key / Idempotency-Key header) | hash (key, else payload hash)
+idempotency = IdempotencyCache(
+    mode=os.getenv("IDEMPOTENCY_MODE", "key").lower(),
+    ttl=float(os.getenv("IDEMPOTENCY_TTL", "86400")),
+    hash_ttl=float(os.getenv("IDEMPOTENCY_HASH_TTL", "120")),
+    max_entries=int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000")),
+    persist=os.getenv("IDEMPOTENCY_PERSIST", "false").lower() == "true",
+)
+
+# ----- Signal history: every processed signal + outcome, written in batches off the request path -----
+history = SignalHistory(
+    enabled=os.getenv("SIGNAL_HISTORY", "true").lower() == "true",
+    batch_size=int(os.getenv("SIGNAL_HISTORY_BATCH", "500")),
+    flush_interval=float(os.getenv("SIGNAL_HISTORY_FLUSH_MS", "500")) / 1000,
+    max_queue=int(os.getenv("SIGNAL_HISTORY_QUEUE", "10000")),
+    retention=float(os.getenv("SIGNAL_HISTORY_RETENTION_DAYS", "30")) * 86400,
+)
+
+# ----- Webhook metrics -----
+WEBHOOK_SLOW_MS = float(os.getenv("WEBHOOK_SLOW_MS", "0"))   # 0 = slow-request log off
+metrics.max_series = int(os.getenv("METRICS_MAX_SERIES", "2000"))
+metrics.describe("webhook_stage_seconds", "Time spent per webhook pipeline stage")
+metrics.describe("webhook_requests_total", "Webhook requests by route and outcome")
+metrics.describe("webhook_signals_total", "Signals by account, symbol and outcome")
+metrics.describe("webhook_idempotency_total", "Idempotency cache lookups by route and result (hit/miss)")
+
+def _count_signal(account, symbol, result: str) -> None:
+    metrics.inc("webhook_signals_total", account=account or "", symbol=symbol or "", result=result)
+
+def _webhook_done(sw, route: str, result: str, resp, account=None, symbol=None):
+    """Record stage timings + outcome counters for one webhook request, then return resp."""
+    metrics.inc("webhook_requests_total", route=route, result=result)
+    if account is not None:
+        _count_signal(account, symbol, result)
+    if sw is None:
+        return resp
+    sw.record(metrics, "webhook_stage_seconds", route=route)
+    total_ms = sw.total() * 1000
+    if WEBHOOK_SLOW_MS and total_ms >= WEBHOOK_SLOW_MS:
+        log.warning("[SLOW_WEBHOOK] route=%s result=%s acc=%s total=%.2fms %s",
+                    route, result, account, total_ms, sw.breakdown())
+    return resp
 
+def _idempotency_begin(route: str, raw, sw: Stopwatch):
+    """-> (key, ttl, replay response or None). key is None when the request is not deduplicated."""
+    found = idempotency.key_for(route, raw, request.headers.get("Idempotency-Key"))
+    if not found:
+        return None, 0, None
+    key, ttl = found
+    hit, cached = idempotency.begin(key)
+    sw.lap("idempotency")
+    metrics.inc("webhook_idempotency_total", route=route, result="hit" if hit else "miss")
+    if not hit:
+        return key, ttl, None
+    logging.info("[IDEMPOTENT_REPLAY] route=%s key=%s", route, key)
+    return key, ttl, _webhook_done(sw, route, "duplicate",
+                                   (jsonify(cached["body"]), cached["code"], {"Idempotent-Replay": "true"}))
+
+def _idempotency_end(key, ttl: float, code: int, body) -> None:
+    """Store successful responses for replay; release the key otherwise so a retry runs again."""
+    if key is None:
+        return
+    if code in (200, 202):
+        idempotency.done(key, ttl, {"code": code, "body": body})
+    else:
+        idempotency.abandon(key)
+
+def _backpressure_alert(account: str, depth: int) -> None:
+    send_alert("Signal Backpressure", f"Account {account} has {depth} unconsumed signals; new signals are refused.")
+    logging.warning("[BACKPRESSURE] acc=%s pending=%s", account, depth)
+
+def _process_signal(raw, client_ip: str, sw: Stopwatch, route: str = "webhook", ref: str = None):
+    """normalize -> account lookup -> backpressure -> deliver for one signal (or a group fan-out),
+    recorded in the signal history. Returns (http status, body, result label, account, symbol, extra headers)."""
+    if isinstance(raw, dict) and raw.get("group") is not None and "account_number" not in raw:
+        return _process_group(raw, client_ip, sw, route, ref)
+    code, body, result, acc_no, symbol, headers, norm = _process_one(raw, client_ip, sw)
+    history.record(route, result, acc_no, raw, norm, body.get("error"), body.get("signal_path"), client_ip, ref=ref)
+    return code, body, result, acc_no, symbol, headers
+
+def _process_one(raw, client_ip: str, sw: Stopwatch):
+    """_process_signal for one account; also returns the normalized signal (or None)."""
     try:
-        norm = normalize_payload(raw, MT5_INSTANCES_DIR, cutoff=SYMBOL_MATCH_CUTOFF)
+        norm = normalize_payload(raw, MT5_INSTANCES_DIR, cutoff=SYMBOL_MATCH_CUTOFF, lap=sw.lap)
     except Exception as e:
-        send_email("Bad Payload", f"{e} | from {client_ip} | raw={raw}")
+        send_alert("Bad Payload", f"{e} | from {client_ip} | raw={raw}")
         logging.error("[BAD_PAYLOAD] ip=%s err=%s raw=%s", client_ip, e, raw)
-        return jsonify({"ok": False, "error": str(e)}), 400
+        acc_in = raw.get("account_number") if isinstance(raw, dict) else None
+        sym_in = raw.get("symbol") if isinstance(raw, dict) else None
+        return 400, {"ok": False, "error": str(e)}, "rejected", str(acc_in) if acc_in is not None else "", sym_in, {}, None
 
-    # ensure account exists
-    account = None
-    for r in list_accounts():
-        if str(r["account"]) == norm["account_number"]:
-            account = r
-            break
+    # ensure account exists (O(1) registry lookup, no DB hit)
+    acc_no, symbol = norm["account_number"], norm["symbol"]
+    account = registry.get(acc_no)
+    sw.lap("lookup")
     if not account:
-        return jsonify({"ok": False, "error": "Account not registered"}), 404
+        return 404, {"ok": False, "error": "Account not registered"}, "not_registered", acc_no, symbol, {}, norm
+
+    mode = account.get("delivery", "file")
+    full, depth = spool.over_limit(acc_no, mode)
+    sw.lap("backpressure")
+    if full:
+        _backpressure_alert(acc_no, depth)
+        return (503, {"ok": False, "error": "Backpressure: EA is not consuming signals", "pending": depth},
+                "backpressure", acc_no, symbol, {"Retry-After": str(int(max(1, SPOOL_SWEEP_INTERVAL)))}, norm)
 
     try:
-        path = write_signal(MT5_INSTANCES_DIR, norm["account_number"], norm)
+        path = deliver_signal(MT5_INSTANCES_DIR, acc_no, norm, mode)
+        if mode == "file":
+            spool.note_written(acc_no)
+        sw.lap("write")
         logging.info(
             "[WEBHOOK] acc=%s sym_in=%s sym_out=%s action=%s vol=%s",
-            norm["account_number"], raw.get("symbol"), norm["symbol"], norm["action"], norm["volume"]
+            acc_no, raw.get("symbol"), symbol, norm["action"], norm["volume"]
         )
-        return jsonify({"ok": True, "signal_path": path, "normalized": norm})
+        return 200, {"ok": True, "signal_path": path, "normalized": norm}, "accepted", acc_no, symbol, {}, norm
     except Exception as e:
-        send_email("Signal Write Error", f"{e} | acc={norm['account_number']}")
+        sw.lap("write")
+        send_alert("Signal Write Error", f"{e} | acc={acc_no}")
         logging.exception("Signal write failed")
-        return jsonify({"ok": False, "error": f"Signal write failed: {e}"}), 500
+        return 500, {"ok": False, "error": f"Signal write failed: {e}"}, "write_error", acc_no, symbol, {}, norm
+
+def _deliver_leg(acc_no: str, norm: dict, mode: str):
+    """-> (path, None) or (None, error); runs on fanout_pool."""
+    try:
+        path = deliver_signal(MT5_INSTANCES_DIR, acc_no, norm, mode)
+    except Exception as e:
+        return None, str(e)
+    if mode == "file":
+        spool.note_written(acc_no)
+    return path, None
+
+def _process_group(raw, client_ip: str, sw: Stopwatch, route: str = "webhook", ref: str = None):
+    """Fan one signal out to every member of raw["group"] (volume scaled, symbol overridden).
+    Same return shape as _process_signal; body carries one result per member."""
+    name = str(raw["group"])
+    legs = group_routes.expand(name, raw)
+    sw.lap("route")
+    if legs is None:
+        return 404, {"ok": False, "error": f"Unknown group: {name}"}, "not_registered", "", raw.get("symbol"), {}
+
+    normalized = normalize_batch([leg for _, leg in legs], MT5_INSTANCES_DIR, cutoff=SYMBOL_MATCH_CUTOFF)
+    sw.lap("normalize")
+    results = [None] * len(legs)
+    outcome = ["rejected"] * len(legs)
+    pending = []
+    for i, ((member, _), (norm, err)) in enumerate(zip(legs, normalized)):
+        acc_no = member.account
+        if not err and norm["volume"] <= 0:
+            err = f"volume scales to {norm['volume']} (volume_mult={member.volume_mult})"
+        if err:
+            results[i] = {"account": acc_no, "ok": False, "error": err}
+            continue
+        account = registry.get(acc_no)
+        if not account:
+            results[i] = {"account": acc_no, "ok": False, "error": "Account not registered"}
+            outcome[i] = "not_registered"
+            continue
+        mode = account.get("delivery", "file")
+        full, depth = spool.over_limit(acc_no, mode)
+        if full:
+            _backpressure_alert(acc_no, depth)
+            results[i] = {"account": acc_no, "ok": False, "error": "Backpressure: EA is not consuming signals",
+                          "pending": depth}
+            outcome[i] = "backpressure"
+            continue
+        pending.append((i, acc_no, norm, mode))
+    sw.lap("lookup")
+
+    if len(pending) == 1:
+        written = [_deliver_leg(*pending[0][1:])]
+    else:
+        written = list(fanout_pool.map(lambda p: _deliver_leg(*p[1:]), pending))
+    for (i, acc_no, norm, _), (path, err) in zip(pending, written):
+        if err:
+            send_alert("Signal Write Error", f"{err} | acc={acc_no} group={name}")
+            results[i] = {"account": acc_no, "ok": False, "error": f"Signal write failed: {err}"}
+            outcome[i] = "write_error"
+        else:
+            results[i] = {"account": acc_no, "ok": True, "signal_path": path, "normalized": norm}
+            outcome[i] = "accepted"
+    sw.lap("write")
+
+    for (member, leg), (norm, _), result, res in zip(legs, normalized, outcome, results):
+        _count_signal(member.account, norm["symbol"] if norm else leg.get("symbol"), result)
+        history.record(route, result, member.account, leg, norm, res.get("error"), res.get("signal_path"),
+                       client_ip, group=name, ref=ref)
+    accepted = outcome.count("accepted")
+    logging.info("[WEBHOOK_GROUP] group=%s sym_in=%s action=%s members=%d accepted=%d",
+                 name, raw.get("symbol"), raw.get("action"), len(legs), accepted)
+    body = {"ok": accepted == len(legs), "group": name, "accepted": accepted,
+            "rejected": len(legs) - accepted, "results": results}
+    if accepted:
+        return 200, body, "accepted" if accepted == len(legs) else "partial", None, raw.get("symbol"), {}
+    if any(o in ("backpressure", "write_error") for o in outcome):
+        return 503, body, "backpressure" if "backpressure" in outcome else "write_error", None, raw.get("symbol"), \
+            {"Retry-After": str(int(max(1, SPOOL_SWEEP_INTERVAL)))}
+    return 400, body, "rejected", None, raw.get("symbol"), {}
+
+def _ingest_process(raw, client_ip: str, sig_id: str) -> dict:
+    """Worker side of INGEST_MODE=async: same pipeline, outcome stored on the queue row."""
+    sw = Stopwatch()
+    code, body, result, acc_no, symbol, _ = _process_signal(raw, client_ip, sw, "ingest", ref=sig_id)
+    _webhook_done(sw, "ingest_worker", result, None, acc_no, symbol)
+    if "results" in body:
+        if body["accepted"]:
+            # group fan-out: never retried once a member got the signal
+            return {"group": body["group"], "accepted": body["accepted"], "results": body["results"]}
+        error = "; ".join(f"{r['account']}: {r['error']}" for r in body["results"])
+    else:
+        error = body.get("error")
+    if result in ("backpressure", "write_error"):
+        raise Retry(error, delay=max(1.0, SPOOL_SWEEP_INTERVAL if result == "backpressure" else 2.0))
+    if not body["ok"]:
+        raise ValueError(error)
+    return {"signal_path": body["signal_path"], "normalized": body["normalized"]}
+
+ingest = IngestQueue(_ingest_process, workers=INGEST_WORKERS, max_attempts=INGEST_MAX_ATTEMPTS,
+                     retention=INGEST_RETENTION_HOURS * 3600)
+
+@app.post("/webhook/<token>")
+def webhook(token):
+    sw = Stopwatch()
+    client_ip = _client_ip()
+    denied = _webhook_guard(token, client_ip, "webhook", sw)
+    if denied:
+        return denied
+
+    try:
+        raw = request.get_json(force=True)
+    except Exception:
+        send_alert("Bad Payload", f"Invalid JSON from {client_ip}")
+        logging.error("[BAD_PAYLOAD] ip=%s json=parse_error", client_ip)
+        return _webhook_done(sw, "webhook", "bad_json", (jsonify({"ok": False, "error": "Invalid JSON"}), 400))
+    sw.lap("parse")
+    if INGEST_MODE == "async" and not isinstance(raw, dict):
+        return _webhook_done(sw, "webhook", "rejected",
+                             (jsonify({"ok": False, "error": "Signal must be a JSON object"}), 400))
+
+    key, ttl, replay = _idempotency_begin("webhook", raw, sw)
+    if replay:
+        return replay
+    code, body = 500, None
+    try:
+        if INGEST_MODE == "async":
+            # fast ack: persist and answer; workers normalize + deliver
+            sig_id = ingest.enqueue(raw, client_ip)
+            sw.lap("enqueue")
+            code, body = 202, {"ok": True, "signal_id": sig_id, "status_url": f"/signals/{sig_id}"}
+            return _webhook_done(sw, "webhook", "queued", (jsonify(body), code))
+
+        code, body, result, acc_no, symbol, headers = _process_signal(raw, client_ip, sw)
+        return _webhook_done(sw, "webhook", result, (jsonify(body), code, headers), acc_no, symbol)
+    finally:
+        _idempotency_end(key, ttl, code, body)
+
+
+@app.get("/signals")
+@requires_auth
+def signals_list():
+    """Signal history, newest first: ?account=&symbol=&outcome=&route=&group=&since=&until=&limit=&cursor=
+    (since/until: epoch seconds or ISO date). Follow next_cursor for the next page."""
+    filters = {k: request.args.get(k) for k in ("account", "symbol", "outcome", "route", "group", "since", "until")}
+    try:
+        rows, next_cursor = history.query(filters, request.args.get("cursor"), int(request.args.get("limit", "100")))
+    except ValueError as e:
+        return jsonify({"ok": False, "error": f"Bad query: {e}"}), 400
+    return jsonify({"ok": True, "signals": rows, "next_cursor": next_cursor})
+
+
+@app.get("/signals/<sig_id>")
+@requires_auth
+def signal_status(sig_id: str):
+    """Outcome of a signal accepted with 202 in INGEST_MODE=async."""
+    row = ingest.get(sig_id)
+    if not row:
+        return jsonify({"ok": False, "error": "Not found"}), 404
+    return jsonify({"ok": True, "signal": row})
+
+
+@app.get("/ingest/stats")
+@requires_auth
+def ingest_stats():
+    return jsonify({"mode": INGEST_MODE, "in_memory": ingest.depth(), "rows": ingest.stats(),
+                    "idempotency": idempotency.stats(), "history": history.stats()})
+
+
+@app.post("/webhook/<token>/batch")
+def webhook_batch(token):
+    """
+    Accept a basket of signals: a JSON array, or {"signals": [...]}.
+    Returns one result per item in input order; valid items are delivered even
+    if others in the same batch are rejected.
+    """
+    sw = Stopwatch()
+    client_ip = _client_ip()
+    denied = _webhook_guard(token, client_ip, "webhook_batch", sw)
+    if denied:
+        return denied
+
+    try:
+        raw = request.get_json(force=True)
+    except Exception:
+        send_alert("Bad Payload", f"Invalid JSON from {client_ip}")
+        logging.error("[BAD_PAYLOAD] ip=%s json=parse_error", client_ip)
+        return _webhook_done(sw, "webhook_batch", "bad_json", (jsonify({"ok": False, "error": "Invalid JSON"}), 400))
+    sw.lap("parse")
+    items = raw.get("signals") if isinstance(raw, dict) else raw
+    if not isinstance(items, list) or not items:
+        return _webhook_done(sw, "webhook_batch", "rejected",
+                             (jsonify({"ok": False, "error": "Expected a non-empty array of signals"}), 400))
+    if len(items) > WEBHOOK_BATCH_MAX:
+        return _webhook_done(sw, "webhook_batch", "rejected",
+                             (jsonify({"ok": False, "error": f"Batch too large (max {WEBHOOK_BATCH_MAX})"}), 413))
+
+    # a retried batch is replayed as a whole; stored once anything in it was delivered
+    key, ttl, replay = _idempotency_begin("webhook_batch", raw, sw)
+    if replay:
+        return replay
+    try:
+        return _webhook_batch(items, client_ip, sw, key, ttl)
+    except Exception:
+        _idempotency_end(key, ttl, 500, None)
+        raise
+
+
+def _webhook_batch(items: list, client_ip: str, sw: Stopwatch, key, ttl: float):
+    results = [None] * len(items)
+    outcome = ["rejected"] * len(items)
+    by_account = {}
+    modes = {}
+    normalized = normalize_batch(items, MT5_INSTANCES_DIR, cutoff=SYMBOL_MATCH_CUTOFF)
+    sw.lap("normalize")
+    for i, (norm, err) in enumerate(normalized):
+        if err:
+            results[i] = {"index": i, "ok": False, "error": err}
+        else:
+            acc = norm["account_number"]
+            if acc not in modes:
+                row = registry.get(acc)
+                modes[acc] = row.get("delivery", "file") if row else None
+            if modes[acc] is None:
+                results[i] = {"index": i, "ok": False, "error": "Account not registered"}
+                outcome[i] = "not_registered"
+            else:
+                by_account.setdefault(acc, []).append((i, norm))
+
+    sw.lap("lookup")
+    write_errors = []
+    for acc, entries in by_account.items():
+        full, depth = spool.over_limit(acc, modes[acc])
+        if full:
+            _backpressure_alert(acc, depth)
+            for i, _ in entries:
+                results[i] = {"index": i, "ok": False, "error": "Backpressure: EA is not consuming signals", "pending": depth}
+                outcome[i] = "backpressure"
+            continue
+        written = deliver_signals(MT5_INSTANCES_DIR, acc, [n for _, n in entries], modes[acc])
+        if modes[acc] == "file":
+            spool.note_written(acc, sum(1 for path, _ in written if path))
+        for (i, norm), (path, err) in zip(entries, written):
+            if err:
+                write_errors.append(f"acc={acc} err={err}")
+                results[i] = {"index": i, "ok": False, "error": f"Signal write failed: {err}"}
+                outcome[i] = "write_error"
+            else:
+                results[i] = {"index": i, "ok": True, "signal_path": path, "normalized": norm}
+                outcome[i] = "accepted"
+
+    sw.lap("write")
+    for (norm, _), item, result, res in zip(normalized, items, outcome, results):
+        item = item if isinstance(item, dict) else {}
+        acc = norm["account_number"] if norm else str(item.get("account_number", ""))
+        _count_signal(acc, norm["symbol"] if norm else item.get("symbol"), result)
+        history.record("batch", result, acc, item, norm, res.get("error"), res.get("signal_path"), client_ip)
+
+    accepted = sum(1 for r in results if r["ok"])
+    rejected = [r for r in results if not r["ok"]]
+    bad = [i for i, (_, err) in enumerate(normalized) if err]
+    if bad:
+        logging.error("[BAD_PAYLOAD] ip=%s batch invalid=%d/%d first_err=%s", client_ip, len(bad), len(items), results[bad[0]]["error"])
+        send_alert("Bad Payload", f"Batch from {client_ip}: {len(bad)}/{len(items)} signals invalid")
+    if write_errors:
+        send_alert("Signal Write Error", " | ".join(write_errors[:20]))
+    logging.info("[WEBHOOK_BATCH] ip=%s accounts=%d accepted=%d rejected=%d", client_ip, len(by_account), accepted, len(rejected))
+    body = {"ok": not rejected, "accepted": accepted, "rejected": len(rejected), "results": results}
+    _idempotency_end(key, ttl, 200 if accepted else 400, body)
+    return _webhook_done(sw, "webhook_batch", "accepted" if not rejected else ("partial" if accepted else "rejected"),
+                         jsonify(body))
+
+
+# ----- Metrics (Prometheus) -----
+@app.get("/metrics")
+@requires_auth
+def metrics_view():
+    """Prometheus text format; ?format=json for p50/p95/p99 per stage."""
+    if request.args.get("format") == "json":
+        return jsonify({"histograms": metrics.summary()})
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
 
 # ----- Health -----
@@ -274,36 +1045,135 @@ def health():
 
 
 # ----- Logs (Log Viewer) -----
+LOG_TAIL_LINES = int(os.getenv("LOG_TAIL_LINES", "200"))
+LOG_STREAM_POLL = float(os.getenv("LOG_STREAM_POLL", "1"))
+LOG_STREAM_MAX_SECONDS = int(os.getenv("LOG_STREAM_MAX_SECONDS", "300"))
+
 @app.get("/logs")
 @requires_auth
 def logs_view():
+    """?n=200 -> last n lines; ?cursor=<c> -> only lines written after the cursor."""
     try:
-        with open(LOG_FILE, "r", encoding="utf-8") as f:
-            lines = f.readlines()[-200:]
-        return jsonify({"logs": lines})
+        cursor = request.args.get("cursor")
+        if cursor:
+            lines, cursor, reset = read_since(LOG_FILE, cursor, backups=LOG_BACKUP_COUNT)
+            return jsonify({"logs": lines, "cursor": cursor, "reset": reset})
+        n = max(1, min(int(request.args.get("n", LOG_TAIL_LINES)), 5000))
+        lines, cursor = tail(LOG_FILE, n, backups=LOG_BACKUP_COUNT)
+        return jsonify({"logs": lines, "cursor": cursor})
     except Exception as e:
         return jsonify({"logs": [f"log read error: {e}\n"]})
 
 
+@app.get("/logs/stream")
+@requires_auth
+def logs_stream():
+    """Server-Sent Events: one `data:` per new log line, event id = cursor.
+    The stream ends after LOG_STREAM_MAX_SECONDS; EventSource reconnects with Last-Event-ID."""
+    cursor = request.headers.get("Last-Event-ID") or request.args.get("cursor")
+
+    def gen():
+        cur = cursor
+        if not cur:
+            _, cur = tail(LOG_FILE, 0, backups=LOG_BACKUP_COUNT)
+        deadline = time.monotonic() + LOG_STREAM_MAX_SECONDS
+        last_sent = time.monotonic()
+        yield "retry: 2000\n\n"
+        while time.monotonic() < deadline:
+            lines, cur, reset = read_since(LOG_FILE, cur, backups=LOG_BACKUP_COUNT)
+            if lines or reset:
+                event = "reset" if reset else "log"
+                body = "".join("data: " + ln.rstrip("\r\n") + "\n" for ln in lines) or "data:\n"
+                yield f"event: {event}\nid: {cur}\n{body}\n"
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent > 15:
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+            time.sleep(LOG_STREAM_POLL)
+
+    return _sse_response(gen)
+
+
 # ----- Background monitor: Online/Offline email -----
+# A child MT5 we launched exiting wakes the monitor at once instead of after MONITOR_INTERVAL
+_monitor_wake = threading.Event()
+proc_snapshot.add_exit_listener(lambda pid: _monitor_wake.set())
+proc_snapshot.add_exit_listener(lambda pid: status_feed.poke())
+
 def monitor_loop():
     while True:
         try:
             rows = list_accounts()
-            for r in rows:
-                alive = session_mgr.is_alive(r.get("pid"))
-                state = "online" if alive else "offline"
-                if state != r.get("last_state"):
-                    set_state(r["id"], state)
-                    subj = f"MT5 Instance {'Online' if alive else 'Offline'}"
-                    body = f"Account {r['account']} ({r['nickname']}) is now {state.upper()}."
-                    send_email(subj, body)
-                    log.info("[STATE] account=%s -> %s", r["account"], state)
+            changed = []
+            # all transitions of this pass are committed in one transaction
+            with batch() as b:
+                for r in rows:
+                    alive = proc_snapshot.is_alive(r.get("pid"))
+                    state = "online" if alive else "offline"
+                    if state != r.get("last_state"):
+                        b.set_state(r["id"], state)
+                        changed.append((r, state))
+            for r, state in changed:
+                subj = f"MT5 Instance {'Online' if state == 'online' else 'Offline'}"
+                body = f"Account {r['account']} ({r['nickname']}) is now {state.upper()}."
+                send_alert(subj, body)
+                log.info("[STATE] account=%s -> %s", r["account"], state)
+                if state == "offline":
+                    supervisor.notify_down(r)
         except Exception:
             log.exception("monitor loop error")
-        time.sleep(max(5, MONITOR_INTERVAL))
+        _monitor_wake.wait(max(5, MONITOR_INTERVAL))
+        _monitor_wake.clear()
+
+
+# ----- Startup -----
+# Importing this module only reads config and builds objects; boot() does the I/O and starts the
+# background threads exactly once. Run with `python server.py`, or point a WSGI
+# server at the factory (e.g. `waitress-serve --call server:create_app`).
+_booted = False
+_boot_lock = threading.Lock()
+
+def boot() -> None:
+    global _booted
+    if _booted:
+        return
+    with _boot_lock:
+        if _booted:
+            return
+        _configure_logging()
+        init_db()   # also loads the account registry
+        reloaded = idempotency.load()
+        if reloaded:
+            log.info("[IDEMPOTENCY] reloaded %d keys", reloaded)
+        if not os.path.isfile(MT5_MAIN_PATH):
+            log.warning("[BOOT] MT5_MAIN_PATH not found (%s): open/register will fail until it is fixed", MT5_MAIN_PATH)
+        elif WARM_POOL_SIZE > 0:
+            try:
+                sessions().warm_pool.start()
+            except Exception:
+                log.exception("[BOOT] warm pool not started")
+        threading.Thread(target=monitor_loop, name="monitor", daemon=True).start()
+        status_feed.start()
+        # started in sync mode too, so signals still queued from an async run are delivered
+        ingest.start()
+        history.start()
+        telemetry.start()
+        supervisor.start()
+        if heartbeat:
+            heartbeat.start()
+        spool.start(lambda: [r["account"] for r in registry.all() if r.get("delivery", "file") == "file"])
+        _booted = True
+
+def create_app() -> Flask:
+    """Application factory: boot() then return the Flask app."""
+    boot()
+    return app
 
-threading.Thread(target=monitor_loop, daemon=True).start()
+@app.before_request
+def _boot_on_first_request():
+    # `server:app` used directly by a WSGI server still gets a booted process
+    if not _booted:
+        boot()
 
 
 # ----- Static -----
@@ -314,4 +1184,4 @@ def static_proxy(path):
 
 # ----- Run -----
 if __name__ == "__main__":
-    app.run(host=FLASK_HOST, port=FLASK_PORT, debug=DEBUG)
+    create_app().run(host=FLASK_HOST, port=FLASK_PORT, debug=DEBUG)
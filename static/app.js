@@ -3,14 +3,13 @@ async function fetchWebhook(){
   const js=await res.json();
   document.getElementById('webhookUrl').value = js.url || '';
 }
-async function fetchAccounts(){
-  const res=await fetch('/accounts');
-  const js=await res.json();
-  const tbody=document.querySelector('#tbl tbody'); tbody.innerHTML='';
-  (js.accounts||[]).forEach(acc=>{
-    const alive=!!acc.alive;
-    const tr=document.createElement('tr');
-    tr.innerHTML = `
+// ----- Accounts: versioned snapshot + SSE deltas, only changed rows are re-rendered -----
+const accRows=new Map();   // id -> last rendered row (JSON)
+let accEtag=null, accVersion=null, accSource=null;
+
+function accRowHtml(acc){
+  const alive=!!acc.alive;
+  return `
       <td>${acc.id}</td>
       <td><span class="status-dot ${alive?'alive':'dead'}"></span>${alive?'Online':'Offline'}</td>
       <td>${acc.account}</td>
@@ -25,22 +24,66 @@ async function fetchAccounts(){
           <button data-id="${acc.id}" class="btn-del">Delete</button>
         </div>
       </td>`;
-    tbody.appendChild(tr);
-  });
-  document.querySelectorAll('.btn-open').forEach(btn=>{
-    btn.onclick=async()=>{const id=btn.getAttribute('data-id'); const r=await fetch('/open/'+id,{method:'POST'}); const j=await r.json(); if(!j.ok) alert(j.error||'Open failed'); await fetchAccounts();};
-  });
-  document.querySelectorAll('.btn-restart').forEach(btn=>{
-    btn.onclick=async()=>{const id=btn.getAttribute('data-id'); const r=await fetch('/restart/'+id,{method:'POST'}); const j=await r.json(); if(!j.ok) alert(j.error||'Restart failed'); await fetchAccounts();};
-  });
-  document.querySelectorAll('.btn-stop').forEach(btn=>{
-    btn.onclick=async()=>{const id=btn.getAttribute('data-id'); const r=await fetch('/stop/'+id,{method:'POST'}); const j=await r.json(); if(!j.ok) alert(j.error||'Stop failed'); await fetchAccounts();};
-  });
-  document.querySelectorAll('.btn-del').forEach(btn=>{
-    btn.onclick=async()=>{const id=btn.getAttribute('data-id'); if(!confirm('Delete this account?')) return; const r=await fetch('/delete/'+id,{method:'DELETE'}); const j=await r.json(); if(!j.ok) alert(j.error||'Delete failed'); await fetchAccounts();};
+}
+function upsertAccount(acc){
+  const key=JSON.stringify(acc);
+  if(accRows.get(acc.id)===key) return;
+  accRows.set(acc.id,key);
+  const tbody=document.querySelector('#tbl tbody');
+  let tr=tbody.querySelector(`tr[data-id="${acc.id}"]`);
+  if(!tr){
+    tr=document.createElement('tr'); tr.dataset.id=acc.id;
+    // rows are ordered newest (highest id) first
+    const next=[...tbody.children].find(r=>Number(r.dataset.id)<acc.id);
+    tbody.insertBefore(tr,next||null);
+  }
+  tr.innerHTML=accRowHtml(acc);
+}
+function removeAccount(id){
+  accRows.delete(id);
+  const tr=document.querySelector(`#tbl tbody tr[data-id="${id}"]`);
+  if(tr) tr.remove();
+}
+function applySnapshot(list){
+  const ids=new Set(list.map(a=>a.id));
+  [...accRows.keys()].filter(id=>!ids.has(id)).forEach(removeAccount);
+  list.forEach(upsertAccount);
+}
+
+async function fetchAccounts(){
+  const res=await fetch('/accounts',{headers:accEtag?{'If-None-Match':accEtag}:{}});
+  if(res.status===304) return;
+  const js=await res.json();
+  accEtag=res.headers.get('ETag'); accVersion=js.version||null;
+  applySnapshot(js.accounts||[]);
+}
+function followAccounts(){
+  if(!window.EventSource) return;
+  accSource=new EventSource('/accounts/stream'+(accVersion?('?since='+encodeURIComponent(accVersion)):''));
+  accSource.addEventListener('snapshot',e=>{const js=JSON.parse(e.data); accVersion=js.version; applySnapshot(js.accounts||[]);});
+  accSource.addEventListener('delta',e=>{
+    const js=JSON.parse(e.data); accVersion=js.version;
+    (js.removed||[]).forEach(removeAccount);
+    (js.changed||[]).forEach(upsertAccount);
   });
+  accSource.onerror=()=>{ accSource.close(); accSource=null; setTimeout(followAccounts, 30000); };
 }
 
+const ACTIONS={
+  'btn-open':   id=>fetch('/open/'+id,{method:'POST'}),
+  'btn-restart':id=>fetch('/restart/'+id,{method:'POST'}),
+  'btn-stop':   id=>fetch('/stop/'+id,{method:'POST'}),
+  'btn-del':    id=>confirm('Delete this account?') ? fetch('/delete/'+id,{method:'DELETE'}) : null,
+};
+document.querySelector('#tbl tbody').addEventListener('click',async e=>{
+  const btn=e.target.closest('button'); if(!btn) return;
+  const cls=Object.keys(ACTIONS).find(c=>btn.classList.contains(c)); if(!cls) return;
+  const r=await ACTIONS[cls](btn.getAttribute('data-id')); if(!r) return;
+  const j=await r.json();
+  if(!j.ok) alert(j.error||(btn.textContent+' failed'));
+  if(!accSource) await fetchAccounts();
+});
+
 document.getElementById('btnCopy').onclick=()=>{
   const el=document.getElementById('webhookUrl'); el.select(); navigator.clipboard.writeText(el.value);
 };
@@ -54,15 +97,84 @@ document.getElementById('btnAdd').onclick=async()=>{
 
 document.getElementById('btnRefreshLog').onclick=loadLogs;
 
+const LOG_KEEP=1000;
+let logLines=[], logCursor=null, logSource=null;
+
+function renderLogs(){
+  const el=document.getElementById('logs');
+  const atBottom = el.scrollTop + el.clientHeight >= el.scrollHeight - 20;
+  el.innerText = logLines.join('');
+  if(atBottom) el.scrollTop = el.scrollHeight;
+}
+function appendLogs(lines){
+  if(!lines.length) return;
+  logLines = logLines.concat(lines).slice(-LOG_KEEP);
+  renderLogs();
+}
+
+// initial tail, then only new lines: SSE when available, cursor polling otherwise
 async function loadLogs(){
   const res=await fetch('/logs');
   const js=await res.json();
-  document.getElementById('logs').innerText = (js.logs||[]).join('');
+  logLines = js.logs||[]; logCursor = js.cursor||null;
+  renderLogs();
+  followLogs();
+}
+function followLogs(){
+  if(logSource){ logSource.close(); logSource=null; }
+  if(!window.EventSource){ return; }
+  logSource = new EventSource('/logs/stream'+(logCursor?('?cursor='+encodeURIComponent(logCursor)):''));
+  const onData = e => {
+    logCursor = e.lastEventId || logCursor;
+    appendLogs(e.data ? e.data.split('\n').map(l=>l+'\n') : []);
+  };
+  logSource.addEventListener('log', onData);
+  logSource.addEventListener('reset', e => { logLines=[]; onData(e); });
+  // 503 (stream limit) or a dropped connection: fall back to polling, try streaming again later
+  logSource.onerror = () => { logSource.close(); logSource=null; setTimeout(followLogs, 30000); };
+}
+async function pollLogs(){
+  if(logSource || !logCursor) return;
+  const res=await fetch('/logs?cursor='+encodeURIComponent(logCursor));
+  const js=await res.json();
+  if(js.reset) logLines=[];
+  logCursor = js.cursor||logCursor;
+  appendLogs(js.logs||[]);
+}
+
+// ----- Resources: per-instance telemetry -----
+const fmtBytes=b=>b==null?'':(b>=1<<30?(b/(1<<30)).toFixed(2)+' GB':(b/(1<<20)).toFixed(0)+' MB');
+const fmtUptime=s=>s==null?'':(s>=86400?Math.floor(s/86400)+'d ':'')+new Date(s*1000).toISOString().substr(11,8);
+function sparkline(values,max){
+  if(!values||values.length<2) return '';
+  const w=120,h=24,top=Math.max(max||0,...values,1);
+  const pts=values.map((v,i)=>`${(i*w/(values.length-1)).toFixed(1)},${(h-v*h/top).toFixed(1)}`).join(' ');
+  return `<svg class="spark" width="${w}" height="${h}"><polyline points="${pts}"/></svg>`;
+}
+let resInterval=5;
+async function fetchTelemetry(){
+  const res=await fetch('/telemetry?history=60');
+  if(!res.ok) return;
+  const js=await res.json();
+  resInterval=js.interval||resInterval;
+  const h=js.host||{};
+  document.getElementById('hostRes').textContent = h.ts ?
+    `Host: CPU ${h.cpu_pct}% of ${h.cpu_count} cores, RAM ${fmtBytes(h.mem_used)} / ${fmtBytes(h.mem_total)} · sample pass ${js.pass_ms} ms` : 'Collecting…';
+  const rows=Object.entries(js.accounts||{}).sort((a,b)=>(b[1].cpu_pct||0)-(a[1].cpu_pct||0));
+  document.querySelector('#resTbl tbody').innerHTML = rows.map(([acc,v])=>`<tr>
+      <td>${acc}</td><td>${v.pid??''}</td>
+      <td>${v.running?(v.cpu_pct??''):'<span class="tip">not running</span>'}</td>
+      <td>${fmtBytes(v.rss)}</td><td>${v.threads??''}</td><td>${v.handles??''}</td><td>${fmtUptime(v.uptime)}</td>
+      <td>${sparkline(((js.series||{})[acc]||{}).cpu_pct,100)}</td></tr>`).join('');
 }
 
 (async()=>{
   await fetchWebhook();
   await fetchAccounts();
+  followAccounts();
   await loadLogs();
-  setInterval(fetchAccounts, 2000);
+  setInterval(()=>{ if(!accSource) fetchAccounts(); }, 2000);
+  setInterval(pollLogs, 3000);
+  await fetchTelemetry();
+  (function loop(){ setTimeout(async()=>{ await fetchTelemetry().catch(()=>{}); loop(); }, Math.max(2,resInterval)*1000); })();
 })();
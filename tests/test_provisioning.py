@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+from app.provisioning import Provisioner
+
+
+@pytest.fixture
+def sources(tmp_path):
+    program, profile = tmp_path / "program", tmp_path / "profile"
+    for rel in ("terminal64.exe", "Config/terminal.lic", "Profiles/Charts/Default/chart01.chr",
+                "Profiles/Templates/default.tpl", "MQL5/Experts/bot.ex5", "Sounds/ok.wav"):
+        p = program / rel
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_bytes(rel.encode("utf-8"))
+    profile.mkdir()
+    return str(program), str(profile), str(tmp_path / "cache")
+
+
+@pytest.mark.parametrize("rel", ["Profiles/Charts/Default/chart01.chr", "Config/terminal.lic",
+                                 "Profiles/Templates/default.tpl", "MQL5/Experts/bot.ex5",
+                                 "profiles/charts/default/chart01.chr", "Terminal.INI"])
+def test_mutable_paths_match_any_case(sources, rel):
+    assert Provisioner(*sources).is_mutable(rel)
+
+
+@pytest.mark.parametrize("rel", ["terminal64.exe", "Sounds/ok.wav"])
+def test_program_files_are_not_mutable(sources, rel):
+    assert not Provisioner(*sources).is_mutable(rel)
+
+
+def test_capitalized_profile_folders_are_copied_not_linked(sources, tmp_path):
+    program = sources[0]
+    inst = str(tmp_path / "inst")
+    Provisioner(*sources).sync(inst)
+    for rel in ("Config/terminal.lic", "Profiles/Charts/Default/chart01.chr", "Profiles/Templates/default.tpl"):
+        assert not os.path.samefile(os.path.join(program, rel), os.path.join(inst, rel)), rel
+    assert os.path.samefile(os.path.join(program, "terminal64.exe"), os.path.join(inst, "terminal64.exe"))
@@ -0,0 +1,90 @@
+import os
+import random
+
+import pytest
+
+from app.signal_journal import (JOURNAL_NAME, JournalReader, JournalWriter, close_writer, get_writer,
+                                journal_path)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / JOURNAL_NAME)
+
+
+def test_append_and_read(path):
+    w = JournalWriter(path, capacity=4096)
+    assert w.append({"i": 1}) == 1
+    assert w.append_many([{"i": 2}, {"i": 3, "symbol": "XAUUSD"}]) == [2, 3]
+    r = JournalReader(path)
+    assert r.read() == [(1, {"i": 1}), (2, {"i": 2}), (3, {"i": 3, "symbol": "XAUUSD"})]
+    assert r.read() == []
+    w.append({"i": 4})
+    assert r.read() == [(4, {"i": 4})]
+    assert r.lost == 0
+    r.close()
+    w.close()
+
+
+def test_reader_follows_writer_across_wraps(path):
+    rnd = random.Random(4609)
+    w = JournalWriter(path, capacity=4096)
+    fast = JournalReader(path)
+    for i in range(1, 5001):
+        w.append({"i": i, "pad": "x" * rnd.randint(0, 200)})
+        got = fast.read()
+        assert [(s, rec["i"]) for s, rec in got] == [(i, i)]
+        if i % 997 == 0:
+            # a reader starting from a sequence number still inside the ring
+            slow = JournalReader(path, next_seq=i - 5)
+            assert [rec["i"] for _, rec in slow.read()] == list(range(i - 5, i + 1))
+            slow.close()
+    assert fast.lost == 0
+    fast.close()
+    w.close()
+
+
+def test_lapped_reader_counts_lost_records(path):
+    w = JournalWriter(path, capacity=4096)
+    lapped = JournalReader(path, next_seq=1)
+    for i in range(1, 2001):
+        w.append({"i": i, "pad": "x" * 50})
+    rest = lapped.read(limit=2000)
+    assert lapped.lost > 0
+    assert rest[-1][0] == 2000
+    assert [s for s, _ in rest] == list(range(rest[0][0], 2001))
+    assert lapped.lost + len(rest) == 2000
+    lapped.close()
+    w.close()
+
+
+def test_reopen_existing_journal(path):
+    w = JournalWriter(path, capacity=4096)
+    w.append_many([{"i": i} for i in range(1, 11)])
+    w.close()
+    # capacity comes from the file header, sequence numbers continue
+    w = JournalWriter(path, capacity=1 << 20)
+    assert w.capacity == 4096
+    assert w.append({"i": 11}) == 11
+    r = JournalReader(path)
+    assert [s for s, _ in r.read()] == list(range(1, 12))
+    r.close()
+    w.close()
+
+
+def test_rejects_foreign_file(path):
+    with open(path, "wb") as f:
+        f.write(b"\0" * 128)
+    with pytest.raises(ValueError):
+        JournalReader(path)
+
+
+def test_writer_registry(tmp_path):
+    p = journal_path(str(tmp_path / "inst"))
+    w = get_writer(p)
+    assert get_writer(p) is w
+    w.append({"i": 1})
+    close_writer(p)
+    assert get_writer(p) is not w
+    close_writer(p)
+    assert os.path.isfile(p)
@@ -0,0 +1,166 @@
+"""
+Local cluster demo: cluster_router.py plus N server.py nodes, each its own
+process on its own port with its own data.db and instances dir (a fake
+terminal64.exe, so instances are provisioned but no terminal really starts).
+
+Registers --accounts accounts through the router (spread over the nodes),
+sends single and batch webhooks through it over one keep-alive connection,
+prints the aggregated /accounts and per-node pool counters, then optionally
+kills one node to show its accounts answering 503 once its heartbeats stop.
+
+Nodes run `python server.py` (werkzeug dev server) by default. That server
+closes every connection, so the router's pools show created == requests;
+with --wsgi waitress (pip install waitress) the nodes keep connections
+alive and the pools reuse them.
+
+    python -m tools.cluster_demo --nodes 3 --accounts 12 --signals 300
+    python -m tools.cluster_demo --nodes 2 --kill-node --keep-logs
+    python -m tools.cluster_demo --wsgi waitress
+"""
+import os, sys, json, time, base64, shutil, argparse, tempfile, subprocess, statistics, http.client
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOKEN, CLUSTER_TOKEN = "demo-token", "demo-cluster"
+USER, PASS = "demo", "demo"
+AUTH = "Basic " + base64.b64encode(f"{USER}:{PASS}".encode()).decode()
+
+def _spawn(args, env, log_path):
+    log = open(log_path, "wb")
+    return subprocess.Popen([sys.executable] + args, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+def _wait_http(port: int, path: str, timeout: float = 20.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            c = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            c.request("GET", path)
+            if c.getresponse().status < 500:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"port {port} did not come up")
+
+class Client:
+    """One keep-alive connection to the router."""
+
+    def __init__(self, port: int):
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+
+    def call(self, method, path, body=None, auth=False):
+        headers = {"Content-Type": "application/json"}
+        if auth:
+            headers["Authorization"] = AUTH
+        self.conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+        r = self.conn.getresponse()
+        data = r.read()
+        return r.status, json.loads(data) if data else None, r.getheader("X-Cluster-Node")
+
+def run(n_nodes: int, n_accounts: int, n_signals: int, port: int, kill_node: bool, work: str,
+        wsgi: str = "werkzeug") -> dict:
+    program, profile = os.path.join(work, "program"), os.path.join(work, "profile")
+    os.makedirs(program), os.makedirs(os.path.join(profile, "config"))
+    open(os.path.join(program, "terminal64.exe"), "wb").close()
+    base = dict(os.environ, PYTHONDONTWRITEBYTECODE="1", WEBHOOK_TOKEN=TOKEN, CLUSTER_TOKEN=CLUSTER_TOKEN,
+                BASIC_USER=USER, BASIC_PASS=PASS)
+    procs = []
+    try:
+        procs.append(_spawn(["cluster_router.py"], dict(base, ROUTER_PORT=str(port), CLUSTER_NODE_TIMEOUT="3"),
+                            os.path.join(work, "router.log")))
+        _wait_http(port, "/health")
+        for i in range(n_nodes):
+            d = os.path.join(work, f"node{i}")
+            os.makedirs(d)
+            env = dict(base, FLASK_HOST="127.0.0.1", FLASK_PORT=str(port + 1 + i), CLUSTER_NODE_ID=f"node{i}",
+                       CLUSTER_ROUTER_URL=f"http://127.0.0.1:{port}", CLUSTER_HEARTBEAT_INTERVAL="1",
+                       DB_PATH=os.path.join(d, "data.db"), LOG_DIR=os.path.join(d, "logs"),
+                       MT5_INSTANCES_DIR=os.path.join(d, "instances"),
+                       MT5_MAIN_PATH=os.path.join(program, "terminal64.exe"), MT5_PROFILE_SOURCE=profile,
+                       SYMBOL_AUTO_FETCH="false", SMTP_HOST="", WARM_POOL_SIZE="0", SPOOL_MAX_PENDING="0",
+                       MONITOR_INTERVAL="3600", RATE_LIMITS="webhook=1000000/1,webhook_batch=1000000/1")
+            cmd = (["-m", "waitress", "--host=127.0.0.1", f"--port={port + 1 + i}", "--call", "server:create_app"]
+                   if wsgi == "waitress" else ["server.py"])
+            procs.append(_spawn(cmd, env, os.path.join(d, "node.log")))
+        for i in range(n_nodes):
+            _wait_http(port + 1 + i, "/health")
+
+        c = Client(port)
+        deadline = time.time() + 10
+        while time.time() < deadline and sum(n["alive"] for n in c.call("GET", "/cluster/nodes", auth=True)[1]["nodes"]) < n_nodes:
+            time.sleep(0.2)
+
+        accounts = [str(70000000 + i) for i in range(n_accounts)]
+        placed = {}
+        for acc in accounts:
+            status, body, node = c.call("POST", "/register", {"account": acc, "nickname": f"demo-{acc}"}, auth=True)
+            if status != 200:
+                raise RuntimeError(f"register {acc}: {status} {body}")
+            placed[acc] = node
+        time.sleep(1.5)     # next heartbeat reports the new accounts
+
+        lat, by_node, failed = [], {}, 0
+        for i in range(n_signals):
+            acc = accounts[i % len(accounts)]
+            t0 = time.perf_counter()
+            status, body, node = c.call("POST", f"/webhook/{TOKEN}",
+                                        {"account_number": acc, "symbol": "XAUUSD", "action": "BUY", "volume": 0.01})
+            lat.append((time.perf_counter() - t0) * 1000)
+            by_node[node] = by_node.get(node, 0) + 1
+            failed += status != 200
+        batch = [{"account_number": a, "symbol": "EURUSD", "action": "SELL", "volume": 0.02} for a in accounts]
+        batch.append({"account_number": "99999999", "symbol": "EURUSD", "action": "SELL", "volume": 0.02})
+        _, bres, _ = c.call("POST", f"/webhook/{TOKEN}/batch", {"signals": batch})
+
+        _, view, _ = c.call("GET", "/accounts", auth=True)
+        res = {
+            "nodes": n_nodes, "wsgi": wsgi, "accounts": n_accounts, "placement": {n: sum(1 for v in placed.values() if v == n)
+                                                                    for n in sorted(set(placed.values()))},
+            "signals": n_signals, "signals_failed": failed, "signals_by_node": by_node,
+            "forward_p50_ms": round(statistics.median(lat), 2) if lat else None,
+            "forward_p99_ms": round(sorted(lat)[int(len(lat) * 0.99) - 1], 2) if lat else None,
+            "batch": {"accepted": bres["accepted"], "rejected": bres["rejected"]},
+            "accounts_view": len(view["accounts"]),
+            "pools": {n["id"]: n["pool"] for n in view["nodes"]},
+        }
+        if kill_node and n_nodes > 1:
+            victim = procs[1]      # node0
+            victim.terminate()
+            victim.wait()
+            time.sleep(4)          # > CLUSTER_NODE_TIMEOUT
+            acc = next(a for a, n in placed.items() if n == "node0")
+            status, body, _ = c.call("POST", f"/webhook/{TOKEN}", {"account_number": acc, "symbol": "XAUUSD",
+                                                                 "action": "BUY", "volume": 0.01})
+            _, nodes_now, _ = c.call("GET", "/cluster/nodes", auth=True)
+            res["after_kill"] = {"status": status, "error": body.get("error"),
+                                 "alive": {n["id"]: n["alive"] for n in nodes_now["nodes"]}}
+        return res
+    finally:
+        for p in procs:
+            if p.poll() is None:
+                p.terminate()
+        for p in procs:
+            try:
+                p.wait(10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--nodes", type=int, default=3)
+    ap.add_argument("--accounts", type=int, default=12)
+    ap.add_argument("--signals", type=int, default=300)
+    ap.add_argument("--port", type=int, default=5600, help="router port; nodes use the following ports")
+    ap.add_argument("--wsgi", default="werkzeug", choices=["werkzeug", "waitress"], help="server running the nodes")
+    ap.add_argument("--kill-node", action="store_true", help="stop node0 at the end and show the 503")
+    ap.add_argument("--keep-logs", action="store_true", help="keep the work dir (router/node logs)")
+    args = ap.parse_args(argv)
+    work = tempfile.mkdtemp(prefix="cluster-demo-")
+    try:
+        print(json.dumps(run(args.nodes, args.accounts, args.signals, args.port, args.kill_node, work, args.wsgi), indent=2))
+    finally:
+        if args.keep_logs:
+            print(f"logs: {work}", file=sys.stderr)
+        else:
+            shutil.rmtree(work, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
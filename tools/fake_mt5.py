@@ -0,0 +1,87 @@
+"""
+Stand-in for the MetaTrader5 Python module, for running the symbol-fetch
+pool on machines without MetaTrader.
+
+    SYMBOL_FETCH_MT5_MODULE=tools.fake_mt5 python server.py
+    python -m tools.fake_mt5 --accounts 20 --workers 4     # concurrent fetch demo
+
+Implements initialize / symbols_get / shutdown / last_error. Like the real
+module it holds a single process-global session; a second initialize()
+before shutdown() raises, so a fetch race inside one process is loud instead
+of silently mixing terminals. Symbols come from <data_path>/fake_symbols.json
+when present, otherwise a fixed default list. FAKE_MT5_DELAY (seconds) makes
+initialize slow like a real terminal start.
+"""
+import os, sys, json, time, shutil, argparse, tempfile
+from collections import namedtuple
+
+SymbolInfo = namedtuple("SymbolInfo", "name")
+
+DEFAULT_SYMBOLS = ("XAUUSD", "EURUSD", "GBPUSD", "USDJPY", "BTCUSD", "US30", "NAS100")
+
+_session = None   # data_path of the open session
+
+def initialize(path=None, portable=False, data_path=None, **kwargs) -> bool:
+    global _session
+    if _session is not None:
+        raise RuntimeError(f"fake_mt5: session already open for {_session} (pid {os.getpid()})")
+    delay = float(os.getenv("FAKE_MT5_DELAY", "0"))
+    if delay:
+        time.sleep(delay)
+    if data_path and not os.path.isdir(data_path):
+        return False
+    _session = data_path or ""
+    return True
+
+def symbols_get(group=None):
+    if _session is None:
+        return None
+    names = DEFAULT_SYMBOLS
+    try:
+        with open(os.path.join(_session, "fake_symbols.json"), "r", encoding="utf-8") as f:
+            names = json.load(f)
+    except (OSError, ValueError):
+        pass
+    return tuple(SymbolInfo(n) for n in names)
+
+def shutdown() -> None:
+    global _session
+    _session = None
+
+def last_error():
+    return (1, "Success") if _session is not None else (-10004, "No IPC connection")
+
+def _demo(accounts: int, workers: int, rounds: int) -> dict:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from app.symbol_fetcher import SymbolFetchService
+    from app.mt5_handler import instance_dir_for
+
+    root = tempfile.mkdtemp(prefix="fake-mt5-")
+    try:
+        names = [f"A{i}" for i in range(accounts)]
+        for n in names:
+            os.makedirs(instance_dir_for(root, n))
+        # one account with a different symbol set
+        with open(os.path.join(instance_dir_for(root, names[0]), "fake_symbols.json"), "w") as f:
+            json.dump(["XAUUSDm", "EURUSDm"], f)
+        svc = SymbolFetchService("terminal64.exe", root, workers=workers, ttl=0,
+                                 mt5_module="tools.fake_mt5")
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            futs = [svc.submit(n) for n in names + names]   # duplicate submits share one fetch
+            for fu in futs:
+                fu.result(60)
+        elapsed = time.perf_counter() - t0
+        svc.shutdown()
+        return {"accounts": accounts, "workers": workers, "rounds": rounds,
+                "elapsed_s": round(elapsed, 3), **svc.stats}
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--accounts", type=int, default=10)
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--rounds", type=int, default=2)
+    args = ap.parse_args()
+    print(json.dumps(_demo(args.accounts, args.workers, args.rounds), indent=2))
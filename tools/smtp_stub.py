@@ -0,0 +1,118 @@
+"""
+Local SMTP stand-in for exercising email alerts without a real mail server.
+
+    python -m tools.smtp_stub --port 1025            # print every message received
+    python -m tools.smtp_stub --port 1025 --burst 500   # also fire a burst through AlertDispatcher
+
+Point the app at it with SMTP_HOST=127.0.0.1, SMTP_PORT=1025, SMTP_STARTTLS=false.
+Speaks just enough SMTP (EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT) for smtplib.
+"""
+import os, sys, time, argparse, threading, socketserver
+from email import message_from_bytes
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _reply(self, line: str) -> None:
+        self.wfile.write((line + "\r\n").encode("ascii"))
+
+    def handle(self):
+        stub = self.server.stub
+        stub.connections += 1
+        self._reply("220 smtp-stub ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            cmd = line.decode("utf-8", "replace").strip()
+            verb = cmd.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self._reply("250-smtp-stub")
+                self._reply("250 8BITMIME")
+            elif verb in ("HELO", "MAIL", "RCPT", "RSET", "NOOP"):
+                self._reply("250 OK")
+            elif verb == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                chunks = []
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data in (b".\r\n", b".\n"):
+                        break
+                    chunks.append(data[1:] if data.startswith(b"..") else data)
+                stub._received(message_from_bytes(b"".join(chunks)))
+                self._reply("250 OK queued")
+            elif verb == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+class SmtpStub:
+    """Threaded SMTP sink; collected messages are in `.messages`."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, echo: bool = False):
+        self.messages = []
+        self.connections = 0
+        self.echo = echo
+        self._lock = threading.Lock()
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._server = socketserver.ThreadingTCPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self.host, self.port = self._server.server_address[:2]
+        self._thread = None
+
+    def _received(self, msg) -> None:
+        with self._lock:
+            self.messages.append(msg)
+        if self.echo:
+            print(f"--- {msg['Subject']}\n{msg.get_payload()}", flush=True)
+
+    def start(self) -> "SmtpStub":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def _burst(stub: SmtpStub, n: int, window: float) -> None:
+    os.environ.update({"SMTP_HOST": stub.host, "SMTP_PORT": str(stub.port),
+                       "SMTP_STARTTLS": "false", "SMTP_TO": "ops@example.com"})
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from app.alert_dispatcher import AlertDispatcher
+
+    d = AlertDispatcher(maxsize=max(n, 1), window=window)
+    t0 = time.perf_counter()
+    for _ in range(n):
+        d.submit("Unauthorized Webhook", "Bad token from 203.0.113.7")
+    enqueue_ms = (time.perf_counter() - t0) * 1000
+    d.stop(timeout=window + 10)
+    print(f"burst={n} enqueue={enqueue_ms:.1f}ms emails={len(stub.messages)} "
+          f"smtp_connections={stub.connections} stats={d.stats}")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=1025)
+    ap.add_argument("--burst", type=int, default=0, help="send N duplicate alerts through AlertDispatcher, then exit")
+    ap.add_argument("--window", type=float, default=2.0, help="coalesce window used with --burst")
+    args = ap.parse_args()
+
+    stub = SmtpStub(args.host, args.port, echo=not args.burst).start()
+    print(f"smtp-stub listening on {stub.host}:{stub.port}", flush=True)
+    try:
+        if args.burst:
+            _burst(stub, args.burst, args.window)
+        else:
+            while True:
+                time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.stop()